@@ -0,0 +1,76 @@
+import json
+import subprocess
+from utils import find_tool
+
+# yt-dlp arguments that fetch the best audio-only stream as is (no transcoding).
+NATIVE_AUDIO_ARGS = ["-f", "bestaudio/best"]
+
+# Output formats the user can ask for: extension, codec that can be stream-copied into
+# it, and the encoder arguments used when the source codec doesn't fit.
+AUDIO_FORMATS = {
+    "mp3": (".mp3", "mp3", ["-c:a", "libmp3lame", "-q:a", "2"]),
+    "m4a": (".m4a", "aac", ["-c:a", "aac", "-b:a", "192k"]),
+    "opus": (".opus", "opus", ["-c:a", "libopus", "-b:a", "128k"]),
+}
+
+# Containers that hold each native codec without re-encoding, for the "original" format.
+NATIVE_CONTAINERS = {"aac": ".m4a", "opus": ".opus", "mp3": ".mp3", "vorbis": ".ogg", "flac": ".flac"}
+
+
+def normalize_codec(codec):
+    """
+    Maps yt-dlp/ffprobe codec names (e.g. "mp4a.40.2", "opus") to ffmpeg codec names.
+    """
+    codec = (codec or "").lower()
+    # MP3 in MP4 also starts with "mp4a", so it is checked before AAC.
+    if codec in ("mp3", "mp4a.40.34", "mp4a.6b", "mp4a.69"):
+        return "mp3"
+    if codec.startswith("mp4a") or codec == "aac":
+        return "aac"
+    if codec in ("opus", "vorbis", "flac"):
+        return codec
+    return codec or None
+
+
+def codec_from_info(info):
+    """
+    Returns the audio codec of the format yt-dlp selected in info, or None.
+    """
+    if not info:
+        return None
+    formats = info.get("requested_formats") or [info]
+    for fmt in formats:
+        if fmt.get("acodec") and fmt.get("acodec") != "none":
+            return normalize_codec(fmt["acodec"])
+    return None
+
+
+def probe_audio_codec(path):
+    """
+    Returns the codec of the first audio stream in path (via ffprobe), or None.
+    """
+    try:
+        proc = subprocess.run([find_tool("ffprobe"), "-v", "error", "-select_streams", "a:0",
+                               "-show_entries", "stream=codec_name", "-of", "json", path],
+                              capture_output=True, text=True)
+        streams = json.loads(proc.stdout).get("streams", [])
+        return normalize_codec(streams[0]["codec_name"]) if streams else None
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def plan_audio_output(codec, audio_format):
+    """
+    Decides how to produce audio_format ("mp3", "m4a", "opus" or "original") from a
+    source in codec. Returns (extension, ffmpeg codec arguments, copies) where copies
+    tells whether the audio is stream-copied (no encode at all).
+    """
+    if audio_format == "original":
+        if codec in NATIVE_CONTAINERS:
+            return NATIVE_CONTAINERS[codec], ["-c:a", "copy"], True
+        # Unknown codec: Matroska audio can hold anything.
+        return ".mka", ["-c:a", "copy"], True
+    ext, copy_codec, encode_args = AUDIO_FORMATS[audio_format]
+    if codec == copy_codec:
+        return ext, ["-c:a", "copy"], True
+    return ext, encode_args, False
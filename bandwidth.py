@@ -0,0 +1,209 @@
+# Adaptive bandwidth control: one controller shares a global download budget between the
+# yt-dlp downloads of all running jobs. Every download starts with a --limit-rate and a
+# fragment count (-N) from the controller. Every few seconds the shares are recomputed
+# from the measured speeds (see jobqueue.Job.note_download). yt-dlp can't change its
+# limit while running, so a download whose limit is far from its new share is restarted
+# with the new settings; it continues from its .part file.
+import threading
+import time
+from contextlib import contextmanager
+
+# Share weight of a job by its "priority" parameter; interactive_weight in config.json
+# replaces the interactive one.
+PRIORITY_WEIGHTS = {"interactive": 4, "batch": 1}
+
+# Smallest limit handed out (bytes/s), so a download never stalls completely.
+MIN_RATE = 64 * 1024
+
+# A download running at this fraction of its limit or more is held back by the limit
+# (it could use more); a slower one is limited by the source and leaves the rest to others.
+LIMIT_BOUND = 0.85
+
+# Seconds a download runs before its speed is trusted (and before it may be restarted to
+# lower its limit), and the least time before one is restarted to raise its limit or
+# fragment count. Lowering is what holds the budget, so it isn't delayed further.
+SETTLE_TIME = 3.0
+RESTART_INTERVAL = 15.0
+
+# A running limit is changed (by a restart) only if the share differs by this factor.
+RESTART_FACTOR = 1.5
+
+
+def share_budget(budget, claims):
+    """
+    Weighted max-min fair split of budget (bytes/s). claims is a list of (weight, demand),
+    demand being the most that download can use (None = no known limit). No download
+    gets more than its demand; what those leave over is split among the rest by weight.
+    Returns the shares in the order of claims.
+    """
+    shares = [0.0] * len(claims)
+    pending = set(range(len(claims)))
+    remaining = budget
+    while pending and remaining > 0:
+        total_weight = sum(claims[i][0] for i in pending)
+        satisfied = [i for i in pending
+                     if claims[i][1] is not None and claims[i][1] <= remaining * claims[i][0] / total_weight]
+        if not satisfied:
+            for i in pending:
+                shares[i] = remaining * claims[i][0] / total_weight
+            break
+        for i in satisfied:
+            shares[i] = claims[i][1]
+            remaining -= claims[i][1]
+            pending.discard(i)
+    return shares
+
+
+def format_rate(bytes_per_second):
+    return f"{bytes_per_second * 8 / 1000 / 1000:.1f} Mbit/s"
+
+
+class Lease:
+    """
+    One yt-dlp download under the controller: its job, share weight, the rate limit
+    (bytes/s for the whole download) and fragment count it runs with, and whether the
+    controller may restart it to change them.
+    """
+
+    def __init__(self, job, weight, limit, fragments, fragmented, restartable):
+        self.job = job
+        self.weight = weight
+        self.limit = limit
+        self.fragments = fragments
+        self.fragmented = fragmented
+        self.restartable = restartable
+        self.started = time.monotonic()
+        self.restarts = 0
+        self._restart = False
+
+    def args(self):
+        """
+        yt-dlp arguments for the current limit and fragment count. yt-dlp applies
+        --limit-rate to each fragment connection, so it is divided between them.
+        """
+        fragments = self.fragments if self.fragmented else 1
+        return ["--limit-rate", str(max(int(self.limit / fragments), 1024)),
+                "--concurrent-fragments", str(fragments)]
+
+    def take_restart(self):
+        """
+        Returns True (once) if the controller stopped the download to change its settings.
+        """
+        restart, self._restart = self._restart, False
+        if restart:
+            self.started = time.monotonic()
+            self.restarts += 1
+        return restart
+
+
+class BandwidthController:
+    """
+    Holds the aggregate download speed of the queue's jobs near budget (bytes/s).
+    Downloads take a Lease (see lease) for their settings; a background thread
+    rebalances every interval seconds. Interactive jobs weigh interactive_weight
+    times as much as batch jobs when the budget is split. Fragment counts start at
+    start_fragments and go up to max_fragments for a download that can't reach its
+    share, and back down for one that its limit holds back anyway.
+    """
+
+    def __init__(self, budget, interactive_weight=None, start_fragments=4, max_fragments=16, interval=2.0):
+        self.budget = budget
+        self.weights = dict(PRIORITY_WEIGHTS)
+        if interactive_weight:
+            self.weights["interactive"] = interactive_weight
+        self.start_fragments = max(1, start_fragments)
+        self.max_fragments = max(self.start_fragments, max_fragments)
+        self.interval = interval
+        self._leases = []
+        self._fragments = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self.aggregate = 0.0
+
+    def weight(self, job):
+        return self.weights["interactive" if job.interactive else "batch"]
+
+    @contextmanager
+    def lease(self, job, fragmented=False, restartable=True):
+        """
+        Registers a download of job for the duration of the block and yields its Lease.
+        fragmented tells whether the media is fetched in fragments (DASH/HLS), which is
+        when -N makes a difference; restartable is False for downloads that can't resume
+        (e.g. section downloads).
+        """
+        with self._lock:
+            lease = Lease(job, self.weight(job), self.budget, self._fragments.get(job.id, self.start_fragments),
+                          fragmented, restartable)
+            self._leases.append(lease)
+            self._rebalance(initial=lease)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name="bandwidth", daemon=True)
+                self._thread.start()
+        try:
+            yield lease
+        finally:
+            with self._lock:
+                self._leases.remove(lease)
+                self._fragments[job.id] = lease.fragments
+
+    def status(self):
+        """
+        One-line summary for display, e.g. "41.8 of 50.0 Mbit/s".
+        """
+        return f"{format_rate(self.aggregate)} of {format_rate(self.budget)}"
+
+    def _loop(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                if self._leases:
+                    self._rebalance()
+
+    def _demand(self, lease, now):
+        # The most lease can use, None if unknown (or held back by its limit).
+        speed = lease.job.current_speed
+        if now - lease.started < SETTLE_TIME or not speed or speed >= lease.limit * LIMIT_BOUND:
+            return None
+        return speed / LIMIT_BOUND
+
+    def _rebalance(self, initial=None):
+        # Called with the lock held. A new lease (initial) only gets its settings; the
+        # periodic pass also adapts fragment counts and restarts downloads far off their share.
+        now = time.monotonic()
+        leased = {id(lease.job) for lease in self._leases}
+        queue = self._leases[0].job.queue
+        unmanaged = sum(job.current_speed for job in list(queue.jobs) if id(job) not in leased) if queue else 0.0
+        self.aggregate = unmanaged + sum(lease.job.current_speed for lease in self._leases)
+        available = max(self.budget - unmanaged, MIN_RATE * len(self._leases))
+        claims = [(lease.weight, None if lease is initial else self._demand(lease, now)) for lease in self._leases]
+        shares = [max(share, MIN_RATE) for share in share_budget(available, claims)]
+        # What each download would get if it could use it: more fragments may get it there.
+        fair = share_budget(available, [(lease.weight, None) for lease in self._leases])
+
+        for lease, share, fair_share in zip(self._leases, shares, fair):
+            if lease is initial:
+                lease.limit = share
+                continue
+            speed = lease.job.current_speed
+            if now - lease.started < SETTLE_TIME:
+                continue
+            held_back = speed >= lease.limit * LIMIT_BOUND
+            fragments = lease.fragments
+            if lease.fragmented:
+                if not held_back and speed < fair_share * 0.7 and fragments < self.max_fragments:
+                    fragments = min(fragments * 2, self.max_fragments)
+                elif held_back and fragments > self.start_fragments:
+                    fragments -= 1
+            too_much = speed > share * RESTART_FACTOR and lease.limit > share * RESTART_FACTOR
+            too_little = held_back and share > lease.limit * RESTART_FACTOR
+            more_fragments = fragments > lease.fragments
+            if not lease.restartable or not (too_much or (now - lease.started >= RESTART_INTERVAL
+                                                          and (too_little or more_fragments))):
+                # Fewer fragments take effect with the next download.
+                lease.fragments = min(fragments, lease.fragments)
+                continue
+            # The measured demand was for fewer fragments; with more, allow the fair share.
+            lease.limit = max(fair_share, share) if more_fragments else share
+            lease.fragments = fragments
+            lease._restart = True
+            lease.job.interrupt()
@@ -0,0 +1,850 @@
+"""
+Offline benchmark for the processing modes (full/cut/chapters x video/audio). Runs the real
+processing engine end to end without network access: a stand-in for yt-dlp serves media
+generated by ffmpeg (lavfi testsrc2 + sine) of several lengths, so runs are reproducible.
+
+    python benchmark.py                                   run every scenario and print the results
+    python benchmark.py --repeat 3 --save bench_baseline.json
+    python benchmark.py --baseline bench_baseline.json    compare against a saved run
+    python benchmark.py --set chunked_encode=false --baseline bench_baseline.json
+    python benchmark.py --bandwidth --budget 40 --link 80   bandwidth controller against a throttled server
+
+For every scenario it records wall time, in-process CPU time and, per stage (probe,
+download, encode), the stage's wall time, CPU time, peak RSS and bytes written. Each
+external tool call is routed through a small wrapper process that measures exactly that
+call (CPU time and peak RSS need the resource module, i.e. not on Windows). Compared with
+a baseline, a metric that got worse by more than --tolerance percent is a regression
+and the exit status is 1.
+
+With --bandwidth it instead checks the bandwidth controller (see bandwidth.py). A local
+HTTP server serves the test media through a shared, throttled "uplink". Several batch jobs
+and one interactive job then download from it through the job queue. The run reports how
+closely the combined speed held the budget and what share the interactive job got.
+
+Requires ffmpeg and ffprobe (bundled .exe or on PATH); yt-dlp is not used. Generated
+media is kept in cache/bench. Caches are disabled, so every run starts cold.
+"""
+import argparse
+import glob
+import json
+import os
+import platform
+import re
+import shutil
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+from utils import current_dir, find_tool, format_size
+
+URL_SCHEME = "bench://"
+MEDIA_DIR = os.path.join(current_dir, "cache", "bench")
+SCRIPT = os.path.abspath(__file__)
+
+# Environment passed to the wrapper and stand-in processes.
+MEDIA_ENV = "YTCUTTER_BENCH_MEDIA"
+STATS_ENV = "YTCUTTER_BENCH_STATS"
+RATE_ENV = "YTCUTTER_BENCH_RATE"
+HTTP_ENV = "YTCUTTER_BENCH_HTTP"
+
+# find_tool() results during a run look like "bench-tool:ffmpeg"; _BenchPopen turns them
+# into a call of this script's wrapper (--exec), which runs and measures the real tool.
+TOOL_PREFIX = "bench-tool:"
+
+DEFAULT_LENGTHS = [30, 300]
+
+# Settings every run uses, so results don't depend on the local config.json or on
+# what earlier runs left in the caches.
+BENCH_CONFIG = {
+    "cache_enabled": False,
+    "probe_cache_ttl": 0,
+    "ytdlp_backend": "subprocess",
+    "log_file": "",
+    # A failing scenario should fail, not be timed with backoff delays.
+    "download_retries": 0,
+}
+
+# yt-dlp options that take a value; the stand-in accepts and ignores those it doesn't use.
+YTDLP_VALUE_OPTIONS = {
+    "-f", "-o", "-N", "-r", "--load-info-json", "--download-sections", "--merge-output-format",
+    "--progress-template", "--limit-rate", "--concurrent-fragments",
+}
+
+COPY_CHUNK = 256 * 1024
+
+# Fragment size of the stand-in's HTTP downloads and the read size of the throttled server.
+FRAGMENT_SIZE = 512 * 1024
+HTTP_CHUNK = 16 * 1024
+
+
+def _scenarios():
+    # Imported here: the wrapper and stand-in processes must not load the engine.
+    import processing_gui
+
+    def cut_range(seconds):
+        return f"{seconds * 0.25:g}", f"{seconds * 0.75:g}"
+
+    return {
+        "full-video": lambda url, out, seconds, cb: processing_gui.process_full_video_gui(url, "bench", out, *cb),
+        "full-audio": lambda url, out, seconds, cb: processing_gui.process_full_audio_gui(url, "bench", out, *cb),
+        "cut-video": lambda url, out, seconds, cb: processing_gui.process_cut_video_gui(
+            url, "bench", out, *cut_range(seconds), *cb),
+        "cut-audio": lambda url, out, seconds, cb: processing_gui.process_cut_audio_gui(
+            url, "bench", out, *cut_range(seconds), *cb),
+        "chapters-video": lambda url, out, seconds, cb: processing_gui.process_chapters_gui(
+            url, "bench", out, "Video", *cb),
+        "chapters-audio": lambda url, out, seconds, cb: processing_gui.process_chapters_gui(
+            url, "bench", out, "Audio", *cb),
+    }
+
+
+SCENARIO_NAMES = ["full-video", "full-audio", "cut-video", "cut-audio", "chapters-video", "chapters-audio"]
+
+
+# --- Test media -------------------------------------------------------------------
+
+def media_paths(seconds, media_dir=MEDIA_DIR):
+    return os.path.join(media_dir, f"bench_{seconds}.mp4"), os.path.join(media_dir, f"bench_{seconds}.m4a")
+
+
+def generate_media(seconds, media_dir=MEDIA_DIR, log_func=print):
+    """
+    Creates (once) a 720p30 H.264/AAC test video of the given length, with 2-second GOPs
+    like most streaming sites, and an audio-only copy of its track.
+    """
+    os.makedirs(media_dir, exist_ok=True)
+    video, audio = media_paths(seconds, media_dir)
+    ffmpeg = find_tool("ffmpeg")
+    if not os.path.exists(video):
+        log_func(f"Generating {seconds}s test video...")
+        tmp = video + ".tmp"
+        subprocess.run([ffmpeg, "-v", "error", "-y",
+                        "-f", "lavfi", "-i", f"testsrc2=size=1280x720:rate=30:duration={seconds}",
+                        "-f", "lavfi", "-i", f"sine=frequency=440:sample_rate=48000:duration={seconds}",
+                        "-c:v", "libx264", "-preset", "veryfast", "-g", "60", "-pix_fmt", "yuv420p",
+                        "-c:a", "aac", "-b:a", "128k", "-shortest", "-movflags", "+faststart",
+                        "-f", "mp4", tmp], check=True)
+        os.replace(tmp, video)
+    if not os.path.exists(audio):
+        tmp = audio + ".tmp"
+        subprocess.run([ffmpeg, "-v", "error", "-y", "-i", video, "-vn", "-c:a", "copy", "-f", "mp4", tmp],
+                       check=True)
+        os.replace(tmp, audio)
+    return video, audio
+
+
+def media_info(url, media_dir):
+    """
+    The info dict the stand-in reports for bench://<seconds>: a progressive 720p format
+    ("18") and an audio-only one ("140"), pointing at the generated files, and four
+    equal chapters.
+    """
+    seconds = int(url[len(URL_SCHEME):])
+    video, audio = media_paths(seconds, media_dir)
+    video_size, audio_size = os.path.getsize(video), os.path.getsize(audio)
+    info = {
+        "id": f"bench{seconds}",
+        "title": f"Benchmark {seconds}s",
+        "extractor": "bench",
+        "extractor_key": "Bench",
+        "webpage_url": url,
+        "duration": seconds,
+        "chapters": [{"start_time": seconds * i / 4, "end_time": seconds * (i + 1) / 4, "title": f"Part {i + 1}"}
+                     for i in range(4)],
+        "formats": [
+            {"format_id": "140", "ext": "m4a", "protocol": "https", "url": audio, "vcodec": "none",
+             "acodec": "mp4a.40.2", "abr": 128, "tbr": audio_size * 8 / 1000 / seconds, "filesize": audio_size},
+            {"format_id": "18", "ext": "mp4", "protocol": "https", "url": video, "vcodec": "avc1.64001f",
+             "acodec": "mp4a.40.2", "width": 1280, "height": 720, "fps": 30,
+             "tbr": video_size * 8 / 1000 / seconds, "filesize": video_size},
+        ],
+    }
+    base = os.environ.get(HTTP_ENV)
+    if base:
+        # Served by ThrottledServer and fetched in fragments, like DASH.
+        for fmt in info["formats"]:
+            fmt.update(url=f"{base}/{os.path.basename(fmt['url'])}", protocol="http_dash_segments")
+    return info
+
+
+# --- yt-dlp stand-in ----------------------------------------------------------------
+
+def _match_format(formats, selector):
+    selector = selector.split("[")[0]  # filters are not supported and ignored
+    if selector in ("best", "b", "b*", "bestvideo", "bv", "bv*"):
+        videos = [f for f in formats if f["vcodec"] != "none"]
+        return max(videos, key=lambda f: f["filesize"]) if videos else None
+    if selector in ("bestaudio", "ba"):
+        audio = [f for f in formats if f["vcodec"] == "none"]
+        return max(audio, key=lambda f: f["filesize"]) if audio else None
+    return next((f for f in formats if f["format_id"] == selector), None)
+
+
+def select_formats(formats, spec):
+    """
+    Resolves a -f spec ("a/b" alternatives of "v+a" combinations) to a list of formats,
+    or None if nothing matches.
+    """
+    for alternative in (spec or "best").split("/"):
+        chosen = [_match_format(formats, part) for part in alternative.split("+")]
+        if all(chosen):
+            return chosen
+    return None
+
+
+def selected_info(info, formats, merge_ext):
+    # yt-dlp's -J output: the info dict with the selected format's fields on top.
+    selected = dict(info)
+    if len(formats) > 1:
+        selected.update(requested_formats=formats, ext=merge_ext or "mkv",
+                        format_id="+".join(f["format_id"] for f in formats))
+    else:
+        selected.update(formats[0])
+    return selected
+
+
+def _parse_ytdlp_args(argv):
+    options, flags, positional = {}, set(), []
+    args = iter(argv)
+    for arg in args:
+        if arg in YTDLP_VALUE_OPTIONS:
+            options[arg] = next(args, "")
+        elif arg.startswith("-"):
+            flags.add(arg)
+        else:
+            positional.append(arg)
+    return options, flags, positional
+
+
+def _copy(src, out, progress):
+    # Copies src to out, throttled to RATE_ENV bytes per second if set.
+    rate = float(os.environ.get(RATE_ENV) or 0)
+    total = os.path.getsize(src)
+    done = 0
+    started = time.perf_counter()
+    with open(src, "rb") as f:
+        while True:
+            data = f.read(COPY_CHUNK)
+            if not data:
+                break
+            out.write(data)
+            done += len(data)
+            elapsed = time.perf_counter() - started
+            if rate and done / rate > elapsed:
+                time.sleep(done / rate - elapsed)
+                elapsed = done / rate
+            speed = done / elapsed if elapsed else 0
+            progress(done, total, speed, (total - done) / speed if speed else 0)
+
+
+def ytdlp_main(argv):
+    """
+    Emulates the parts of the yt-dlp command line the app uses: -J, --load-info-json, -f,
+    -o (including "-" for stdout), --download-sections and progress lines.
+    """
+    from progress import YTDLP_PROGRESS_PREFIX
+
+    options, flags, positional = _parse_ytdlp_args(argv)
+    if "--load-info-json" in options:
+        with open(options["--load-info-json"], "r", encoding="utf-8") as f:
+            info = json.load(f)
+    elif positional and positional[0].startswith(URL_SCHEME):
+        info = media_info(positional[0], os.environ[MEDIA_ENV])
+    else:
+        print("ERROR: unsupported URL", file=sys.stderr)
+        return 1
+    formats = select_formats(info["formats"], options.get("-f"))
+    if formats is None:
+        print("ERROR: requested format is not available", file=sys.stderr)
+        return 1
+    merge_ext = options.get("--merge-output-format")
+    if "-J" in flags:
+        json.dump(selected_info(info, formats, merge_ext), sys.stdout)
+        return 0
+
+    output = options.get("-o", "%(title)s.%(ext)s")
+    to_stdout = output == "-"
+    progress_stream = sys.stderr if to_stdout else sys.stdout
+
+    def progress(done, total, speed, eta):
+        if "--progress-template" in options:
+            print(f"{YTDLP_PROGRESS_PREFIX} {done} {total} {speed:.0f} {eta:.0f}", file=progress_stream, flush=True)
+
+    if to_stdout:
+        if len(formats) > 1:
+            print("ERROR: merged formats can't be written to stdout", file=sys.stderr)
+            return 1
+        try:
+            _copy(formats[0]["url"], sys.stdout.buffer, progress)
+            sys.stdout.flush()
+        except BrokenPipeError:
+            # The reader (ffmpeg) has all it needs; keep the interpreter quiet at exit.
+            os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 0
+
+    path = output.replace("%(ext)s", merge_ext if len(formats) > 1 and merge_ext else formats[-1]["ext"])
+    section = options.get("--download-sections", "").lstrip("*")
+    if not section and len(formats) == 1 and formats[0]["url"].startswith("http"):
+        return _http_download(formats[0]["url"], path, formats[0]["filesize"], progress,
+                              _parse_rate(options.get("--limit-rate") or options.get("-r")),
+                              int(options.get("--concurrent-fragments") or options.get("-N") or 1))
+    if not section and len(formats) == 1:
+        with open(path, "wb") as out:
+            _copy(formats[0]["url"], out, progress)
+        return 0
+    # Sections and merges are cut/muxed with ffmpeg, as yt-dlp does.
+    cmd = [find_tool("ffmpeg"), "-v", "error", "-y"]
+    for fmt in formats:
+        if section:
+            start, _, end = section.partition("-")
+            cmd += ["-ss", start] + (["-to", end] if end and end != "inf" else [])
+        cmd += ["-i", fmt["url"]]
+    if len(formats) > 1:
+        cmd += ["-map", "0:v:0", "-map", "1:a:0"]
+    return subprocess.run([*cmd, "-c", "copy", path]).returncode
+
+
+def _parse_rate(text):
+    # yt-dlp rate syntax: bytes per second, optionally with a K/M/G suffix.
+    if not text:
+        return None
+    text = text.strip().upper().rstrip("B").rstrip("I")
+    factor = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}.get(text[-1:], 1)
+    return float(text[:-1] if factor > 1 else text) * factor
+
+
+def _fetch_range(url, start, end, limit):
+    # Bytes start..end-1 of url over one connection, throttled to limit bytes/s like one
+    # of yt-dlp's fragment connections.
+    request = urllib.request.Request(url, headers={"Range": f"bytes={start}-{end - 1}"})
+    chunks, done, started = [], 0, time.perf_counter()
+    with urllib.request.urlopen(request) as response:
+        while True:
+            data = response.read(HTTP_CHUNK)
+            if not data:
+                break
+            chunks.append(data)
+            done += len(data)
+            if limit and done / limit > time.perf_counter() - started:
+                time.sleep(done / limit - (time.perf_counter() - started))
+    return b"".join(chunks)
+
+
+def _http_download(url, path, total, progress, limit, fragments):
+    """
+    Downloads url to path through path + ".part" like yt-dlp: in FRAGMENT_SIZE pieces,
+    fragments of them at a time, each connection limited to limit bytes/s. Pieces are
+    appended in order, so a killed download continues from the .part file next time.
+    """
+    part = path + ".part"
+    done = os.path.getsize(part) if os.path.exists(part) else 0
+    window = [(time.perf_counter(), done)]
+    with open(part, "ab") as out, ThreadPoolExecutor(max(fragments, 1)) as pool:
+        while done < total:
+            pieces = [(a, min(a + FRAGMENT_SIZE, total))
+                      for a in range(done, total, FRAGMENT_SIZE)][:max(fragments, 1)]
+            for data in pool.map(lambda piece: _fetch_range(url, *piece, limit), pieces):
+                out.write(data)
+                done += len(data)
+            out.flush()
+            # Speed over the last few seconds, as yt-dlp reports it.
+            now = time.perf_counter()
+            window = [(t, d) for t, d in window if now - t < 3.0] + [(now, done)]
+            elapsed = now - window[0][0]
+            speed = (done - window[0][1]) / elapsed if elapsed > 0 else 0
+            progress(done, total, speed, (total - done) / speed if speed else 0)
+    os.replace(part, path)
+    return 0
+
+
+class _Pacer:
+    # Hands out transfer time at rate bytes/s, first come first served.
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.lock = threading.Lock()
+        self.free_at = time.monotonic()
+
+    def take(self, size):
+        if not self.rate:
+            return
+        with self.lock:
+            now = time.monotonic()
+            self.free_at = max(self.free_at, now) + size / self.rate
+            wait = self.free_at - now
+        time.sleep(wait)
+
+
+class ThrottledServer:
+    """
+    Local HTTP stand-in for a media server behind a slow uplink: serves the files in
+    directory (with Range requests), all connections together at most link bytes/s and
+    each one at most per_connection bytes/s (0 = unlimited).
+    """
+
+    def __init__(self, directory, link, per_connection=0):
+        uplink = _Pacer(link)
+
+        class Handler(SimpleHTTPRequestHandler):
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, directory=directory, **kwargs)
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                path = self.translate_path(self.path)
+                try:
+                    size = os.path.getsize(path)
+                except OSError:
+                    self.send_error(404)
+                    return
+                start, end = 0, size - 1
+                match = re.match(r"bytes=(\d+)-(\d*)", self.headers.get("Range", ""))
+                if match:
+                    start = int(match.group(1))
+                    end = min(int(match.group(2)), size - 1) if match.group(2) else size - 1
+                self.send_response(206 if match else 200)
+                self.send_header("Content-Length", str(end - start + 1))
+                self.send_header("Accept-Ranges", "bytes")
+                if match:
+                    self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+                self.end_headers()
+                connection = _Pacer(per_connection)
+                with open(path, "rb") as f:
+                    f.seek(start)
+                    remaining = end - start + 1
+                    try:
+                        while remaining > 0:
+                            data = f.read(min(HTTP_CHUNK, remaining))
+                            if not data:
+                                break
+                            connection.take(len(data))
+                            uplink.take(len(data))
+                            self.wfile.write(data)
+                            remaining -= len(data)
+                    except (BrokenPipeError, ConnectionResetError):
+                        pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, name="throttled-server", daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+        return False
+
+
+# --- Measuring wrapper --------------------------------------------------------------
+
+def tool_stage(tool, args):
+    if tool == "ffprobe" or (tool == "yt-dlp" and "-J" in args):
+        return "probe"
+    return "download" if tool == "yt-dlp" else "encode"
+
+
+def bytes_written(tool, args):
+    # Size of the file the call produced (0 for pipes and metadata probes).
+    if tool == "yt-dlp":
+        if "-o" not in args or "-J" in args:
+            return 0
+        output = args[args.index("-o") + 1]
+        if output == "-":
+            return 0
+        return sum(os.path.getsize(p) for p in glob.glob(glob.escape(output).replace("%(ext)s", "*")))
+    if tool == "ffmpeg" and args and re.search(r"%0?\d*d", args[-1]):
+        # Numbered outputs of the segment muxer, e.g. "chapter_%03d.mp4"
+        return sum(os.path.getsize(p) for p in glob.glob(re.sub(r"%0?\d*d", "*", glob.escape(args[-1]))))
+    if tool == "ffmpeg" and args and not args[-1].startswith("pipe:") and os.path.isfile(args[-1]):
+        return os.path.getsize(args[-1])
+    return 0
+
+
+def exec_tool(tool, args):
+    """
+    Runs tool (the yt-dlp stand-in or the real ffmpeg/ffprobe) with args, passing stdio
+    through, and appends one JSON line with its stage, times, peak RSS and output size
+    to the STATS_ENV file. Returns the tool's exit code.
+    """
+    cmd = [sys.executable, SCRIPT, "--ytdlp", *args] if tool == "yt-dlp" else [find_tool(tool), *args]
+    started = time.time()
+    proc = subprocess.Popen(cmd)
+    # The app stops a streaming download with SIGTERM; pass it on so the call is still recorded.
+    signal.signal(signal.SIGTERM, lambda signum, frame: proc.terminate())
+    returncode = proc.wait()
+    ended = time.time()
+    cpu = rss = None
+    try:
+        import resource
+        usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+        cpu = usage.ru_utime + usage.ru_stime
+        rss = usage.ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+    except ImportError:
+        pass
+    record = {"stage": tool_stage(tool, args), "tool": tool, "start": started, "end": ended, "cpu": cpu,
+              "rss": rss, "bytes": bytes_written(tool, args), "returncode": returncode}
+    with open(os.environ[STATS_ENV], "a", encoding="utf-8") as f:
+        f.write(json.dumps(record) + "\n")
+    return returncode
+
+
+def _install_wrapper():
+    """
+    Routes the engine's external tool calls through exec_tool: find_tool() returns a
+    TOOL_PREFIX name and subprocess.Popen rewrites such commands into a wrapper call.
+    """
+    import utils
+
+    original = subprocess.Popen
+
+    class _BenchPopen(original):
+        def __init__(self, args, *rest, **kwargs):
+            if isinstance(args, (list, tuple)) and args and str(args[0]).startswith(TOOL_PREFIX):
+                args = [sys.executable, SCRIPT, "--exec", args[0][len(TOOL_PREFIX):], *args[1:]]
+            super().__init__(args, *rest, **kwargs)
+
+    subprocess.Popen = _BenchPopen
+    real_find_tool = utils.find_tool
+    for module in list(sys.modules.values()):
+        if module is not sys.modules[__name__] and getattr(module, "find_tool", None) is real_find_tool:
+            module.find_tool = lambda name: TOOL_PREFIX + name
+
+
+# --- Running and comparing ----------------------------------------------------------
+
+def _union(intervals):
+    # Total length covered by (start, end) intervals, so parallel calls aren't counted twice.
+    total, reach = 0.0, None
+    for start, end in sorted(intervals):
+        if reach is None or start > reach:
+            total += end - start
+            reach = end
+        elif end > reach:
+            total += end - reach
+            reach = end
+    return total
+
+
+def summarize_stages(records):
+    stages = {}
+    for stage in sorted({r["stage"] for r in records}):
+        calls = [r for r in records if r["stage"] == stage]
+        cpus = [r["cpu"] for r in calls if r["cpu"] is not None]
+        rss = [r["rss"] for r in calls if r["rss"] is not None]
+        stages[stage] = {
+            "calls": len(calls),
+            "wall": _union([(r["start"], r["end"]) for r in calls]),
+            "cpu": sum(cpus) if cpus else None,
+            "rss": max(rss) if rss else None,
+            "bytes": sum(r["bytes"] for r in calls),
+        }
+    return stages
+
+
+def run_scenario(name, seconds, work_dir, stats_path, log_func):
+    """
+    Runs one scenario on the bench://<seconds> media in a fresh output directory.
+    Returns its measurements.
+    """
+    out_dir = tempfile.mkdtemp(prefix=f"{name}-{seconds}-", dir=work_dir)
+    open(stats_path, "w").close()
+    statuses = []
+    cpu_started, started = time.process_time(), time.perf_counter()
+    _scenarios()[name](f"{URL_SCHEME}{seconds}", out_dir, seconds,
+                       (log_func, statuses.append, lambda *args: None))
+    wall = time.perf_counter() - started
+    app_cpu = time.process_time() - cpu_started
+    outputs = [os.path.getsize(os.path.join(out_dir, n)) for n in os.listdir(out_dir) if not n.startswith(".")]
+    with open(stats_path, "r", encoding="utf-8") as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    shutil.rmtree(out_dir, ignore_errors=True)
+    stages = summarize_stages(records)
+    tool_cpu = [s["cpu"] for s in stages.values() if s["cpu"] is not None]
+    return {
+        "ok": bool(outputs),
+        "status": statuses[-1] if statuses else "",
+        "wall": wall,
+        "app_cpu": app_cpu,
+        "cpu": app_cpu + sum(tool_cpu),
+        "rss": max([s["rss"] for s in stages.values() if s["rss"] is not None], default=None),
+        "bytes": sum(s["bytes"] for s in stages.values()),
+        "output_bytes": sum(outputs),
+        "stages": stages,
+    }
+
+
+def run_bandwidth(seconds, args, work_dir, log_func):
+    """
+    Downloads bench://<seconds> (full video) with args.batch_jobs batch jobs and, starting
+    args.interactive_after seconds later, one interactive job, all through the job queue
+    and the ThrottledServer. Samples the combined and per-job download speeds twice a
+    second until every job has finished. Returns the measurements.
+    """
+    import processing_gui
+    from jobqueue import DONE, FINISHED_STATES, JobQueue
+
+    out_dir = os.path.join(work_dir, "bandwidth")
+    restarts = []
+
+    def log(message):
+        if "Bandwidth share changed" in message:
+            restarts.append(message)
+        log_func(message)
+
+    def params(name, priority):
+        return {"url": f"{URL_SCHEME}{seconds}", "media": "Video", "mode": "Full", "output_name": name,
+                "out_dir": out_dir, "priority": priority}
+
+    slots = args.batch_jobs + 1
+    queue = JobQueue(processing_gui.run_job, log, max_jobs=slots, max_downloads=slots, max_encodes=slots)
+    jobs = [queue.submit(params(f"batch{i + 1}", "batch")) for i in range(args.batch_jobs)]
+    interactive = None
+    samples = []
+    started = time.monotonic()
+    while interactive is None or not all(job.state in FINISHED_STATES for job in jobs):
+        if interactive is None and time.monotonic() - started >= args.interactive_after:
+            interactive = queue.submit(params("interactive", "interactive"))
+            jobs.append(interactive)
+        samples.append((queue.throughput(), interactive.current_speed if interactive else 0.0,
+                        [job.current_speed for job in jobs if not job.interactive and job.current_speed]))
+        time.sleep(0.5)
+
+    busy = [sample for sample in samples if sample[0]]
+    with_interactive = [sample for sample in busy if sample[1]]
+    return {
+        "ok": all(job.state == DONE for job in jobs),
+        "aggregate": statistics.mean(s[0] for s in busy) if busy else 0.0,
+        "peak": max((s[0] for s in busy), default=0.0),
+        "over_budget": (sum(1 for s in busy if s[0] > args.budget * 1000 * 1000 / 8 * 1.1) / len(busy)
+                        if busy and args.budget else None),
+        "interactive": statistics.mean(s[1] for s in with_interactive) if with_interactive else 0.0,
+        "interactive_share": (statistics.mean(s[1] / s[0] for s in with_interactive)
+                              if with_interactive else 0.0),
+        "batch_meanwhile": statistics.mean(statistics.mean(s[2]) for s in with_interactive if s[2])
+        if any(s[2] for s in with_interactive) else 0.0,
+        "interactive_seconds": interactive.elapsed if interactive else None,
+        "seconds": time.monotonic() - started,
+        "restarts": len(restarts),
+    }
+
+
+def print_bandwidth(result, args, out=sys.stdout):
+    from bandwidth import format_rate
+    mbit = 1000 * 1000 / 8
+    budget = format_rate(args.budget * mbit) if args.budget else "none"
+    print(f"Bandwidth: budget {budget}, link {format_rate(args.link * mbit)}, "
+          f"{format_rate(args.per_connection * mbit)} per connection", file=out)
+    over = f", over budget (+10%) {result['over_budget'] * 100:.0f}% of the time" \
+        if result["over_budget"] is not None else ""
+    print(f"  combined     mean {format_rate(result['aggregate'])}, peak {format_rate(result['peak'])}{over}",
+          file=out)
+    print(f"  interactive  mean {format_rate(result['interactive'])} "
+          f"({result['interactive_share'] * 100:.0f}% of the combined speed; batch jobs "
+          f"{format_rate(result['batch_meanwhile'])} each meanwhile), "
+          f"done in {result['interactive_seconds'] or 0:.1f}s", file=out)
+    print(f"  {result['restarts']} restarts, all jobs done in {result['seconds']:.1f}s"
+          + ("" if result["ok"] else "  FAILED"), file=out)
+
+
+def _median(values):
+    values = [v for v in values if v is not None]
+    return statistics.median(values) if values else None
+
+
+def combine_runs(runs):
+    """
+    Merges repeated runs of a scenario: median times, maximum RSS, bytes of the last run.
+    """
+    last = runs[-1]
+    combined = dict(last, ok=all(r["ok"] for r in runs), wall=_median([r["wall"] for r in runs]),
+                    app_cpu=_median([r["app_cpu"] for r in runs]), cpu=_median([r["cpu"] for r in runs]),
+                    rss=max([r["rss"] for r in runs if r["rss"] is not None], default=None))
+    combined["stages"] = {}
+    for stage, values in last["stages"].items():
+        samples = [r["stages"].get(stage) for r in runs if stage in r["stages"]]
+        combined["stages"][stage] = dict(
+            values, wall=_median([s["wall"] for s in samples]), cpu=_median([s["cpu"] for s in samples]),
+            rss=max([s["rss"] for s in samples if s["rss"] is not None], default=None))
+    return combined
+
+
+def _format_metrics(result):
+    cpu = f"{result['cpu']:.2f}s" if result.get("cpu") is not None else "-"
+    rss = format_size(result["rss"]) if result.get("rss") else "-"
+    return f"wall {result['wall']:7.2f}s  cpu {cpu:>8}  peak {rss:>9}  written {format_size(result['bytes']):>9}"
+
+
+def print_results(results, out=sys.stdout):
+    for key, result in results.items():
+        print(f"{key:<18} {_format_metrics(result)}{'' if result['ok'] else '  FAILED: ' + result['status']}",
+              file=out)
+        for stage, values in result["stages"].items():
+            print(f"  {stage:<16} {_format_metrics(values)}  ({values['calls']} calls)", file=out)
+
+
+# Metrics compared with the baseline (all "lower is better").
+COMPARED_METRICS = ["wall", "cpu", "rss", "bytes"]
+
+
+def compare(results, baseline, tolerance, out=sys.stdout):
+    """
+    Prints the change of each metric against baseline results and returns the list of
+    regressions (metric worse by more than tolerance percent, or a scenario that now fails).
+    """
+    regressions = []
+    for key, result in results.items():
+        old = baseline.get(key)
+        if old is None:
+            print(f"{key:<18} (not in baseline)", file=out)
+            continue
+        changes = []
+        for metric in COMPARED_METRICS:
+            before, after = old.get(metric), result.get(metric)
+            if not before or after is None:
+                continue
+            change = (after - before) / before * 100
+            flag = ""
+            if change > tolerance:
+                flag = " !"
+                regressions.append(f"{key} {metric} {change:+.1f}%")
+            changes.append(f"{metric} {change:+6.1f}%{flag}")
+        if old.get("ok") and not result["ok"]:
+            regressions.append(f"{key} failed")
+        print(f"{key:<18} " + "  ".join(changes), file=out)
+    return regressions
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Offline benchmark of the processing modes.")
+    parser.add_argument("--lengths", default=",".join(map(str, DEFAULT_LENGTHS)),
+                        help="comma-separated test media lengths in seconds (default: %(default)s)")
+    parser.add_argument("--only", default=",".join(SCENARIO_NAMES),
+                        help="comma-separated scenarios to run (default: all)")
+    parser.add_argument("--repeat", type=int, default=1, help="runs per scenario; medians are reported")
+    parser.add_argument("--rate", type=float, default=0,
+                        help="simulated download bandwidth in MB/s (default: unlimited)")
+    parser.add_argument("--set", action="append", default=[], metavar="KEY=VALUE",
+                        help="config.json setting for the run (value parsed as JSON), e.g. chunked_encode=false")
+    parser.add_argument("--save", help="write the results to this JSON file (e.g. a new baseline)")
+    parser.add_argument("--baseline", help="compare against results saved with --save")
+    parser.add_argument("--tolerance", type=float, default=10.0,
+                        help="allowed slowdown/growth in percent before a metric counts as a regression")
+    parser.add_argument("--bandwidth", action="store_true",
+                        help="check the bandwidth controller against a throttled local HTTP server "
+                             "(uses the longest of --lengths)")
+    parser.add_argument("--budget", type=float, default=40,
+                        help="bandwidth budget in Mbit/s for --bandwidth (0 = controller off; default: %(default)s)")
+    parser.add_argument("--link", type=float, default=80,
+                        help="capacity of the simulated uplink in Mbit/s (default: %(default)s)")
+    parser.add_argument("--per-connection", type=float, default=16,
+                        help="simulated per-connection limit of the server in Mbit/s (default: %(default)s)")
+    parser.add_argument("--batch-jobs", type=int, default=3, help="batch jobs for --bandwidth (default: %(default)s)")
+    parser.add_argument("--interactive-after", type=float, default=5,
+                        help="seconds before the interactive job starts (default: %(default)s)")
+    parser.add_argument("-v", "--verbose", action="store_true", help="print the engine's log output")
+    return parser
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ["--ytdlp"]:
+        return ytdlp_main(argv[1:])
+    if argv[:1] == ["--exec"]:
+        return exec_tool(argv[1], argv[2:])
+
+    args = build_parser().parse_args(argv)
+    lengths = [int(x) for x in args.lengths.split(",") if x.strip()]
+    names = [n.strip() for n in args.only.split(",") if n.strip()]
+    unknown = [n for n in names if n not in SCENARIO_NAMES]
+    if unknown:
+        build_parser().error("unknown scenario(s): " + ", ".join(unknown))
+    settings = dict(BENCH_CONFIG)
+    if args.bandwidth:
+        # Jobs run through run_job here; keep their traces out of the app's history.
+        settings.update(bandwidth_budget_mbit=args.budget, trace_dir="", trace_history="")
+    for item in args.set:
+        key, _, value = item.partition("=")
+        try:
+            settings[key.strip()] = json.loads(value)
+        except ValueError:
+            settings[key.strip()] = value
+
+    for seconds in lengths:
+        generate_media(seconds, log_func=lambda line: print(line, file=sys.stderr))
+
+    work_dir = tempfile.mkdtemp(prefix="ytcutter-bench-")
+    try:
+        import config
+        config_path = os.path.join(work_dir, "config.json")
+        with open(config_path, "w", encoding="utf-8") as f:
+            json.dump(settings, f)
+        config.CONFIG_PATH = config_path
+        os.environ[MEDIA_ENV] = MEDIA_DIR
+        os.environ[STATS_ENV] = os.path.join(work_dir, "stats.jsonl")
+        os.environ[RATE_ENV] = str(args.rate * 1024 * 1024)
+        _scenarios()  # import the engine before patching its find_tool
+        _install_wrapper()
+
+        log_func = (lambda line: print(line, file=sys.stderr)) if args.verbose else (lambda line: None)
+        if args.bandwidth:
+            mbit = 1000 * 1000 / 8
+            with ThrottledServer(MEDIA_DIR, args.link * mbit, args.per_connection * mbit) as server:
+                os.environ[HTTP_ENV] = server.url
+                result = run_bandwidth(max(lengths), args, work_dir, log_func)
+            print_bandwidth(result, args)
+            limit = args.budget * mbit * (1 + args.tolerance / 100)
+            return 0 if result["ok"] and (not args.budget or result["aggregate"] <= limit) else 1
+        results = {}
+        for seconds in lengths:
+            for name in names:
+                key = f"{name}/{seconds}s"
+                print(f"Running {key}...", file=sys.stderr)
+                runs = [run_scenario(name, seconds, work_dir, os.environ[STATS_ENV], log_func)
+                        for _ in range(max(args.repeat, 1))]
+                results[key] = combine_runs(runs)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print_results(results)
+    report = {
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "machine": {"platform": platform.platform(), "python": platform.python_version(),
+                    "cpu_count": os.cpu_count()},
+        "repeat": args.repeat,
+        "rate": args.rate,
+        "settings": settings,
+        "results": results,
+    }
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results saved to {args.save}", file=sys.stderr)
+
+    failed = [key for key, result in results.items() if not result["ok"]]
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("machine", {}).get("cpu_count") != os.cpu_count():
+            print("Warning: the baseline was recorded on a machine with a different core count.", file=sys.stderr)
+        print(f"\nChange against {args.baseline} (baseline from {baseline.get('created', '?')}):")
+        regressions = compare(results, baseline.get("results", {}), args.tolerance)
+        if regressions:
+            print("\nRegressions: " + "; ".join(regressions))
+            return 1
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
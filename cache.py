@@ -0,0 +1,145 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import threading
+from utils import format_size
+
+
+def link_or_copy(src, dst):
+    """
+    Hard-links src to dst when both are on the same filesystem, otherwise copies it.
+    An existing dst is replaced (nothing happens if it already is src).
+    """
+    if os.path.exists(dst) and os.path.samefile(src, dst):
+        return
+    # Linked or copied under a temporary name first, since neither can overwrite dst.
+    tmp = f"{dst}.{os.getpid()}-{threading.get_ident()}.tmp"
+    try:
+        try:
+            os.link(src, tmp)
+        except OSError:
+            shutil.copy2(src, tmp)
+        os.replace(tmp, dst)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+class SourceCache:
+    """
+    Persistent cache of downloaded source media, keyed by extractor, media ID and format
+    selection. Entries are tracked in index.json inside the cache directory and the least
+    recently used ones are evicted once the total size exceeds max_bytes. Files derived
+    from an entry and named "<entry file>.<suffix>" (e.g. smartcut's keyframe index)
+    are removed with it.
+    """
+
+    def __init__(self, cache_dir, max_bytes):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.index_path = os.path.join(cache_dir, "index.json")
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        self._index = self._load_index()
+
+    @staticmethod
+    def make_key(info, format_args):
+        """
+        Builds the cache key for a yt-dlp info dict and the format-related download arguments.
+        """
+        return "|".join([info.get("extractor_key") or info.get("extractor") or "?",
+                         str(info.get("id")), " ".join(format_args)])
+
+    def _load_index(self):
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        # Drop entries whose file was removed behind our back.
+        return {k: v for k, v in index.items()
+                if os.path.isfile(os.path.join(self.cache_dir, v["file"]))}
+
+    def _save_index(self):
+        tmp = self.index_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._index, f, indent=1)
+        os.replace(tmp, self.index_path)
+
+    def lookup(self, key):
+        """
+        Returns the cached file for key (marking it as recently used), or None on a miss.
+        """
+        with self._lock:
+            entry = self._index.get(key)
+            path = os.path.join(self.cache_dir, entry["file"]) if entry else None
+            if not path or not os.path.isfile(path):
+                self._index.pop(key, None)
+                self.misses += 1
+                return None
+            entry["last_used"] = time.time()
+            self.hits += 1
+            self.bytes_saved += entry["size"]
+            self._save_index()
+            return path
+
+    def contains(self, key):
+        """
+        Returns True if key is cached, without touching the statistics or LRU order.
+        """
+        with self._lock:
+            entry = self._index.get(key)
+            return bool(entry) and os.path.isfile(os.path.join(self.cache_dir, entry["file"]))
+
+    def store(self, key, path):
+        """
+        Adds the downloaded file at path to the cache as a hard link (path itself is left
+        in place) and evicts least recently used entries beyond max_bytes. Returns the
+        cached path, or None if the file alone is larger than the cache or can't be
+        linked (e.g. it is on another filesystem, where storing it would mean a full copy).
+        """
+        ext = os.path.splitext(path)[1]
+        name = hashlib.sha1(key.encode("utf-8")).hexdigest() + ext
+        cached = os.path.join(self.cache_dir, name)
+        with self._lock:
+            if os.path.exists(cached):
+                self._remove_files(name)
+            try:
+                os.link(path, cached)
+            except OSError:
+                self._index.pop(key, None)
+                return None
+            self._index[key] = {"file": name, "size": os.path.getsize(cached), "last_used": time.time()}
+            self._evict()
+            self._save_index()
+        return cached if key in self._index else None
+
+    def _evict(self):
+        total = sum(entry["size"] for entry in self._index.values())
+        for key, entry in sorted(self._index.items(), key=lambda item: item[1]["last_used"]):
+            if total <= self.max_bytes:
+                break
+            self._remove_files(entry["file"])
+            total -= entry["size"]
+            del self._index[key]
+
+    def _remove_files(self, name):
+        # Removes the cached file name and the files derived from it.
+        for other in os.listdir(self.cache_dir):
+            if other == name or other.startswith(name + "."):
+                try:
+                    os.remove(os.path.join(self.cache_dir, other))
+                except OSError:
+                    pass
+
+    def stats(self):
+        """
+        Returns a one-line summary of hits, misses and bytes saved.
+        """
+        return f"Cache: {self.hits} hits, {self.misses} misses, {format_size(self.bytes_saved)} saved"
@@ -0,0 +1,101 @@
+import os
+from progress import FFMPEG_PROGRESS_ARGS, FfmpegProgressParser
+from utils import find_tool, safe_filename
+import tracing
+
+# Muxer for each output extension; the segment muxer can't guess it from the file pattern.
+SEGMENT_FORMATS = {
+    ".mp4": "mp4", ".m4a": "mp4", ".mp3": "mp3", ".opus": "opus", ".ogg": "ogg", ".flac": "flac", ".mka": "matroska",
+}
+
+# Split times closer than this (seconds) to a chapter boundary or the end count as equal.
+_EPSILON = 0.05
+
+
+def chapter_list(info):
+    """
+    Returns the chapters of a yt-dlp info dict as (start, end, title) tuples in seconds,
+    sorted and without overlaps. end is None for a last chapter running to the end of
+    unknown length. Returns [] if the media has no chapters.
+    """
+    duration = info.get("duration")
+    chapters = []
+    raw = sorted(info.get("chapters") or [], key=lambda c: c.get("start_time") or 0)
+    for number, chapter in enumerate(raw, 1):
+        start = float(chapter.get("start_time") or 0)
+        end = chapter.get("end_time")
+        end = float(end) if end is not None else duration
+        if chapters and (chapters[-1][1] is None or chapters[-1][1] > start):
+            chapters[-1] = (chapters[-1][0], start, chapters[-1][2])
+        if end is not None and end - start < _EPSILON:
+            continue
+        title = (chapter.get("title") or "").strip() or f"Chapter {number}"
+        chapters.append((start, end, title))
+    return chapters
+
+
+def segment_plan(chapters, duration=None):
+    """
+    Translates chapters into split times for ffmpeg's segment muxer. Returns (times, keep):
+    keep has one entry per resulting segment, the index of the chapter it holds or None
+    for a gap (before the first chapter or between chapters) that is thrown away.
+    """
+    times, keep = [], []
+    position = 0.0
+    for index, (start, end, _) in enumerate(chapters):
+        if start > position + _EPSILON:
+            times.append(start)
+            keep.append(None)
+        keep.append(index)
+        if end is None:
+            return times, keep
+        times.append(end)
+        position = end
+    if duration is not None and times and times[-1] >= duration - _EPSILON:
+        times.pop()
+    else:
+        keep.append(None)
+    return times, keep
+
+
+def chapter_filename(base, number, title, ext, width=2):
+    """
+    Output name for a chapter, e.g. "mix_03 - Track title.mp3".
+    """
+    return f"{base}_{number:0{width}d} - {safe_filename(title, f'Chapter {number}')}{ext}"
+
+
+@tracing.traced("split")
+def split_chapters(src, chapters, work_dir, ext, codec_args, log_func, run_command, progress_func=None,
+                   duration=None):
+    """
+    Writes every chapter of src into work_dir in a single ffmpeg pass: the input is read
+    once and the segment muxer starts a new file at each chapter boundary. codec_args
+    select streams and codecs; with stream copy, video segments start on the first
+    keyframe at or after the boundary. Returns [(chapter index, path)] for the chapters
+    written, or [] if ffmpeg failed.
+    """
+    times, keep = segment_plan(chapters, duration)
+    # "%" in the directory would be read as part of the number pattern.
+    pattern = os.path.join(work_dir.replace("%", "%%"), "chapter_%03d" + ext)
+    segment_format = SEGMENT_FORMATS.get(ext, "matroska")
+    cmd = [find_tool("ffmpeg"), "-v", "error", *FFMPEG_PROGRESS_ARGS, "-y", "-i", src, *codec_args,
+           "-f", "segment", "-segment_format", segment_format, "-reset_timestamps", "1"]
+    if segment_format == "mp4":
+        cmd += ["-segment_format_options", "movflags=+faststart"]
+    if times:
+        cmd += ["-segment_times", ",".join(f"{t:.3f}" for t in times)]
+    cmd.append(pattern)
+    if run_command(cmd, log_func, progress_func, FfmpegProgressParser(duration)).returncode != 0:
+        return []
+
+    written = []
+    for segment, index in enumerate(keep):
+        path = pattern % segment
+        if not os.path.exists(path):
+            continue
+        if index is None:
+            os.remove(path)
+        else:
+            written.append((index, path))
+    return written
@@ -0,0 +1,114 @@
+import os
+import bisect
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import jobqueue
+import tracing
+from progress import FFMPEG_PROGRESS_ARGS, FfmpegProgressParser, ProgressEvent
+from smartcut import keyframe_index, media_duration
+from utils import find_tool
+
+
+def plan_chunks(keyframes, start, end, count):
+    """
+    Splits start..end into up to count consecutive (a, b) ranges of similar length whose
+    inner boundaries sit on keyframes, so every chunk can be seeked to exactly and cheaply.
+    Returns a single range if no usable keyframes lie inside.
+    """
+    bounds = [start]
+    step = (end - start) / count
+    for i in range(1, count):
+        target = start + i * step
+        j = bisect.bisect_left(keyframes, target)
+        # Nearest keyframe to the ideal split point.
+        candidates = [k for k in keyframes[max(j - 1, 0):j + 1] if bounds[-1] < k < end]
+        if candidates:
+            k = min(candidates, key=lambda k: abs(k - target))
+            if k > bounds[-1]:
+                bounds.append(k)
+    bounds.append(end)
+    return list(zip(bounds, bounds[1:]))
+
+
+def chunk_count(clip_seconds, cores, min_chunk_seconds):
+    """
+    Number of chunks to encode clip_seconds in: one per core, but no chunk shorter than
+    min_chunk_seconds (a process per few seconds of video costs more than it saves).
+    """
+    return max(1, min(cores, int(clip_seconds // min_chunk_seconds)))
+
+
+def chunked_encode(src, start, end, destination, video_args, audio_args, log_func, run_command, chunks,
+                   progress_func=None):
+    """
+    Encodes start..end (seconds, end may be None) of src into destination as `chunks`
+    keyframe-aligned pieces in parallel, one ffmpeg process per piece with an equal share
+    of the cores, then joins the pieces with the concat demuxer (video copied, audio
+    encoded once over the whole range with audio_args). Per-piece progress is combined
+    into one length-weighted fraction for progress_func.
+    Returns True on success, False if the caller should fall back to a single encode.
+    """
+    try:
+        if end is None:
+            end = media_duration(src)
+        ranges = plan_chunks(keyframe_index(src, log_func), start, end, chunks)
+    except (OSError, RuntimeError, ValueError, KeyError) as e:
+        log_func("Chunked encode unavailable: " + str(e))
+        return False
+    if len(ranges) < 2:
+        log_func("Chunked encode: not enough keyframes to split the range, using a single encode.")
+        return False
+
+    cores = os.cpu_count() or 1
+    threads = max(1, cores // len(ranges))
+    log_func(f"Chunked encode: {len(ranges)} chunks in parallel, {threads} threads each.")
+
+    ffmpeg = find_tool("ffmpeg")
+    lengths = [b - a for a, b in ranges]
+    fractions = [0.0] * len(ranges)
+    lock = threading.Lock()
+    work_dir = tempfile.mkdtemp(prefix="chunks-", dir=os.path.dirname(os.path.abspath(destination)))
+
+    def encode_chunk(index, a, b):
+        piece = os.path.join(work_dir, f"chunk_{index:04d}.ts")
+
+        def chunk_progress(event):
+            with lock:
+                fractions[index] = event.fraction or 0.0
+                overall = sum(f * l for f, l in zip(fractions, lengths)) / sum(lengths)
+            if progress_func:
+                progress_func(ProgressEvent("encode", fraction=overall))
+
+        cmd = [ffmpeg, "-v", "error", *FFMPEG_PROGRESS_ARGS, "-y", "-ss", f"{a}", "-i", src, "-t", f"{b - a}",
+               "-map", "0:v:0", "-an", *video_args, "-threads", str(threads),
+               "-bsf:v", "h264_mp4toannexb", "-f", "mpegts", piece]
+        ok = run_command(cmd, log_func, chunk_progress, FfmpegProgressParser(b - a)).returncode == 0
+        return piece if ok and os.path.exists(piece) else None
+
+    try:
+        with ThreadPoolExecutor(max_workers=len(ranges)) as pool:
+            pieces = list(pool.map(jobqueue.bind(encode_chunk), range(len(ranges)), *zip(*ranges)))
+        if not all(pieces):
+            log_func("Chunked encode: a chunk failed.")
+            return False
+
+        concat_list = os.path.join(work_dir, "chunks.txt")
+        with open(concat_list, "w", encoding="utf-8") as f:
+            for piece in pieces:
+                f.write("file '" + piece.replace("'", "'\\''") + "'\n")
+
+        cmd = [ffmpeg, "-v", "error", "-y",
+               "-f", "concat", "-safe", "0", "-i", concat_list,
+               "-ss", f"{start}", "-t", f"{end - start}", "-i", src,
+               "-map", "0:v:0", "-map", "1:a:0?", "-c:v", "copy", *audio_args,
+               "-movflags", "+faststart", destination]
+        with tracing.span("join"):
+            joined = run_command(cmd, log_func).returncode == 0
+        if not joined or not os.path.exists(destination):
+            log_func("Chunked encode: failed to join chunks.")
+            return False
+        return True
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
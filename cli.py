@@ -0,0 +1,213 @@
+"""
+Headless command-line front end for yt-cutter-gui. Runs the same processing engine as
+the GUI through the job queue, without Tk/customtkinter.
+
+    python cli.py URL [--media video|audio] [--mode full|cut|chapters] [--start 1:00] [--end 1:30] [--name clip]
+    python cli.py --batch jobs.csv          (or jobs.jsonl)
+    python cli.py PLAYLIST_URL --playlist   (one job per playlist/channel entry)
+    python cli.py --history                 (median stage timings of recent jobs)
+
+Batch files contain url, mode, media, start, end, name (and optionally audio_format, profile, max_height, priority) columns (CSV with a header row,
+or one JSON object per line). One JSON result per job is written to stdout; log output
+goes to stderr.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import threading
+import time
+
+from config import load_config
+from jobqueue import DONE, JobQueue
+from tracing import history_path, history_report, load_history
+from playlist import item_params
+from processing_gui import probe_playlist, run_job
+from utils import current_dir, format_size, parse_ranges
+
+
+def _normalize(row, defaults):
+    """
+    Turns one batch row or the command-line arguments into run_job parameters.
+    """
+    mode = (row.get("mode") or defaults["mode"]).strip().capitalize()
+    media = (row.get("media") or defaults["media"]).strip().capitalize()
+    if mode not in ("Full", "Cut", "Chapters"):
+        raise ValueError(f"unknown mode '{mode}'")
+    if media not in ("Video", "Audio"):
+        raise ValueError(f"unknown media '{media}'")
+    url = (row.get("url") or "").strip()
+    if not url:
+        raise ValueError("missing url")
+    params = {
+        "url": url,
+        "mode": mode,
+        "media": media,
+        "output_name": (row.get("name") or row.get("output_name") or "output").strip(),
+        "out_dir": row.get("out_dir") or defaults["out_dir"],
+        "priority": (row.get("priority") or defaults["priority"]).strip().lower(),
+    }
+    if params["priority"] not in ("interactive", "batch"):
+        raise ValueError(f"unknown priority '{params['priority']}'")
+    if media == "Audio":
+        audio_format = (row.get("audio_format") or defaults["audio_format"]).strip().lower()
+        if audio_format not in ("mp3", "m4a", "opus", "original"):
+            raise ValueError(f"unknown audio format '{audio_format}'")
+        params["audio_format"] = audio_format
+    else:
+        max_height = str(row.get("max_height") or defaults["max_height"] or "").strip()
+        if max_height:
+            if not max_height.isdigit():
+                raise ValueError(f"invalid max_height '{max_height}'")
+            params["max_height"] = int(max_height)
+    if mode == "Cut":
+        ranges = row.get("ranges") or ""
+        if isinstance(ranges, list):
+            ranges = ";".join(ranges)
+        params.update(
+            start=str(row.get("start") or "").strip(),
+            end=str(row.get("end") or "").strip(),
+            ranges=parse_ranges(ranges.replace(";", "\n")),
+            section_only=defaults["section_only"],
+            smart=defaults["smart"],
+            profile=(row.get("profile") or defaults["profile"] or "").strip() or None,
+        )
+    return params
+
+
+def read_batch(path):
+    """
+    Returns the rows of a CSV (with header) or JSONL batch file as dicts.
+    """
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        if path.lower().endswith((".jsonl", ".json")):
+            return [json.loads(line) for line in f if line.strip()]
+        return list(csv.DictReader(f))
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Download and cut media with yt-dlp and ffmpeg (headless).")
+    parser.add_argument("url", nargs="?", help="media URL (omit when using --batch)")
+    parser.add_argument("--batch", help="CSV or JSONL file with url,mode,media,start,end,name rows")
+    parser.add_argument("--media", default="video", help="video or audio (default: video)")
+    parser.add_argument("--audio-format", default="mp3",
+                        help="mp3, m4a, opus or original (keep the source codec, no re-encode)")
+    parser.add_argument("--mode", default=None,
+                        help="full, cut or chapters (split into the source's chapters; "
+                             "default: cut if --start/--end/--ranges given)")
+    parser.add_argument("--start", default="", help="cut start (SS, MM:SS or HH:MM:SS)")
+    parser.add_argument("--end", default="", help="cut end")
+    parser.add_argument("--ranges", default="", help="several ranges separated by ';', e.g. '0:10-0:20;1:00-1:30'")
+    parser.add_argument("--name", default="output", help="output name (without extension)")
+    parser.add_argument("--out-dir", default=current_dir, help="output directory")
+    parser.add_argument("--profile", help="encoding profile for video cuts: auto, fast-preview, balanced, archive "
+                                          "or one from config.json (default from config.json)")
+    parser.add_argument("--max-height", type=int, help="highest video resolution to download, e.g. 720 "
+                                                     "(default from config.json)")
+    parser.add_argument("--smart", action="store_true", help="smart cut (re-encode only the edges)")
+    parser.add_argument("--full-download", action="store_true", help="download the whole media before cutting")
+    parser.add_argument("--playlist", action="store_true",
+                        help="treat the URL (or each batch URL) as a playlist or channel and run one job per entry")
+    parser.add_argument("--priority", default="batch",
+                        help="interactive or batch (default): interactive jobs start first and get a larger "
+                             "share of bandwidth_budget_mbit")
+    parser.add_argument("--workers", type=int, help="jobs run at once (default from config.json)")
+    parser.add_argument("--history", action="store_true",
+                        help="print median stage timings of recent jobs from the trace history and exit")
+    parser.add_argument("-q", "--quiet", action="store_true", help="do not print log output")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.history:
+        entries = load_history(history_path()) if history_path() else []
+        print("\n".join(history_report(entries)) if entries else "No trace history yet.")
+        return 0
+    if not args.url and not args.batch:
+        build_parser().error("a URL or --batch file is required")
+
+    defaults = {
+        "mode": args.mode or ("cut" if (args.start or args.end or args.ranges) else "full"),
+        "media": args.media,
+        "audio_format": args.audio_format,
+        "out_dir": args.out_dir,
+        "section_only": not args.full_download,
+        "smart": args.smart,
+        "profile": args.profile,
+        "max_height": args.max_height,
+        "priority": args.priority,
+    }
+    rows = read_batch(args.batch) if args.batch else [{
+        "url": args.url, "start": args.start, "end": args.end, "ranges": args.ranges, "name": args.name,
+    }]
+
+    log_lock = threading.Lock()
+
+    def log(message):
+        if not args.quiet:
+            with log_lock:
+                print(message, file=sys.stderr, flush=True)
+
+    config = load_config()
+    queue = JobQueue(
+        run_job,
+        log,
+        max_jobs=args.workers or config["max_jobs"],
+        max_downloads=config["max_downloads"],
+        max_encodes=config["max_encodes"],
+    )
+
+    jobs, failures = [], 0
+    for number, row in enumerate(rows, 1):
+        try:
+            params = _normalize(row, defaults)
+        except ValueError as e:
+            print(json.dumps({"row": number, "state": "failed", "error": str(e)}), flush=True)
+            failures += 1
+            continue
+        os.makedirs(params["out_dir"], exist_ok=True)
+        if not args.playlist:
+            jobs.append(queue.submit(params))
+            continue
+        items = probe_playlist(params["url"], log)
+        if not items:
+            print(json.dumps({"row": number, "state": "failed", "error": "no playlist items found"}), flush=True)
+            failures += 1
+            continue
+        log(f"Playlist {params['url']}: {len(items)} items.")
+        jobs.extend(queue.submit(item) for item in item_params(params, items))
+
+    started = time.time()
+    try:
+        queue.wait()
+    except KeyboardInterrupt:
+        # The tools run in process groups of their own and don't see the Ctrl+C.
+        log("Interrupted, cancelling jobs...")
+        queue.cancel_all()
+        queue.wait()
+    for job in jobs:
+        if job.state != DONE:
+            failures += 1
+        print(json.dumps({
+            "job": job.id,
+            "url": job.params["url"],
+            "mode": job.params["mode"],
+            "media": job.params["media"],
+            "name": job.params["output_name"],
+            "state": job.state,
+            "result": job.result,
+            "error": job.error or (None if job.state == DONE else job.status),
+            "seconds": round(job.elapsed or 0, 3),
+            "timing": job.timing,
+        }), flush=True)
+    downloaded = sum(job.downloaded_bytes for job in jobs)
+    elapsed = time.time() - started
+    if downloaded and elapsed > 0:
+        log(f"Downloaded {format_size(downloaded)} in {elapsed:.0f}s ({format_size(downloaded / elapsed)}/s overall).")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
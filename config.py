@@ -0,0 +1,98 @@
+import os
+import json
+from utils import current_dir
+
+# User settings live next to the application; missing keys fall back to DEFAULTS.
+CONFIG_PATH = os.path.join(current_dir, "config.json")
+
+DEFAULTS = {
+    # Job queue: total jobs running at once, and how many of them may be
+    # downloading (network-bound) or encoding (CPU-bound) at the same time.
+    "max_jobs": 3,
+    "max_downloads": 2,
+    "max_encodes": 1,
+    # Source media cache: downloaded sources are kept (keyed by extractor, ID and
+    # format selection) so repeated cuts of the same media skip the download.
+    # An empty cache_dir means "cache/sources" next to the application. Sources are
+    # hard-linked into the cache, so it must be on the same drive as the output folder;
+    # otherwise nothing is cached.
+    "cache_enabled": True,
+    "cache_dir": "",
+    "cache_max_gb": 10,
+    # yt-dlp metadata (info JSON) is cached per URL for probe_cache_ttl seconds and
+    # reused by the download via --load-info-json (0 disables the cache).
+    "probe_cache_ttl": 1800,
+    # Format planner: download the smallest streams that meet max_height / max_fps
+    # (0 = no limit) and preferred_vcodec (e.g. "avc1", "" = any), favouring codecs the
+    # output container holds without re-encoding.
+    "format_planner": True,
+    "max_height": 0,
+    "max_fps": 0,
+    "preferred_vcodec": "",
+    # "subprocess" runs yt-dlp.exe per download; "library" keeps yt-dlp loaded
+    # in-process (requires the yt_dlp package) to skip its start-up cost per job.
+    "ytdlp_backend": "subprocess",
+    # The log panel keeps the last log_max_lines lines; everything is also
+    # appended to log_file (relative to the application folder, "" to disable). Above
+    # log_file_max_mb the file is moved to "<log_file>.1" and a new one is started.
+    "log_max_lines": 2000,
+    "log_file": "yt-cutter.log",
+    "log_file_max_mb": 5,
+    # Stream single-file (progressive HTTP) sources from yt-dlp straight into ffmpeg for
+    # cuts starting within stream_max_start seconds, so download and encode overlap and
+    # no input file is written. Later starts use a section download instead.
+    "stream_cuts": True,
+    "stream_max_start": 60,
+    # Encoding profile for re-encoded video cuts: "auto" (picked from clip length and
+    # core count), "fast-preview", "balanced", "archive" or one defined below.
+    # encoding_profiles overrides/adds profiles, e.g. {"archive": {"crf": 16}}.
+    "encoding_profile": "auto",
+    "encoding_profiles": {},
+    # Long re-encoded cuts are split at keyframes into one chunk per core (each at least
+    # chunk_min_seconds long), encoded in parallel and joined with the concat demuxer.
+    "chunked_encode": True,
+    "chunk_min_seconds": 60,
+    # Every job is traced (stage and process timings, CPU time, bytes): the trace is saved
+    # to trace_dir in Chrome trace format and summarized into the rolling trace_history
+    # file (last trace_history_max jobs). Paths are relative to the application folder;
+    # "" disables either. trace_dir keeps the newest trace_max_files traces.
+    "trace_dir": "traces",
+    "trace_max_files": 200,
+    "trace_history": "trace-history.jsonl",
+    "trace_history_max": 1000,
+    # Fragmented (DASH/HLS) downloads fetch this many fragments in parallel (yt-dlp's -N).
+    "concurrent_fragments": 4,
+    # Total download bandwidth for all running jobs in Mbit/s (0 = unlimited). When set,
+    # each download gets a rate limit and fragment count (up to max_fragments) that are
+    # adjusted to the measured speeds, and interactive jobs get interactive_weight times
+    # the share of background (batch/playlist) jobs.
+    "bandwidth_budget_mbit": 0,
+    "interactive_weight": 4,
+    "max_fragments": 16,
+    # A failed download is retried download_retries times, waiting retry_backoff seconds
+    # before the first retry and twice as long before each further one. A job that still
+    # fails keeps its partial downloads in the output folder for partial_max_age_days, so
+    # running it again continues where it stopped.
+    "download_retries": 3,
+    "retry_backoff": 5,
+    "partial_max_age_days": 7,
+    # Unfinished queue jobs are saved to job_state_file (relative to the application folder,
+    # "" to disable) and offered for resuming on the next start.
+    "job_state_file": "jobs.json",
+    # Look for new yt-dlp/ffmpeg releases (once a day) and install them in the background.
+    "auto_upgrade_dependencies": True,
+}
+
+
+def load_config():
+    """
+    Returns the settings from config.json merged over DEFAULTS.
+    A missing or unreadable config file simply yields the defaults.
+    """
+    config = dict(DEFAULTS)
+    try:
+        with open(CONFIG_PATH, "r", encoding="utf-8") as f:
+            config.update(json.load(f))
+    except (OSError, ValueError):
+        pass
+    return config
@@ -1,21 +1,23 @@
 import os
-import zipfile
-import tkinter as tk
 import customtkinter as ctk
 from tkinter import messagebox
-import time
-import urllib.request
+import threading
+from downloader import Download, extract_members, fetch_checksum, sha256_file
+from manifest import DEPENDENCIES, has_files, is_installed, load_manifest, record
 from utils import current_dir
 
-# Configure customtkinter appearance
-ctk.set_appearance_mode("system")  # Use system theme (or "dark"/"light")
-ctk.set_default_color_theme("blue")  # Set theme color
+# How often the download popup redraws, independent of how fast data arrives.
+UI_REFRESH_MS = 100
 
 
-def download_dependency_gui(dep_name, url, parent):
+def download_dependency_gui(dep_name, url, parent, checksum_url=None, log_func=print):
     """
-    Downloads a dependency (e.g. yt-dlp.exe or ffmpeg.zip) using urlretrieve.
-    Uses a custom reporthook to update a Toplevel popup with a progress bar and status text:
+    Downloads a dependency (e.g. yt-dlp.exe or ffmpeg.zip) with downloader.Download:
+    parallel range requests, resume from a previous partial download, and SHA-256
+    verification against the list at checksum_url (if given; a warning is logged if
+    the list has no checksum for the file).
+    The download runs in a background thread; a Toplevel popup polls it every
+    UI_REFRESH_MS and shows:
       - Percentage complete
       - Downloaded size (in MB) out of total size
       - Average speed (in KB/s or MB/s)
@@ -47,45 +49,62 @@ def download_dependency_gui(dep_name, url, parent):
         status_label.pack(pady=10)
 
         local_path = os.path.join(current_dir, dep_name)
-        start_time = [None]  # mutable container for start time
+        download = Download(url, local_path)
+        outcome = {}
 
-        def reporthook(blocknum, blocksize, totalsize):
-            if blocknum == 0:
-                start_time[0] = time.time()
+        def worker():
+            try:
+                if checksum_url:
+                    download.sha256 = fetch_checksum(checksum_url, os.path.basename(url))
+                    if download.sha256 is None:
+                        log_func(f"No published checksum found for {dep_name}, skipping verification.")
+                outcome["path"] = download.run()
+            except Exception as e:
+                outcome["error"] = e
+
+        def refresh():
+            if "path" in outcome or "error" in outcome:
+                popup.destroy()
                 return
-            elapsed = time.time() - start_time[0]
-            current = blocknum * blocksize
-            pct = min(current * 100.0 / totalsize, 100)
-            avg_speed = (current / elapsed) if elapsed > 0 else 0  # in bytes/s
-            eta = (totalsize - current) / avg_speed if avg_speed else 0
-            downloaded_mb = current / (1024 * 1024)
-            total_mb = totalsize / (1024 * 1024)
-            if avg_speed >= 1024 * 1024:
-                speed_str = f"{avg_speed/(1024*1024):.1f} MB/s"
-            else:
-                speed_str = f"{avg_speed/1024:.1f} KB/s"
-            status_label.configure(
-                text=f"{pct:.0f}% | {downloaded_mb:.2f} MB / {total_mb:.2f} MB | {speed_str} | ETA: {eta:.0f}s"
-            )
-            progress_bar.set(pct/100)  # CTkProgressBar takes values between 0 and 1
-            popup.update_idletasks()
-            popup.update()  # Make sure the window updates
-
-        try:
-            urllib.request.urlretrieve(url, local_path, reporthook)
-            # Wait a moment to show completion
-            time.sleep(0.5)
-            popup.destroy()
-            return local_path
-        except Exception as e:
-            messagebox.showerror("Download Error", f"Error downloading {dep_name}:\n{e}")
-            popup.destroy()
+            total = download.total
+            if download.verifying:
+                status_label.configure(text="Verifying SHA-256...")
+            elif total:
+                current = download.done
+                pct = min(current * 100.0 / total, 100)
+                avg_speed = download.speed  # in bytes/s
+                eta = (total - current) / avg_speed if avg_speed else 0
+                if avg_speed >= 1024 * 1024:
+                    speed_str = f"{avg_speed/(1024*1024):.1f} MB/s"
+                else:
+                    speed_str = f"{avg_speed/1024:.1f} KB/s"
+                resumed = f" | resumed at {download.resumed/(1024*1024):.0f} MB" if download.resumed else ""
+                status_label.configure(
+                    text=f"{pct:.0f}% | {current/(1024*1024):.2f} MB / {total/(1024*1024):.2f} MB | "
+                         f"{speed_str} | ETA: {eta:.0f}s{resumed}"
+                )
+                progress_bar.set(pct/100)  # CTkProgressBar takes values between 0 and 1
+            popup.after(UI_REFRESH_MS, refresh)
+
+        threading.Thread(target=worker, daemon=True).start()
+        refresh()
+        popup.wait_window()
+
+        if "error" in outcome:
+            messagebox.showerror("Download Error", f"Error downloading {dep_name}:\n{outcome['error']}")
             return None
+        return outcome["path"]
     except Exception as e:
         messagebox.showerror("Download Dialog Error", f"Error creating download dialog:\n{e}")
         return None
 
-def extract_ffmpeg_gui(zip_path, output_filename, parent):
+def extract_ffmpeg_gui(zip_path, output_filenames, parent):
+    """
+    Extracts output_filenames (e.g. ffmpeg.exe and ffprobe.exe) from zip_path into the
+    application folder with downloader.extract_members, which streams each member to disk
+    in chunks. Runs in a background thread behind an indeterminate progress popup.
+    Returns {file name: sha256} if successful; otherwise, returns None.
+    """
     try:
         popup = ctk.CTkToplevel(parent)
         popup.title("Extracting ffmpeg")
@@ -97,75 +116,80 @@ def extract_ffmpeg_gui(zip_path, output_filename, parent):
         popup.focus_force()
         popup.update()
         
-        ctk.CTkLabel(popup, text="Extracting ffmpeg...", font=("", 14)).pack(pady=15)
+        ctk.CTkLabel(popup, text=f"Extracting {', '.join(output_filenames)}...", font=("", 14)).pack(pady=15)
         progress_bar = ctk.CTkProgressBar(popup, width=400)
         progress_bar.pack(fill="x", padx=30, pady=10)
         progress_bar.configure(mode="indeterminate")
         progress_bar.start()
-        popup.update()
-        parent.update()
-        
-        try:
-            with zipfile.ZipFile(zip_path, "r") as zip_ref:
-                for file_info in zip_ref.infolist():
-                    if output_filename in file_info.filename:
-                        extracted_path = os.path.join(current_dir, output_filename)
-                        with open(extracted_path, "wb") as f:
-                            f.write(zip_ref.read(file_info.filename))
-                        break
-            
-            progress_bar.stop()
-            ctk.CTkLabel(popup, text="Extraction complete!", font=("", 14)).pack(pady=10)
-            popup.update()
-            time.sleep(1)
-            popup.destroy()
-            return True
-        except Exception as e:
-            messagebox.showerror("Extraction Error", f"Error extracting ffmpeg:\n{e}")
-            popup.destroy()
-            return False
+        outcome = {}
+
+        def worker():
+            try:
+                outcome["hashes"] = extract_members(zip_path, output_filenames, current_dir)
+            except Exception as e:
+                outcome["error"] = e
+
+        def refresh():
+            if outcome:
+                progress_bar.stop()
+                popup.destroy()
+                return
+            popup.after(UI_REFRESH_MS, refresh)
+
+        threading.Thread(target=worker, daemon=True).start()
+        refresh()
+        popup.wait_window()
+
+        if "error" in outcome:
+            messagebox.showerror("Extraction Error", f"Error extracting ffmpeg:\n{outcome['error']}")
+            return None
+        return outcome["hashes"]
     except Exception as e:
         messagebox.showerror("Extraction Dialog Error", f"Error creating extraction dialog:\n{e}")
-        return False
+        return None
 
 
-def check_dependencies_before_main(parent):
+def check_dependencies_before_main(parent, log_func=print):
     """
-    Checks for required dependencies (yt-dlp.exe and ffmpeg.exe) before showing the main window.
+    Checks for required dependencies (yt-dlp.exe, ffmpeg.exe and ffprobe.exe) before showing
+    the main window. Installed dependencies are looked up in the manifest (one stat() per
+    file); missing ones are downloaded, verified, extracted and recorded there.
+    Checking for newer versions is left to manifest.start_background_upgrade.
+    Warnings (e.g. a download that can't be verified) go to log_func.
     """
     try:
-        if not os.path.isfile("yt-dlp.exe"):
-            downloaded = download_dependency_gui(
-                "yt-dlp.exe",
-                "https://github.com/yt-dlp/yt-dlp/releases/latest/download/yt-dlp.exe",
-                parent,
-            )
-            if not downloaded:
-                messagebox.showerror("Dependency Error", "Failed to download yt-dlp.exe")
-                return False
-        
-        if not os.path.isfile("ffmpeg.exe"):
-            if not os.path.exists("ffmpeg.zip"):
-                downloaded = download_dependency_gui(
-                    "ffmpeg.zip",
-                    "https://github.com/BtbN/FFmpeg-Builds/releases/download/latest/ffmpeg-master-latest-win64-gpl.zip",
-                    parent,
-                )
+        manifest = load_manifest()
+        for name, spec in DEPENDENCIES.items():
+            if is_installed(name, manifest):
+                continue
+            if has_files(name):
+                # Installed before the manifest existed: adopt it, the background upgrade checks it.
+                record(name)
+                continue
+
+            archive = os.path.join(current_dir, spec["download"])
+            if not os.path.exists(archive):
+                downloaded = download_dependency_gui(spec["download"], spec["url"], parent, spec["sums_url"],
+                                                     log_func)
                 if not downloaded:
-                    messagebox.showerror(
-                        "Dependency Error", "Failed to download ffmpeg.zip"
-                    )
+                    messagebox.showerror("Dependency Error", f"Failed to download {spec['download']}")
+                    return False
+            source_sha256 = sha256_file(archive)
+
+            if spec["download"].endswith(".zip"):
+                hashes = extract_ffmpeg_gui(archive, spec["files"], parent)
+                if not hashes:
+                    messagebox.showerror("Dependency Error", f"Failed to extract {', '.join(spec['files'])}")
                     return False
-            
-            extracted = extract_ffmpeg_gui("ffmpeg.zip", "ffmpeg.exe", parent)
-            if not extracted:
-                messagebox.showerror("Dependency Error", "Failed to extract ffmpeg.exe")
-                return False
-            else:
                 try:
-                    os.remove("ffmpeg.zip")
-                except:
+                    os.remove(archive)
+                except OSError:
                     pass
+                version = source_sha256[:12]
+            else:
+                hashes = {spec["download"]: source_sha256}
+                version = None
+            record(name, version, source_sha256, hashes)
         
         return True
     except Exception as e:
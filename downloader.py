@@ -0,0 +1,253 @@
+import hashlib
+import http.client
+import json
+import os
+import threading
+import time
+import urllib.request
+import zipfile
+
+# Size of each read from the network, and the smallest range worth its own connection.
+CHUNK_SIZE = 256 * 1024
+MIN_PART_SIZE = 4 * 1024 * 1024
+CONNECTIONS = 4
+# Attempts per range before the download gives up (a resume picks up from there later).
+RETRIES = 3
+USER_AGENT = "yt-cutter-gui"
+
+
+class ChecksumError(Exception):
+    """
+    The downloaded file does not match its published SHA-256.
+    """
+
+
+def _request(url, headers=None):
+    req = urllib.request.Request(url, headers={"User-Agent": USER_AGENT, **(headers or {})})
+    return urllib.request.urlopen(req, timeout=30)
+
+
+def fetch_checksum(sums_url, filename):
+    """
+    Returns the SHA-256 published for filename in a "<hex>  <name>" checksum list
+    (e.g. yt-dlp's SHA2-256SUMS), or None if the list can't be fetched or lacks filename.
+    """
+    try:
+        with _request(sums_url) as resp:
+            text = resp.read().decode("utf-8", "replace")
+    except OSError:
+        return None
+    for line in text.splitlines():
+        parts = line.split()
+        if len(parts) >= 2 and os.path.basename(parts[-1].lstrip("*")) == filename:
+            return parts[0].lower()
+    return None
+
+
+def sha256_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def probe(url):
+    """
+    Requests the first byte of url. Returns (size, validator, ranges): the total size (None
+    if unknown), the ETag/Last-Modified used to detect a changed file on resume, and
+    whether the server honours range requests.
+    """
+    with _request(url, {"Range": "bytes=0-0"}) as resp:
+        validator = resp.headers.get("ETag") or resp.headers.get("Last-Modified")
+        if resp.status == 206:
+            total = resp.headers.get("Content-Range", "").rpartition("/")[2]
+            return (int(total) if total.isdigit() else None), validator, total.isdigit()
+        length = resp.headers.get("Content-Length", "")
+        return (int(length) if length.isdigit() else None), validator, False
+
+
+class Download:
+    """
+    Downloads url to destination over up to `connections` parallel range requests.
+
+    The data goes to destination + ".part" (preallocated) and the finished byte count of
+    every range to destination + ".part.json", so an interrupted download resumes where
+    it stopped instead of starting over. Servers without range support get a plain
+    single-stream download. With sha256, the file is verified before it is moved into
+    place and ChecksumError is raised on a mismatch.
+
+    run() blocks; done, total and speed can be read from any thread meanwhile (e.g. by a
+    UI polling at its own rate).
+    """
+
+    def __init__(self, url, destination, sha256=None, connections=CONNECTIONS):
+        self.url = url
+        self.destination = destination
+        self.sha256 = sha256
+        self.connections = connections
+        self.done = 0
+        self.total = None
+        self.resumed = 0
+        self.verifying = False
+        self.started = None
+        self._lock = threading.Lock()
+        self._state = None
+
+    @property
+    def speed(self):
+        """
+        Average bytes per second fetched in this session (resumed bytes excluded).
+        """
+        if self.started is None:
+            return 0.0
+        elapsed = time.monotonic() - self.started
+        return (self.done - self.resumed) / elapsed if elapsed > 0 else 0.0
+
+    def run(self):
+        """
+        Downloads, verifies and moves the file into place. Returns destination.
+        """
+        part = self.destination + ".part"
+        state_path = part + ".json"
+        size, validator, ranges = probe(self.url)
+        self.total = size
+        self.started = time.monotonic()
+        if ranges and size:
+            state = self._load_state(state_path)
+            if (state is None or state.get("size") != size or state.get("validator") != validator
+                    or not os.path.exists(part) or os.path.getsize(part) != size):
+                state = {"url": self.url, "size": size, "validator": validator, "parts": self._split(size)}
+                with open(part, "wb") as f:
+                    f.truncate(size)
+            self._state = state
+            self.done = self.resumed = sum(p[2] for p in state["parts"])
+            self._parallel(part, state_path, validator)
+        else:
+            self._single(part)
+
+        if self.sha256:
+            self.verifying = True
+            actual = sha256_file(part)
+            if actual != self.sha256.lower():
+                self._remove(part, state_path)
+                raise ChecksumError(f"SHA-256 mismatch for {os.path.basename(self.destination)}: "
+                                    f"expected {self.sha256}, got {actual}")
+        os.replace(part, self.destination)
+        self._remove(state_path)
+        return self.destination
+
+    def _split(self, size):
+        count = max(1, min(self.connections, size // MIN_PART_SIZE))
+        step = -(-size // count)
+        return [[start, min(start + step, size) - 1, 0] for start in range(0, size, step)]
+
+    @staticmethod
+    def _load_state(state_path):
+        try:
+            with open(state_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _save_state(self, state_path):
+        with self._lock:
+            data = json.dumps(self._state)
+        tmp = state_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(tmp, state_path)
+
+    @staticmethod
+    def _remove(*paths):
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _parallel(self, part, state_path, validator):
+        errors = []
+
+        def worker(p):
+            try:
+                self._fetch_range(part, p, validator)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=worker, args=(p,), daemon=True)
+                   for p in self._state["parts"] if p[0] + p[2] <= p[1]]
+        for thread in threads:
+            thread.start()
+        # Persist progress about once a second so a crash loses at most that much.
+        alive = threads
+        while alive:
+            alive[0].join(1.0)
+            self._save_state(state_path)
+            alive = [thread for thread in alive if thread.is_alive()]
+        self._save_state(state_path)
+        if errors:
+            raise errors[0]
+
+    def _fetch_range(self, part, p, validator):
+        failures = 0
+        # Unbuffered, so bytes counted as done in the state file are already written.
+        with open(part, "r+b", buffering=0) as f:
+            while p[0] + p[2] <= p[1]:
+                try:
+                    headers = {"Range": f"bytes={p[0] + p[2]}-{p[1]}"}
+                    if validator:
+                        headers["If-Range"] = validator
+                    with _request(self.url, headers) as resp:
+                        if resp.status != 206:
+                            raise OSError("the file changed on the server or range requests stopped working")
+                        f.seek(p[0] + p[2])
+                        while p[0] + p[2] <= p[1]:
+                            chunk = resp.read(min(CHUNK_SIZE, p[1] - p[0] - p[2] + 1))
+                            if not chunk:
+                                raise OSError("connection closed early")
+                            f.write(chunk)
+                            failures = 0
+                            with self._lock:
+                                p[2] += len(chunk)
+                                self.done += len(chunk)
+                except (OSError, http.client.HTTPException):
+                    failures += 1
+                    if failures > RETRIES:
+                        raise
+                    time.sleep(2 ** failures)
+
+    def _single(self, part):
+        with _request(self.url) as resp, open(part, "wb") as f:
+            while True:
+                chunk = resp.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                f.write(chunk)
+                with self._lock:
+                    self.done += len(chunk)
+
+
+def extract_members(zip_path, names, dest_dir, chunk_size=1024 * 1024):
+    """
+    Extracts the members of zip_path whose file names (without folders) are in names,
+    e.g. ("ffmpeg.exe", "ffprobe.exe"), into dest_dir. Each member is streamed to disk in
+    chunk_size pieces (so memory use stays bounded) and hashed on the way.
+    Returns {name: sha256}; raises KeyError if a member is missing from the archive.
+    """
+    hashes = {}
+    with zipfile.ZipFile(zip_path, "r") as zip_ref:
+        # Index the central directory by base name once instead of scanning it per member.
+        index = {os.path.basename(info.filename): info for info in zip_ref.infolist() if not info.is_dir()}
+        for name in names:
+            info = index[name]
+            target = os.path.join(dest_dir, name)
+            tmp = target + ".tmp"
+            digest = hashlib.sha256()
+            with zip_ref.open(info) as src, open(tmp, "wb") as dst:
+                for chunk in iter(lambda: src.read(chunk_size), b""):
+                    dst.write(chunk)
+                    digest.update(chunk)
+            os.replace(tmp, target)
+            hashes[name] = digest.hexdigest()
+    return hashes
@@ -0,0 +1,150 @@
+# Format planning: picks the smallest yt-dlp formats that still meet the requested
+# resolution, frame rate and codec, preferring streams that can be stream-copied into
+# the output container (so no remux/re-encode is needed after the download).
+
+# Codecs (yt-dlp codec name prefixes) that each container holds without re-encoding,
+# most widely supported first.
+CONTAINER_VCODECS = {"mp4": ("avc1", "av01", "hvc1", "hev1"), "webm": ("vp9", "vp09", "av01", "vp8")}
+CONTAINER_ACODECS = {"mp4": ("mp4a",), "webm": ("opus", "vorbis")}
+
+# Audio codec to prefer for each audio output format (see audio.AUDIO_FORMATS).
+AUDIO_FORMAT_CODECS = {"m4a": "mp4a", "opus": "opus", "mp3": "mp3"}
+
+# Lowest audio bitrate (kbit/s) considered good enough when choosing the smallest stream.
+MIN_AUDIO_BITRATE = 96
+
+
+class FormatPlan:
+    """
+    The formats chosen for a download: format_spec for yt-dlp's -f (e.g. "136+140"),
+    the chosen format dicts, their expected total size in bytes (None if unknown) and a
+    human-readable description.
+    """
+
+    def __init__(self, formats):
+        self.formats = formats
+        self.format_spec = "+".join(f["format_id"] for f in formats)
+        sizes = [f.get("filesize") or f.get("filesize_approx") for f in formats]
+        self.size = sum(sizes) if all(sizes) else None
+        self.description = " + ".join(_describe(f) for f in formats)
+
+
+def _codec(name):
+    return (name or "none").split(".")[0].lower()
+
+
+def _has_video(fmt):
+    return _codec(fmt.get("vcodec")) != "none"
+
+
+def _has_audio(fmt):
+    return _codec(fmt.get("acodec")) != "none"
+
+
+def _describe(fmt):
+    if _has_video(fmt):
+        text = f"{fmt['format_id']} {fmt.get('height') or '?'}p{fmt.get('fps') or ''} {_codec(fmt.get('vcodec'))}"
+        return text + (f"/{_codec(fmt.get('acodec'))}" if _has_audio(fmt) else "")
+    return f"{fmt['format_id']} {_codec(fmt.get('acodec'))} {fmt.get('abr') or '?'}k"
+
+
+def _with_size(fmt, duration):
+    """
+    Returns a copy of fmt with filesize_approx filled in from its bitrate when the
+    extractor gave no size; formats whose size can't be estimated are skipped (None).
+    """
+    if fmt.get("filesize") or fmt.get("filesize_approx"):
+        return dict(fmt)
+    if fmt.get("tbr") and duration:
+        return dict(fmt, filesize_approx=int(fmt["tbr"] * 1000 / 8 * duration))
+    return None
+
+
+def _size(fmt):
+    return fmt.get("filesize") or fmt.get("filesize_approx")
+
+
+def _pick_audio(formats, container, acodec=None):
+    """
+    Smallest audio-only format of at least MIN_AUDIO_BITRATE, preferring acodec (if
+    given) and then codecs the container can hold. Falls back to the best bitrate.
+    """
+    audio = [f for f in formats if _has_audio(f) and not _has_video(f)]
+    if not audio:
+        return None
+    copyable = CONTAINER_ACODECS.get(container, ())
+
+    def preference(f):
+        codec = _codec(f.get("acodec"))
+        return (acodec is not None and codec != acodec, codec not in copyable)
+
+    good = [f for f in audio if (f.get("abr") or 0) >= MIN_AUDIO_BITRATE]
+    if good:
+        return min(good, key=lambda f: (preference(f), _size(f)))
+    return max(audio, key=lambda f: f.get("abr") or 0)
+
+
+def plan_formats(info, audio_only=False, max_height=None, max_fps=None, vcodec=None, container="mp4",
+                 acodec=None):
+    """
+    Plans the smallest download for info (a yt-dlp info dict with a "formats" list).
+    Video: the highest available height up to max_height and frame rate up to max_fps,
+    restricted to vcodec (e.g. "avc1") when possible; among those, container-compatible
+    streams first, then the fewest bytes, either as a video+audio pair or a single
+    progressive format. Audio: see _pick_audio (acodec is the preferred audio codec).
+    Returns a FormatPlan, or None if the format list doesn't allow a plan.
+    """
+    duration = info.get("duration")
+    formats = [f for f in (_with_size(f, duration) for f in info.get("formats") or []) if f]
+    formats = [f for f in formats if f.get("format_id") and f.get("protocol") != "mhtml"]
+
+    if audio_only:
+        audio = _pick_audio(formats, container, acodec)
+        return FormatPlan([audio]) if audio else None
+
+    videos = [f for f in formats if _has_video(f) and f.get("height")]
+    if vcodec:
+        videos = [f for f in videos if _codec(f.get("vcodec")).startswith(vcodec)] or videos
+    if not videos:
+        return None
+
+    heights = {f["height"] for f in videos}
+    fitting = [h for h in heights if not max_height or h <= max_height]
+    height = max(fitting) if fitting else min(heights)
+    videos = [f for f in videos if f["height"] == height]
+    rates = {f.get("fps") or 0 for f in videos}
+    fitting = [r for r in rates if not max_fps or r <= max_fps]
+    fps = max(fitting) if fitting else min(rates)
+    videos = [f for f in videos if (f.get("fps") or 0) == fps]
+
+    copyable = CONTAINER_VCODECS.get(container, ())
+    audio = _pick_audio(formats, container)
+    candidates = []
+    for video in videos:
+        if _has_audio(video):
+            candidates.append([video])
+        elif audio:
+            candidates.append([video, audio])
+    if not candidates:
+        return None
+    best = min(candidates, key=lambda fs: (not _codec(fs[0].get("vcodec")).startswith(copyable),
+                                           sum(_size(f) for f in fs)))
+    return FormatPlan(best)
+
+
+def apply_plan(info, plan):
+    """
+    Returns a copy of info describing the planned selection (as if yt-dlp had chosen it),
+    so size estimates, codec detection and streaming checks see the planned formats.
+    """
+    planned = dict(info)
+    planned.pop("requested_formats", None)
+    if len(plan.formats) > 1:
+        planned["requested_formats"] = plan.formats
+        for key in ("protocol", "vcodec", "acodec", "filesize", "filesize_approx"):
+            planned.pop(key, None)
+    else:
+        for key in ("protocol", "vcodec", "acodec", "ext", "height", "fps", "filesize", "filesize_approx"):
+            planned[key] = plan.formats[0].get(key)
+    planned["format_id"] = plan.format_spec
+    return planned
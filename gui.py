@@ -1,21 +1,24 @@
-import tkinter as tk
 import customtkinter as ctk
-from tkinter import filedialog, messagebox
-import threading
+from tkinter import messagebox
 import os
-import webbrowser
-from utils import convertname, current_dir
-from dependency import check_dependencies_before_main
-from processing_gui import (
-    process_full_video_gui,
-    process_cut_video_gui,
-    process_full_audio_gui,
-    process_cut_audio_gui,
-)
+import threading
+import startup
+from utils import converttime, current_dir, parse_ranges, validate_range
+from config import load_config
+from profiles import profile_names
+from messagebus import UIBus
+from jobqueue import JobQueue, PENDING, DOWNLOADING, CUTTING, DONE, FAILED, CANCELLED, FINISHED_STATES, load_saved_jobs
+
+# The processing engine, the dependency installer (urllib/ssl/zipfile) and webbrowser are
+# imported on first use, so they don't delay the first frame.
 
-# Configure customtkinter appearance
-ctk.set_appearance_mode("system")  # Use system theme (or "dark"/"light")
-ctk.set_default_color_theme("blue")  # Set theme color
+
+def run_job(params, log_func, status_func, progress_func):
+    """
+    processing_gui.run_job, imported when the first job runs.
+    """
+    from processing_gui import run_job
+    return run_job(params, log_func, status_func, progress_func)
 
 
 # --- GUI Application Class ---
@@ -23,20 +26,23 @@ class GUIApp:
     def __init__(self, master):
         self.master = master
         master.title("YouTube Cutter GUI")
-        master.geometry("550x950")
+        master.geometry("550x1150")
 
         # Variables for user input
         self.media_type = ctk.StringVar(value="Video")
         self.mode = ctk.StringVar(value="Full")
         self.url = ctk.StringVar()
+        self.playlist = ctk.BooleanVar(value=False)
         self.output_name = ctk.StringVar()
         self.start_time = ctk.StringVar()
         self.end_time = ctk.StringVar()
+        self.section_only = ctk.BooleanVar(value=True)
+        self.smart_cut = ctk.BooleanVar(value=False)
+        self.audio_format = ctk.StringVar(value="mp3")
+        self.profile = ctk.StringVar(value=load_config()["encoding_profile"])
+        self.max_height = ctk.StringVar(value=str(load_config()["max_height"] or "best"))
         self.out_dir = ctk.StringVar(value=current_dir)
 
-        # Dependency check on startup (hide main window until done)
-        self.check_dependencies_on_startup()
-
         # Media Type Frame
         frame_media = ctk.CTkFrame(master)
         frame_media.pack(fill="x", padx=10, pady=10)
@@ -61,6 +67,22 @@ class GUIApp:
             value="Audio",
             command=self.update_mode_options,
         ).pack(side="left", padx=20, pady=5)
+        self.audio_format_menu = ctk.CTkOptionMenu(
+            media_type_container,
+            values=["mp3", "m4a", "opus", "original"],
+            variable=self.audio_format,
+            width=110,
+            state="disabled",
+        )
+        self.audio_format_menu.pack(side="left", padx=10, pady=5)
+        # Highest video resolution to download ("best" = no limit)
+        self.max_height_menu = ctk.CTkOptionMenu(
+            media_type_container,
+            values=["best", "2160", "1440", "1080", "720", "480", "360"],
+            variable=self.max_height,
+            width=90,
+        )
+        self.max_height_menu.pack(side="left", padx=10, pady=5)
 
         # Mode Frame
         frame_mode = ctk.CTkFrame(master)
@@ -86,13 +108,28 @@ class GUIApp:
             value="Cut",
             command=self.update_cut_fields,
         ).pack(side="left", padx=20, pady=5)
+        ctk.CTkRadioButton(
+            mode_container,
+            text="Split by chapters",
+            variable=self.mode,
+            value="Chapters",
+            command=self.update_cut_fields,
+        ).pack(side="left", padx=20, pady=5)
 
         # URL Entry
         frame_url = ctk.CTkFrame(master)
         frame_url.pack(fill="x", padx=10, pady=10)
         ctk.CTkLabel(frame_url, text="Video/Audio URL:").pack(side="left", padx=10)
-        self.entry_url = ctk.CTkEntry(frame_url, textvariable=self.url, width=350)
+        self.entry_url = ctk.CTkEntry(frame_url, textvariable=self.url, width=300)
         self.entry_url.pack(side="left", padx=5, fill="x", expand=True)
+        self.info_btn = ctk.CTkButton(frame_url, text="Info", width=60, command=self.probe_url)
+        self.info_btn.pack(side="left", padx=10)
+        ctk.CTkCheckBox(frame_url, text="Playlist", variable=self.playlist, width=80).pack(side="left", padx=(0, 10))
+
+        # Probed duration / size / formats of the URL
+        self.media_info = None
+        self.info_label = ctk.CTkLabel(master, text="", anchor="w", justify="left", wraplength=520)
+        self.info_label.pack(fill="x", padx=20)
 
         # Output Name Entry
         frame_output = ctk.CTkFrame(master)
@@ -132,14 +169,82 @@ class GUIApp:
             self.frame_cut, text="Visualize Cutting", command=self.visualize_cutting
         )
         self.visualize_btn.pack(side="left", padx=10)
+
+        # Cut options
+        self.frame_cut_opts = ctk.CTkFrame(master)
+        self.frame_cut_opts.pack(fill="x", padx=10, pady=(0, 10))
+        self.section_check = ctk.CTkCheckBox(
+            self.frame_cut_opts, text="Download only the cut range", variable=self.section_only
+        )
+        self.section_check.pack(side="left", padx=10, pady=5)
+        self.smart_check = ctk.CTkCheckBox(
+            self.frame_cut_opts, text="Smart cut (re-encode edges only)", variable=self.smart_cut
+        )
+        self.smart_check.pack(side="left", padx=10, pady=5)
+
+        # Encoding profile for re-encoded video cuts
+        self.frame_profile = ctk.CTkFrame(master)
+        self.frame_profile.pack(fill="x", padx=10, pady=(0, 10))
+        ctk.CTkLabel(self.frame_profile, text="Encoding profile:").pack(side="left", padx=10)
+        self.profile_menu = ctk.CTkOptionMenu(
+            self.frame_profile, values=profile_names(), variable=self.profile, width=150
+        )
+        self.profile_menu.pack(side="left", padx=5, pady=5)
+
+        # Multiple ranges (one per line) cut from a single download
+        self.frame_ranges = ctk.CTkFrame(master)
+        self.frame_ranges.pack(fill="x", padx=10, pady=(0, 10))
+        ctk.CTkLabel(
+            self.frame_ranges, text="Multiple ranges (one per line, e.g. 1:05-1:30):"
+        ).pack(anchor="w", padx=10)
+        self.ranges_text = ctk.CTkTextbox(self.frame_ranges, height=70)
+        self.ranges_text.pack(fill="x", padx=10, pady=5)
         self.update_cut_fields()
 
+        # Disabled until the dependency check (started below) has passed
         self.button_run = ctk.CTkButton(
-            master, text="Run", command=self.start_process_thread,
-            font=("Helvetica", 16), height=40
+            master, text="Checking dependencies...", command=self.start_process_thread,
+            font=("Helvetica", 16), height=40, state="disabled"
         )
         self.button_run.pack(pady=15, fill="x", padx=50)
 
+        # Job queue panel: one row per submitted job, until it is cleared after finishing
+        self.button_clear = ctk.CTkButton(master, text="Clear finished", width=110, height=24,
+                                          command=self.clear_finished_rows)
+        self.button_clear.pack(anchor="e", padx=10)
+        self.queue_panel = ctk.CTkScrollableFrame(master, label_text="Queue", height=120)
+        self.queue_panel.pack(fill="x", padx=10, pady=(0, 10))
+        self.queue_rows = {}
+        # Text and progress each row shows, so unchanged rows aren't reconfigured.
+        self.queue_row_shown = {}
+        self.finished_jobs = set()
+        self.last_output = None
+
+        config = load_config()
+        self.log_max_lines = config["log_max_lines"]
+        self.bandwidth_budget = config["bandwidth_budget_mbit"]
+        self.log_line_count = 0
+        self.bus = UIBus(
+            master,
+            self.write_log_lines,
+            lambda message: self.status_label.configure(text=message),
+            self.overall_progress_set,
+            log_path=os.path.join(current_dir, config["log_file"]) if config["log_file"] else None,
+            log_max_bytes=int(config["log_file_max_mb"] * 1024 * 1024),
+        )
+        # Jobs left unfinished by the last session, offered for resuming once the
+        # dependency check has passed (the queue overwrites the file from then on).
+        state_path = os.path.join(current_dir, config["job_state_file"]) if config["job_state_file"] else None
+        self.saved_jobs = load_saved_jobs(state_path) if state_path else []
+        self.job_queue = JobQueue(
+            run_job,
+            self.log,
+            max_jobs=config["max_jobs"],
+            max_downloads=config["max_downloads"],
+            max_encodes=config["max_encodes"],
+            state_path=state_path,
+        )
+
         self.log_text = ctk.CTkTextbox(master, state="disabled", height=200)
         self.log_text.pack(fill="both", expand=True, padx=10, pady=10)
 
@@ -175,40 +280,68 @@ class GUIApp:
         )
         self.status_label.pack(side="bottom", fill="x", padx=5, pady=5)
 
+        self.bus.start()
+        self.master.bind("<Destroy>", self.on_destroy, add="+")
+        self.master.after(250, self.refresh_queue_panel)
+
+        # Dependency check in the background; the window is usable meanwhile
+        self.auto_upgrade = config["auto_upgrade_dependencies"]
+        self.check_dependencies_on_startup()
+
     def check_dependencies_on_startup(self):
-        # Don't withdraw the window initially - this causes issues with CTk
-        # self.master.withdraw()
-        
-        # Instead, show a loading label
-        loading_frame = ctk.CTkFrame(self.master)
-        loading_frame.pack(expand=True, fill="both")
-        loading_label = ctk.CTkLabel(
-            loading_frame, 
-            text="Checking dependencies...", 
-            font=("Helvetica", 18)
-        )
-        loading_label.pack(expand=True, pady=50)
-        self.master.update()
-        
-        result = check_dependencies_before_main(self.master)
-        
-        # Remove the loading frame
-        loading_frame.destroy()
-        
-        if not result:
-            messagebox.showerror("Fatal Error", "Dependency check failed. Exiting.")
-            self.master.after(100, self.master.quit)
-            return False
-        
-        return True
+        """
+        Checks the dependency manifest on a worker thread (a few stat() calls) and polls for
+        the result from the main loop. Only if something is missing are the download and
+        extraction popups shown. The Run button is enabled once everything is in place.
+        """
+        outcome = {}
+
+        def worker():
+            try:
+                from manifest import DEPENDENCIES, is_installed, load_manifest
+                manifest = load_manifest()
+                outcome["missing"] = [name for name in DEPENDENCIES if not is_installed(name, manifest)]
+            except Exception as e:
+                outcome["error"] = e
+
+        def poll():
+            if not outcome:
+                self.master.after(50, poll)
+            elif "error" in outcome:
+                self.dependencies_checked(False, f"Error checking dependencies:\n{outcome['error']}")
+            elif outcome["missing"]:
+                from dependency import check_dependencies_before_main
+                self.dependencies_checked(check_dependencies_before_main(self.master, self.log))
+            else:
+                self.dependencies_checked(True)
+
+        threading.Thread(target=worker, name="dependency-check", daemon=True).start()
+        self.master.after(50, poll)
+
+    def dependencies_checked(self, ok, error=None):
+        startup.mark("dependencies ready")
+        startup.report(self.log)
+        if not ok:
+            if error:
+                messagebox.showerror("Dependency Check Error", error)
+            self.button_run.configure(text="Dependencies missing (restart to retry)")
+            self.set_status("Dependency check failed")
+            return
+        self.button_run.configure(text="Run", state="normal")
+        self.offer_resume()
+        if self.auto_upgrade:
+            from manifest import start_background_upgrade
+            start_background_upgrade(self.log)
 
     def browse_directory(self):
+        from tkinter import filedialog
         path = filedialog.askdirectory(title="Select Output Directory")
         if path:
             self.out_dir.set(path + "/")
             self.label_dir.configure(text=self.out_dir.get())
 
     def visualize_cutting(self):
+        import webbrowser
         webbrowser.open("https://ytcutter.com/")
 
     def update_cut_fields(self):
@@ -216,23 +349,64 @@ class GUIApp:
             self.entry_start.configure(state="normal")
             self.entry_end.configure(state="normal")
             self.visualize_btn.configure(state="normal")
+            self.section_check.configure(state="normal")
+            self.ranges_text.configure(state="normal")
+            self.smart_check.configure(
+                state="normal" if self.media_type.get() == "Video" else "disabled"
+            )
+            self.profile_menu.configure(
+                state="normal" if self.media_type.get() == "Video" else "disabled"
+            )
         else:
             self.entry_start.configure(state="disabled")
             self.entry_end.configure(state="disabled")
             self.visualize_btn.configure(state="disabled")
+            self.section_check.configure(state="disabled")
+            self.ranges_text.configure(state="disabled")
+            self.smart_check.configure(state="disabled")
+            self.profile_menu.configure(state="disabled")
 
     def update_mode_options(self):
         self.mode.set("Full")
+        self.audio_format_menu.configure(
+            state="normal" if self.media_type.get() == "Audio" else "disabled"
+        )
+        self.max_height_menu.configure(
+            state="normal" if self.media_type.get() == "Video" else "disabled"
+        )
         self.update_cut_fields()
 
     def log(self, message):
+        # Safe from any thread: the line is queued and written by the main loop.
+        self.bus.log(message)
+
+    def set_status(self, message):
+        self.bus.status(message)
+
+    def overall_progress_set(self, value):
+        self.overall_progress.set(value)
+
+    def write_log_lines(self, lines):
+        """
+        Appends a batch of log lines (main thread only). The textbox keeps only the last
+        log_max_lines lines; the full log is in the log file.
+        """
+        text = "\n".join(lines) + "\n"
         self.log_text.configure(state="normal")
-        self.log_text.insert("end", message + "\n")
+        self.log_text.insert("end", text)
+        # A message can span several lines (e.g. a tool's error output).
+        self.log_line_count += text.count("\n")
+        excess = self.log_line_count - self.log_max_lines
+        if excess > 0:
+            self.log_text.delete("1.0", f"{excess + 1}.0")
+            self.log_line_count -= excess
         self.log_text.see("end")
         self.log_text.configure(state="disabled")
 
-    def set_status(self, message):
-        self.status_label.configure(text=message)
+    def on_destroy(self, event):
+        # <Destroy> also fires for every child widget; only the window itself matters.
+        if event.widget is self.master:
+            self.bus.close()
 
     def open_directory(self):
         dir_path = self.out_dir.get()
@@ -242,85 +416,226 @@ class GUIApp:
             messagebox.showerror("Error", "Output directory not found.")
 
     def open_output_file(self):
-        name = convertname(self.output_name.get() or "output")
-        ext = ".mp4" if self.media_type.get() == "Video" else ".mp3"
-        file_path = os.path.join(self.out_dir.get(), name + ext)
-        if os.path.exists(file_path):
+        file_path = self.last_output
+        if isinstance(file_path, list):
+            file_path = file_path[0] if file_path else None
+        if file_path and os.path.exists(file_path):
             os.startfile(file_path)
         else:
             messagebox.showerror("Error", "Output file not found.")
 
-    def start_process_thread(self):
-        self.button_run.configure(state="disabled")
-        self.open_file_btn.configure(state="disabled")
-        thread = threading.Thread(target=self.run_process)
-        thread.start()
-
-    def run_process(self):
-        self.log_text.configure(state="normal")
-        self.log_text.delete("1.0", "end")
-        self.log_text.configure(state="disabled")
-        self.set_status("Starting process...")
-        self.overall_progress.set(0)
-
-        media = self.media_type.get()
-        mode = self.mode.get()
+    def probe_url(self):
+        """
+        Fetches the URL's metadata on a worker thread (cached, see processing_gui.probe_media)
+        and shows duration, size and formats once it arrives. Cut ranges are then checked
+        against the real duration before a job is queued.
+        """
         url = self.url.get().strip()
-        output_name = self.output_name.get().strip() or "output"
-        out_dir = self.out_dir.get()
-
-        if media == "Video":
-            if mode == "Full":
-                process_full_video_gui(
-                    url,
-                    output_name,
-                    out_dir,
-                    self.log,
-                    self.set_status,
-                    self.overall_progress,
-                )
-            elif mode == "Cut":
-                start = self.start_time.get().strip()
-                end = self.end_time.get().strip()
-                process_cut_video_gui(
-                    url,
-                    output_name,
-                    out_dir,
-                    start,
-                    end,
-                    self.log,
-                    self.set_status,
-                    self.overall_progress,
-                )
-        elif media == "Audio":
-            if mode == "Full":
-                process_full_audio_gui(
-                    url,
-                    output_name,
-                    out_dir,
-                    self.log,
-                    self.set_status,
-                    self.overall_progress,
-                )
-            elif mode == "Cut":
-                start = self.start_time.get().strip()
-                end = self.end_time.get().strip()
-                process_cut_audio_gui(
-                    url,
-                    output_name,
-                    out_dir,
-                    start,
-                    end,
-                    self.log,
-                    self.set_status,
-                    self.overall_progress,
-                )
-        self.log("Process completed.")
-        self.set_status("Ready")
-        self.overall_progress.set(1)  # Set to 100%
-        self.button_run.configure(state="normal")
-        self.open_file_btn.configure(state="normal")
+        if not url:
+            return
+        self.info_btn.configure(state="disabled")
+        self.info_label.configure(text="Fetching media info...")
+        outcome = {}
+
+        def worker():
+            try:
+                from processing_gui import describe_media, probe_media
+                info = probe_media(url, self.log)
+                text = describe_media(info) if info else "Could not fetch media info (see log)."
+            except Exception as e:
+                info, text = None, f"Could not fetch media info: {e}"
+            outcome.update(info=info, text=text)
+
+        def poll():
+            if not outcome:
+                self.master.after(100, poll)
+                return
+            self.info_btn.configure(state="normal")
+            self.info_label.configure(text=outcome["text"])
+            self.media_info = (url, outcome["info"]) if outcome["info"] else None
+
+        threading.Thread(target=worker, name="probe", daemon=True).start()
+        self.master.after(100, poll)
+
+    def collect_job_params(self):
+        """
+        Returns the job parameters for the current form, or None if the ranges are invalid.
+        """
+        mode = self.mode.get()
+        params = {
+            "url": self.url.get().strip(),
+            "media": self.media_type.get(),
+            "mode": mode,
+            "output_name": self.output_name.get().strip() or "output",
+            "out_dir": self.out_dir.get(),
+            "priority": "interactive",
+        }
+        if params["media"] == "Audio":
+            params["audio_format"] = self.audio_format.get()
+        elif self.max_height.get().isdigit():
+            params["max_height"] = int(self.max_height.get())
+        if mode == "Cut":
+            params.update(
+                start=self.start_time.get().strip(),
+                end=self.end_time.get().strip(),
+                section_only=self.section_only.get(),
+                smart=self.smart_cut.get(),
+                profile=self.profile.get(),
+                ranges=[],
+            )
+            ranges_text = self.ranges_text.get("1.0", "end").strip()
+            # Duration from the last probe of this URL, if any
+            duration = None
+            if self.media_info and self.media_info[0] == params["url"]:
+                duration = self.media_info[1].get("duration")
+            try:
+                if ranges_text:
+                    params["ranges"] = parse_ranges(ranges_text)
+                    for start, end in params["ranges"]:
+                        validate_range(start, end, duration)
+                else:
+                    validate_range(
+                        converttime(params["start"]) if params["start"] else 0,
+                        converttime(params["end"]) if params["end"] else None,
+                        duration,
+                    )
+            except ValueError as e:
+                messagebox.showerror("Invalid ranges", str(e))
+                return None
+        return params
 
+    def start_process_thread(self):
+        params = self.collect_job_params()
+        if params is None:
+            return
+        if not params["url"]:
+            messagebox.showerror("Error", "Please enter a URL.")
+            return
+        if self.playlist.get():
+            self.queue_playlist(params)
+            return
+        job = self.job_queue.submit(params)
+        self.log(f"Queued job #{job.id}: {params['url']}")
+        self.add_queue_row(job)
+
+    def queue_playlist(self, params):
+        """
+        Lists the playlist or channel behind params["url"] on a worker thread (flat
+        extraction, see processing_gui.probe_playlist) and queues one job per item with
+        the form's settings. The items then run in parallel like any other jobs.
+        """
+        self.button_run.configure(text="Listing playlist...", state="disabled")
+        outcome = {}
+
+        def worker():
+            try:
+                from processing_gui import probe_playlist
+                outcome["items"] = probe_playlist(params["url"], self.log)
+            except Exception as e:
+                outcome["error"] = e
+
+        def poll():
+            if not outcome:
+                self.master.after(100, poll)
+                return
+            self.button_run.configure(text="Run", state="normal")
+            if "error" in outcome:
+                messagebox.showerror("Error", f"Could not list the playlist:\n{outcome['error']}")
+                return
+            if not outcome["items"]:
+                messagebox.showerror("Error", "No playlist items found (see log).")
+                return
+            from playlist import item_params
+            # Playlist items are background work: single jobs queued meanwhile go first
+            # and get the larger bandwidth share.
+            items = item_params(dict(params, priority="batch"), outcome["items"])
+            jobs = [self.job_queue.submit(item) for item in items]
+            for job in jobs:
+                self.add_queue_row(job)
+            self.log(f"Queued {len(jobs)} playlist items as jobs #{jobs[0].id}-#{jobs[-1].id}: {params['url']}")
+
+        threading.Thread(target=worker, name="playlist", daemon=True).start()
+        self.master.after(100, poll)
+
+    def offer_resume(self):
+        """
+        Asks whether to resubmit the jobs the last session left unfinished (after a crash
+        or closing the app with jobs in the queue). Declining forgets them.
+        """
+        saved, self.saved_jobs = self.saved_jobs, []
+        if not saved:
+            return
+        if messagebox.askyesno("Resume Jobs", f"{len(saved)} job(s) did not finish last time. Resume them now?"):
+            for params in saved:
+                self.add_queue_row(self.job_queue.submit(params))
+            self.log(f"Resumed {len(saved)} job(s) from the last session.")
+        else:
+            self.job_queue.save_state()
+
+    def add_queue_row(self, job):
+        row = ctk.CTkFrame(self.queue_panel)
+        row.pack(fill="x", padx=5, pady=2)
+        header = ctk.CTkFrame(row, fg_color="transparent")
+        header.pack(side="top", fill="x")
+        cancel = ctk.CTkButton(header, text="Cancel", width=60, height=22,
+                               command=lambda: self.job_queue.cancel(job))
+        cancel.pack(side="right", padx=5)
+        label = ctk.CTkLabel(header, text=job.label, anchor="w")
+        label.pack(side="left", fill="x", expand=True, padx=5)
+        bar = ctk.CTkProgressBar(row, height=8)
+        bar.pack(side="top", fill="x", padx=5, pady=(0, 4))
+        bar.set(0)
+        self.queue_rows[job.id] = (job, row, label, bar, cancel)
+
+    def remove_queue_row(self, job_id):
+        job, row = self.queue_rows.pop(job_id)[:2]
+        self.queue_row_shown.pop(job_id, None)
+        self.finished_jobs.discard(job_id)
+        row.destroy()
+
+    def clear_finished_rows(self):
+        for job_id in [job_id for job_id in self.queue_rows if job_id in self.finished_jobs]:
+            self.remove_queue_row(job_id)
+
+    def refresh_queue_panel(self):
+        # Workers only update plain attributes on their Job; all widget changes happen here,
+        # on the Tk main loop, and only for rows whose job changed.
+        for job, row, label, bar, cancel in list(self.queue_rows.values()):
+            if job.id in self.finished_jobs:
+                continue
+            status = job.timing if job.state == DONE and job.timing else job.status
+            if job.cancel_requested.is_set() and job.state not in FINISHED_STATES:
+                status = "Cancelling..."
+            shown = (f"{job.label} | {job.state} | {status}", round(job.progress, 3))
+            if shown != self.queue_row_shown.get(job.id):
+                self.queue_row_shown[job.id] = shown
+                label.configure(text=shown[0])
+                bar.set(shown[1])
+            if job.state in FINISHED_STATES:
+                self.finished_jobs.add(job.id)
+                cancel.configure(text="Clear", command=lambda job_id=job.id: self.remove_queue_row(job_id))
+                if job.state == DONE:
+                    self.last_output = job.result
+                    self.open_file_btn.configure(state="normal")
+
+        counts = self.job_queue.counts()
+        active = counts.get(DOWNLOADING, 0) + counts.get(CUTTING, 0)
+        if active or counts.get(PENDING, 0):
+            throughput = self.job_queue.throughput()
+            self.set_status(
+                f"{counts.get(DOWNLOADING, 0)} downloading, {counts.get(CUTTING, 0)} cutting, "
+                f"{counts.get(PENDING, 0)} pending, {counts.get(DONE, 0)} done"
+                + (f" | {throughput / 1024 / 1024:.1f} MB/s" if throughput else "")
+                + (f" (budget {self.bandwidth_budget:g} Mbit/s)" if throughput and self.bandwidth_budget else "")
+            )
+        elif self.queue_rows:
+            self.set_status(f"Ready ({counts.get(DONE, 0)} done, {counts.get(FAILED, 0)} failed, "
+                            f"{counts.get(CANCELLED, 0)} cancelled)")
+        # Overall bar: average progress of all jobs submitted so far
+        if self.queue_rows:
+            jobs = [entry[0] for entry in self.queue_rows.values()]
+            self.bus.progress(sum(job.progress for job in jobs) / len(jobs))
+        self.master.after(250, self.refresh_queue_panel)
 
 if __name__ == "__main__":
     root = ctk.CTk()
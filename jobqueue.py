@@ -0,0 +1,447 @@
+import itertools
+import json
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from utils import kill_process_tree
+import tracing
+
+# Job states
+PENDING = "pending"
+DOWNLOADING = "downloading"
+CUTTING = "cutting"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATES = (DONE, FAILED, CANCELLED)
+
+# Upper limit (seconds) for one retry delay, however many attempts came before.
+MAX_RETRY_DELAY = 300
+
+# A job's download speed counts towards the queue's throughput for this many seconds
+# after its last progress event.
+SPEED_MAX_AGE = 3.0
+
+_job_ids = itertools.count(1)
+_local = threading.local()
+
+
+class JobCancelled(Exception):
+    """
+    Raised in a job's thread once the job has been cancelled, to unwind its work.
+    """
+
+
+class Job:
+    """
+    One queued unit of work: the parameters of a single Run (see processing_gui.run_job)
+    plus its live state, progress (0..1), last status line and result.
+    """
+
+    def __init__(self, params):
+        self.id = next(_job_ids)
+        self.params = params
+        self.state = PENDING
+        self.progress = 0.0
+        self.status = "Waiting..."
+        self.result = None
+        self.error = None
+        self.queue = None
+        self.started = None
+        self.finished = None
+        # One-line stage timing summary once the job has run (see tracing.py).
+        self.timing = None
+        # Download figures from yt-dlp's progress events (see note_download).
+        self.download_speed = 0.0
+        self._speed_time = 0.0
+        self._finished_bytes = 0
+        self._file_bytes = 0
+        self.cancel_requested = threading.Event()
+        # Processes currently running for this job (see running_process).
+        self._processes = set()
+        self._lock = threading.Lock()
+
+    @property
+    def label(self):
+        name = self.params.get("output_name") or "output"
+        return f"#{self.id} {self.params.get('media', '')} {self.params.get('mode', '')} - {name}"
+
+    @property
+    def elapsed(self):
+        """
+        Seconds the job has been running (or ran), None if it has not started.
+        """
+        if self.started is None:
+            return None
+        return (self.finished or time.time()) - self.started
+
+    def set_progress(self, value):
+        """
+        progress_func for the process_* functions (value is 0..1).
+        """
+        self.progress = value
+
+    @property
+    def downloaded_bytes(self):
+        """
+        Bytes downloaded by all of the job's yt-dlp downloads so far.
+        """
+        return self._finished_bytes + self._file_bytes
+
+    @property
+    def current_speed(self):
+        """
+        The job's download speed in bytes per second, 0 if it isn't downloading.
+        """
+        return self.download_speed if time.monotonic() - self._speed_time < SPEED_MAX_AGE else 0.0
+
+    def note_download(self, event):
+        """
+        Records a download ProgressEvent. yt-dlp counts bytes per file, so a count that
+        goes down means the next file (e.g. the audio after the video) has started.
+        """
+        if event.downloaded_bytes is not None:
+            if event.downloaded_bytes < self._file_bytes:
+                self._finished_bytes += self._file_bytes
+            self._file_bytes = event.downloaded_bytes
+        if event.speed is not None:
+            self.download_speed = event.speed
+            self._speed_time = time.monotonic()
+
+    def cancel(self):
+        """
+        Asks the job to stop: its running processes are killed together with their
+        children, and its thread gives up at the next check (see check_cancelled).
+        Use JobQueue.cancel so a job that hasn't started yet is dropped right away.
+        """
+        self.cancel_requested.set()
+        self.interrupt()
+
+    def interrupt(self):
+        """
+        Kills the job's running processes (and their children) without cancelling the
+        job, for a caller that restarts them (see bandwidth.BandwidthController).
+        """
+        with self._lock:
+            for proc in self._processes:
+                kill_process_tree(proc)
+
+    @property
+    def interactive(self):
+        """
+        False for background jobs (params["priority"] == "batch", e.g. playlist items).
+        """
+        return self.params.get("priority") != "batch"
+
+
+def current_job():
+    """
+    Returns the Job being run by the calling worker thread, or None outside the queue.
+    """
+    return getattr(_local, "job", None)
+
+
+def _set_state(state):
+    job = current_job()
+    if job is not None:
+        job.state = state
+
+
+def check_cancelled():
+    """
+    Raises JobCancelled if the calling thread's job has been cancelled.
+    """
+    job = current_job()
+    if job is not None and job.cancel_requested.is_set():
+        raise JobCancelled()
+
+
+def sleep(seconds):
+    """
+    time.sleep that ends early with JobCancelled when the calling thread's job is cancelled.
+    """
+    job = current_job()
+    if job is None:
+        time.sleep(seconds)
+    elif job.cancel_requested.wait(seconds):
+        raise JobCancelled()
+
+
+def retry_delay(attempt, base):
+    """
+    Seconds to wait before retry number attempt (1, 2, ...): base doubled for each earlier
+    retry, at most MAX_RETRY_DELAY, with +-20% jitter so parallel jobs don't retry in step.
+    """
+    return min(base * 2 ** (attempt - 1), MAX_RETRY_DELAY) * random.uniform(0.8, 1.2)
+
+
+@contextmanager
+def running_process(proc):
+    """
+    Registers proc (started with utils.process_group_args()) with the calling thread's job
+    while the block runs, so cancelling the job kills it and its children. Raises
+    JobCancelled after the block if the job was cancelled meanwhile.
+    """
+    job = current_job()
+    if job is None:
+        yield proc
+        return
+    with job._lock:
+        job._processes.add(proc)
+        if job.cancel_requested.is_set():
+            kill_process_tree(proc)
+    try:
+        yield proc
+    finally:
+        with job._lock:
+            job._processes.discard(proc)
+    check_cancelled()
+
+
+def bind(func):
+    """
+    Wraps func so that, when run on a pool thread, it belongs to the calling thread's job
+    (so its processes are killed on cancel) and trace (see tracing.bind).
+    """
+    job = current_job()
+    func = tracing.bind(func)
+    if job is None:
+        return func
+
+    def bound(*args, **kwargs):
+        previous = current_job()
+        _local.job = job
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _local.job = previous
+    return bound
+
+
+def download_progress(progress_func):
+    """
+    Returns a progress_func for a yt-dlp download that records its events on the calling
+    thread's job (for the queue's throughput) and passes them on to progress_func.
+    Returns progress_func itself outside the queue.
+    """
+    job = current_job()
+    if job is None:
+        return progress_func
+
+    def noting(event):
+        if event.kind == "download":
+            job.note_download(event)
+        if progress_func:
+            progress_func(event)
+    return noting
+
+
+def _acquire(semaphore):
+    # Waits for a slot, giving up if the job is cancelled meanwhile.
+    while not semaphore.acquire(timeout=0.25):
+        check_cancelled()
+    try:
+        check_cancelled()
+    except JobCancelled:
+        semaphore.release()
+        raise
+
+
+@contextmanager
+def download_slot():
+    """
+    Holds one of the queue's download slots for the duration of a yt-dlp download.
+    Outside the queue this is a no-op.
+    """
+    job = current_job()
+    if job is None or job.queue is None:
+        yield
+        return
+    job.status = "Waiting for a download slot..."
+    with tracing.span("wait for download slot", "queue"):
+        _acquire(job.queue.download_slots)
+    try:
+        _set_state(DOWNLOADING)
+        yield
+    finally:
+        job.queue.download_slots.release()
+
+
+@contextmanager
+def encode_slot():
+    """
+    Holds one of the queue's encode slots for the duration of an ffmpeg cut.
+    Outside the queue this is a no-op.
+    """
+    job = current_job()
+    if job is None or job.queue is None:
+        yield
+        return
+    job.status = "Waiting for an encode slot..."
+    with tracing.span("wait for encode slot", "queue"):
+        _acquire(job.queue.encode_slots)
+    try:
+        _set_state(CUTTING)
+        yield
+    finally:
+        job.queue.encode_slots.release()
+
+
+class JobQueue:
+    """
+    Runs submitted jobs on a pool of worker threads. Downloads and encodes are limited
+    separately so network-bound and CPU-bound stages of different jobs can overlap.
+    run_func(params, log_func, status_func, progress_func) does the actual work and
+    returns a truthy result on success.
+    With a state_path, the parameters of unfinished jobs are kept in that JSON file, so
+    jobs interrupted by a crash or by closing the app can be resubmitted on the next start
+    (see load_saved_jobs).
+    """
+
+    def __init__(self, run_func, log_func, max_jobs=3, max_downloads=2, max_encodes=1, state_path=None):
+        self.run_func = run_func
+        self.log_func = log_func
+        self.state_path = state_path
+        self._state_lock = threading.Lock()
+        self.download_slots = threading.BoundedSemaphore(max_downloads)
+        self.encode_slots = threading.BoundedSemaphore(max_encodes)
+        self.jobs = []
+        self._pending = []
+        self._unfinished = 0
+        self._cond = threading.Condition()
+        for i in range(max_jobs):
+            threading.Thread(target=self._worker, name=f"job-worker-{i + 1}", daemon=True).start()
+
+    def submit(self, params):
+        """
+        Queues a job for params and returns its Job object.
+        """
+        job = Job(params)
+        job.queue = self
+        with self._cond:
+            self.jobs.append(job)
+            self._pending.append(job)
+            self._unfinished += 1
+            self._cond.notify_all()
+        self.save_state()
+        return job
+
+    def throughput(self):
+        """
+        Current aggregate download speed of all jobs, in bytes per second.
+        """
+        return sum(job.current_speed for job in list(self.jobs) if job.state not in FINISHED_STATES)
+
+    def cancel(self, job):
+        """
+        Cancels job: a pending job is dropped, a running one is stopped (see Job.cancel).
+        """
+        with self._cond:
+            dropped = job in self._pending
+            if dropped:
+                self._pending.remove(job)
+                job.state = CANCELLED
+                job.status = "Cancelled"
+                job.finished = time.time()
+                self._unfinished -= 1
+                self._cond.notify_all()
+        job.cancel()
+        if dropped:
+            self.save_state()
+
+    def cancel_all(self):
+        for job in list(self.jobs):
+            if job.state not in FINISHED_STATES:
+                self.cancel(job)
+
+    def save_state(self):
+        """
+        Writes the parameters of all unfinished jobs to state_path (if set).
+        """
+        if not self.state_path:
+            return
+        unfinished = [job.params for job in list(self.jobs) if job.state not in FINISHED_STATES]
+        with self._state_lock:
+            try:
+                tmp = self.state_path + ".tmp"
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(unfinished, f, indent=2)
+                os.replace(tmp, self.state_path)
+            except (OSError, TypeError, ValueError) as e:
+                self.log_func("Could not save the job list: " + str(e))
+
+    def wait(self):
+        """
+        Blocks until every submitted job has finished.
+        """
+        with self._cond:
+            while self._unfinished:
+                # Timed, because an untimed wait can't be interrupted by Ctrl+C on Windows.
+                self._cond.wait(0.5)
+
+    def counts(self):
+        """
+        Returns a {state: number of jobs} summary.
+        """
+        summary = {}
+        for job in list(self.jobs):
+            summary[job.state] = summary.get(job.state, 0) + 1
+        return summary
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                # Interactive jobs go ahead of queued batch jobs.
+                job = next((job for job in self._pending if job.interactive), self._pending[0])
+                self._pending.remove(job)
+            self._run(job)
+
+    def _run(self, job):
+        _local.job = job
+        job.started = time.time()
+        prefix = f"[#{job.id}] "
+
+        def log(message):
+            self.log_func(prefix + message)
+
+        def status(message):
+            job.status = message
+
+        try:
+            check_cancelled()
+            job.result = self.run_func(job.params, log, status, job.set_progress)
+            check_cancelled()
+            job.state = DONE if job.result else FAILED
+        except JobCancelled:
+            job.state = CANCELLED
+            job.status = "Cancelled"
+            log("Cancelled.")
+        except Exception as e:
+            job.error = str(e)
+            job.state = FAILED
+            log("Error: " + str(e))
+        finally:
+            job.progress = 1.0 if job.state == DONE else job.progress
+            job.status = "Done" if job.state == DONE else (job.error or job.status)
+            job.finished = time.time()
+            _local.job = None
+            self.save_state()
+            with self._cond:
+                self._unfinished -= 1
+                self._cond.notify_all()
+
+
+def load_saved_jobs(path):
+    """
+    Returns the job parameters JobQueue.save_state left in path, [] if there are none.
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            saved = json.load(f)
+    except (OSError, ValueError):
+        return []
+    return [params for params in saved if isinstance(params, dict) and params.get("url")] if isinstance(saved, list) else []
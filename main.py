@@ -1,13 +1,18 @@
-from gui import GUIApp
+import startup
+
+startup.begin()
+
 import customtkinter as ctk
 import traceback
 import tkinter.messagebox as messagebox
+from gui import GUIApp
 
 if __name__ == "__main__":
     try:
-        # Configure customtkinter appearance
+        # Configure customtkinter appearance (the only place this is done)
         ctk.set_appearance_mode("system")  # Use system theme (or "dark"/"light")
         ctk.set_default_color_theme("blue")  # Set theme color
+        startup.mark("imports done")
         
         # Create the root window
         root = ctk.CTk()
@@ -15,6 +20,13 @@ if __name__ == "__main__":
         # Handle exceptions gracefully
         try:
             app = GUIApp(root)
+            startup.mark("window built")
+
+            def first_frame():
+                startup.mark("first frame")
+                startup.report(app.log)
+
+            root.after_idle(first_frame)
             root.mainloop()
         except Exception as e:
             traceback_text = traceback.format_exc()
@@ -0,0 +1,191 @@
+import os
+import json
+import threading
+import time
+import urllib.request
+from downloader import Download, extract_members, fetch_checksum, sha256_file
+from utils import current_dir
+
+# Installed dependencies: for each one the installed version, the published checksum of
+# what was downloaded, and the size/mtime/hash of every file it provides.
+MANIFEST_PATH = os.path.join(current_dir, "dependencies.json")
+
+# How often (seconds) the background upgrade asks the release servers for a new version.
+UPGRADE_CHECK_INTERVAL = 24 * 3600
+
+DEPENDENCIES = {
+    "yt-dlp": {
+        "download": "yt-dlp.exe",
+        "url": "https://github.com/yt-dlp/yt-dlp/releases/latest/download/yt-dlp.exe",
+        "sums_url": "https://github.com/yt-dlp/yt-dlp/releases/latest/download/SHA2-256SUMS",
+        # Redirects to .../releases/tag/<version>
+        "release_url": "https://github.com/yt-dlp/yt-dlp/releases/latest",
+        "files": ["yt-dlp.exe"],
+    },
+    "ffmpeg": {
+        "download": "ffmpeg.zip",
+        "url": "https://github.com/BtbN/FFmpeg-Builds/releases/download/latest/ffmpeg-master-latest-win64-gpl.zip",
+        "sums_url": "https://github.com/BtbN/FFmpeg-Builds/releases/download/latest/checksums.sha256",
+        # Rolling "latest" tag: the build is identified by the archive's checksum.
+        "release_url": None,
+        "files": ["ffmpeg.exe", "ffprobe.exe"],
+    },
+}
+
+_lock = threading.Lock()
+
+
+def load_manifest():
+    try:
+        with open(MANIFEST_PATH, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(manifest):
+    tmp = MANIFEST_PATH + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, MANIFEST_PATH)
+
+
+def _file_entry(name, sha256=None):
+    st = os.stat(os.path.join(current_dir, name))
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": sha256}
+
+
+def is_installed(name, manifest=None):
+    """
+    Returns True if every file of dependency name is present and unchanged since it was
+    recorded in the manifest. Costs one stat() per file, no hashing.
+    """
+    entry = (manifest if manifest is not None else load_manifest()).get(name)
+    if not entry:
+        return False
+    for file_name in DEPENDENCIES[name]["files"]:
+        recorded = entry.get("files", {}).get(file_name)
+        try:
+            st = os.stat(os.path.join(current_dir, file_name))
+        except OSError:
+            return False
+        if not recorded or (st.st_size, st.st_mtime_ns) != (recorded["size"], recorded["mtime_ns"]):
+            return False
+    return True
+
+
+def has_files(name):
+    """
+    Returns True if all files of dependency name exist (e.g. installed before the manifest existed).
+    """
+    return all(os.path.isfile(os.path.join(current_dir, f)) for f in DEPENDENCIES[name]["files"])
+
+
+def record(name, version=None, source_sha256=None, hashes=None):
+    """
+    Records the currently installed files of dependency name in the manifest.
+    """
+    with _lock:
+        manifest = load_manifest()
+        manifest[name] = {
+            "version": version,
+            "source_sha256": source_sha256,
+            "installed": time.time(),
+            "checked": time.time(),
+            "files": {f: _file_entry(f, (hashes or {}).get(f)) for f in DEPENDENCIES[name]["files"]},
+        }
+        save_manifest(manifest)
+
+
+def latest_release(name):
+    """
+    Asks the release server for the newest build of dependency name.
+    Returns (version, published sha256 of the download); either may be None.
+    """
+    spec = DEPENDENCIES[name]
+    sha256 = fetch_checksum(spec["sums_url"], os.path.basename(spec["url"]))
+    version = sha256[:12] if sha256 else None
+    if spec["release_url"]:
+        try:
+            req = urllib.request.Request(spec["release_url"], method="HEAD")
+            with urllib.request.urlopen(req, timeout=30) as resp:
+                version = resp.geturl().rstrip("/").rpartition("/")[2] or version
+        except OSError:
+            pass
+    return version, sha256
+
+
+def install(name, log_func=print):
+    """
+    Downloads (verified), extracts and records the latest release of dependency name.
+    Raises on failure; the previously installed files stay in place until then.
+    """
+    spec = DEPENDENCIES[name]
+    version, sha256 = latest_release(name)
+    target = os.path.join(current_dir, spec["download"])
+    if sha256 is None:
+        log_func(f"No published checksum found for {spec['download']}, skipping verification.")
+    Download(spec["url"], target, sha256).run()
+
+    hashes = {}
+    if spec["download"].endswith(".zip"):
+        log_func(f"Extracting {', '.join(spec['files'])}...")
+        hashes = extract_members(target, spec["files"], current_dir)
+        try:
+            os.remove(target)
+        except OSError:
+            pass
+    else:
+        hashes[spec["download"]] = sha256 or sha256_file(target)
+    record(name, version, sha256, hashes)
+    log_func(f"{name} {version or ''} installed.")
+
+
+def _mark_checked(name, version=None, source_sha256=None):
+    with _lock:
+        manifest = load_manifest()
+        entry = manifest[name]
+        entry["checked"] = time.time()
+        entry["version"] = entry.get("version") or version
+        entry["source_sha256"] = entry.get("source_sha256") or source_sha256
+        save_manifest(manifest)
+
+
+def upgrade_dependencies(log_func=print, force=False):
+    """
+    Checks every installed dependency for a newer release (at most once per
+    UPGRADE_CHECK_INTERVAL unless force) and installs it. Files are replaced only after
+    the new download has been verified, so a failed upgrade leaves the old version working.
+    """
+    for name, spec in DEPENDENCIES.items():
+        entry = load_manifest().get(name)
+        if not entry:
+            continue
+        known = entry.get("source_sha256")
+        if known and not force and time.time() - entry.get("checked", 0) < UPGRADE_CHECK_INTERVAL:
+            continue
+        try:
+            version, sha256 = latest_release(name)
+            if sha256 is None:
+                continue
+            if known is None and not spec["download"].endswith(".zip") and \
+                    sha256_file(os.path.join(current_dir, spec["download"])) == sha256:
+                # Adopted from an install that predates the manifest, and already current.
+                known = sha256
+            if sha256 == known:
+                _mark_checked(name, version, sha256)
+                continue
+            log_func(f"Upgrading {name} to {version}...")
+            install(name, log_func)
+        except Exception as e:
+            # Typically a file in use by a running job (Windows); retried on the next start.
+            log_func(f"Upgrade of {name} failed: {e}")
+
+
+def start_background_upgrade(log_func=print):
+    """
+    Runs upgrade_dependencies on a daemon thread, off the start-up path.
+    """
+    thread = threading.Thread(target=upgrade_dependencies, args=(log_func,), name="dependency-upgrade", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,106 @@
+import os
+import queue
+import threading
+import time
+
+
+class UIBus:
+    """
+    Thread-safe bridge between worker threads and the Tk main loop.
+
+    Workers call log(), status() and progress() from any thread; these only put a message
+    on a queue. The main loop drains the queue every interval_ms via master.after(),
+    hands all pending log lines to on_log as one batch and applies only the latest
+    status text and progress value, so chatty tools can't flood the event loop.
+    Every log line is also appended to log_path (if given) with a timestamp. Once the file
+    exceeds log_max_bytes it is renamed to log_path + ".1" (replacing the previous one)
+    and a new file is started, so at most about twice that is kept on disk.
+    """
+
+    def __init__(self, master, on_log, on_status, on_progress, interval_ms=100, max_batch=1000, log_path=None,
+                 log_max_bytes=5 * 1024 * 1024):
+        self.master = master
+        self.on_log = on_log
+        self.on_status = on_status
+        self.on_progress = on_progress
+        self.interval_ms = interval_ms
+        self.max_batch = max_batch
+        self._queue = queue.SimpleQueue()
+        self._latest = {}
+        self._latest_lock = threading.Lock()
+        self.log_path = log_path
+        self.log_max_bytes = log_max_bytes
+        self._log_file = None
+        if log_path:
+            try:
+                self._log_file = open(log_path, "a", encoding="utf-8")
+            except OSError:
+                pass
+
+    def _write_log(self, lines):
+        stamp = time.strftime("%Y-%m-%d %H:%M:%S")
+        self._log_file.write("".join(f"{stamp} {line}\n" for line in lines))
+        self._log_file.flush()
+        if self.log_max_bytes and self._log_file.tell() > self.log_max_bytes:
+            self._log_file.close()
+            self._log_file = None
+            try:
+                os.replace(self.log_path, self.log_path + ".1")
+                self._log_file = open(self.log_path, "a", encoding="utf-8")
+            except OSError:
+                pass
+
+    def log(self, message):
+        self._queue.put(message)
+
+    def status(self, message):
+        with self._latest_lock:
+            self._latest["status"] = message
+
+    def progress(self, value):
+        """
+        value is 0..1 overall progress.
+        """
+        with self._latest_lock:
+            self._latest["progress"] = value
+
+    def start(self):
+        self.master.after(self.interval_ms, self._drain)
+
+    def _drain(self):
+        lines = []
+        try:
+            while len(lines) < self.max_batch:
+                lines.append(self._queue.get_nowait())
+        except queue.Empty:
+            pass
+        with self._latest_lock:
+            latest, self._latest = self._latest, {}
+
+        if lines:
+            self.on_log(lines)
+            if self._log_file:
+                self._write_log(lines)
+        if "status" in latest:
+            self.on_status(latest["status"])
+        if "progress" in latest:
+            self.on_progress(latest["progress"])
+
+        # Come back sooner if a backlog is left over.
+        self.master.after(1 if len(lines) >= self.max_batch else self.interval_ms, self._drain)
+
+    def close(self):
+        """
+        Writes the log lines still queued to the log file and closes it.
+        """
+        if self._log_file:
+            lines = []
+            try:
+                while True:
+                    lines.append(self._queue.get_nowait())
+            except queue.Empty:
+                pass
+            self._write_log(lines)
+            if self._log_file:
+                self._log_file.close()
+                self._log_file = None
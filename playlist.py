@@ -0,0 +1,72 @@
+# Playlist and channel ingestion: a flat extraction (yt-dlp --flat-playlist) lists the
+# entries without resolving each video, and every entry becomes a queue job of its own
+# with the settings chosen for the playlist.
+from utils import safe_filename
+
+# Extractors whose flat entries are playlists themselves (a channel's Videos/Shorts/Live
+# tabs) and are expanded one level further.
+NESTED_PLAYLIST_EXTRACTORS = {"YoutubeTab"}
+
+
+def entry_url(entry):
+    """
+    Returns the URL to download a flat playlist entry from, or None if it has none.
+    """
+    url = entry.get("webpage_url") or entry.get("url")
+    if url and "://" not in url and entry.get("ie_key") == "Youtube":
+        # Older yt-dlp versions give YouTube entries as bare video IDs.
+        url = "https://www.youtube.com/watch?v=" + url
+    return url if url and "://" in url else None
+
+
+def is_nested_playlist(entry):
+    return entry.get("_type") == "playlist" or entry.get("ie_key") in NESTED_PLAYLIST_EXTRACTORS
+
+
+def playlist_entries(info, expand=None):
+    """
+    Returns the items of a flat-extracted playlist info dict as (url, title) tuples, in
+    playlist order and without duplicates. Nested playlists are flattened; an entry
+    that is only a link to one (see is_nested_playlist) is passed to expand(url), which
+    returns its flat info dict or None. A single video gives one item.
+    """
+    if info.get("_type") not in ("playlist", "multi_video") and "entries" not in info:
+        url = info.get("webpage_url") or info.get("original_url")
+        return [(url, info.get("title") or "")] if url else []
+    items, seen = [], set()
+
+    def add(entries, depth):
+        for entry in entries or []:
+            if not entry:
+                continue
+            if entry.get("entries") is not None:
+                add(entry["entries"], depth)
+                continue
+            url = entry_url(entry)
+            if url is None or url in seen:
+                continue
+            seen.add(url)
+            if is_nested_playlist(entry) and expand is not None and depth == 0:
+                nested = expand(url)
+                if nested:
+                    add(nested.get("entries"), depth + 1)
+                continue
+            items.append((url, entry.get("title") or entry.get("id") or ""))
+
+    add(info.get("entries"), 0)
+    return items
+
+
+def item_params(params, items):
+    """
+    Returns one job's parameters per playlist item: a copy of params (the settings chosen
+    for the playlist) with the item's URL, named "<output_name>_NNN - <title>".
+    """
+    base = params.get("output_name") or "output"
+    width = max(2, len(str(len(items))))
+    jobs = []
+    for number, (url, title) in enumerate(items, 1):
+        item = dict(params, url=url)
+        item["output_name"] = f"{base}_{number:0{width}d} - {safe_filename(title, f'Item {number}')}"
+        jobs.append(item)
+    return jobs
@@ -0,0 +1,75 @@
+import os
+import json
+import time
+import hashlib
+
+
+class ProbeCache:
+    """
+    On-disk cache of yt-dlp info JSON (the output of -J), one file per URL and format
+    selection, valid for ttl seconds. A fresh entry is handed to later downloads with
+    --load-info-json so the extractor doesn't run again. The stream URLs inside expire,
+    so the TTL should stay well under the sites' URL lifetime (a few hours on YouTube).
+    """
+
+    def __init__(self, cache_dir, ttl):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _file(self, url, format_args):
+        raw = url + "|" + " ".join(format_args)
+        return os.path.join(self.cache_dir, hashlib.sha1(raw.encode("utf-8")).hexdigest() + ".info.json")
+
+    def path(self, url, format_args=()):
+        """
+        Returns the info JSON file for url if it is younger than the TTL, else None.
+        """
+        path = self._file(url, format_args)
+        try:
+            if time.time() - os.path.getmtime(path) < self.ttl:
+                return path
+        except OSError:
+            pass
+        return None
+
+    def get(self, url, format_args=()):
+        """
+        Returns the cached info dict for url, or None if there is no fresh entry.
+        """
+        path = self.path(url, format_args)
+        if path is None:
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, url, format_args, info):
+        """
+        Stores info for url and returns the file's path. Expired entries are removed on the way.
+        """
+        self.prune()
+        path = self._file(url, format_args)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(info, f)
+        os.replace(tmp, path)
+        return path
+
+    def invalidate(self, url, format_args=()):
+        try:
+            os.remove(self._file(url, format_args))
+        except OSError:
+            pass
+
+    def prune(self):
+        now = time.time()
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            try:
+                if now - os.path.getmtime(path) >= self.ttl:
+                    os.remove(path)
+            except OSError:
+                pass
@@ -1,163 +1,1115 @@
 import os
-import shutil
+import glob
+import hashlib
+import json
 import subprocess
-from utils import converttime, convertname
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+import threading
+import time
+from utils import converttime, convertname, current_dir, find_tool, format_size, process_group_args, validate_range
+from config import load_config
+from cache import SourceCache, link_or_copy
+from probecache import ProbeCache
+from formats import AUDIO_FORMAT_CODECS, apply_plan, plan_formats
+from smartcut import smart_cut
+from chunked import chunk_count, chunked_encode
+from chapters import chapter_filename, chapter_list, split_chapters
+from playlist import playlist_entries
+from bandwidth import BandwidthController, format_rate
+from profiles import resolve_profile, video_codec_args
+import jobqueue
+from jobqueue import JobCancelled, current_job, download_slot, encode_slot, running_process
+from workspace import WORKSPACE_PREFIX, JobWorkspace, resumable_workspaces
+from audio import AUDIO_FORMATS, NATIVE_AUDIO_ARGS, codec_from_info, plan_audio_output, probe_audio_codec
+import ytdlp_engine
+import tracing
+from progress import (
+    FFMPEG_PROGRESS_ARGS, YTDLP_PROGRESS_ARGS, FfmpegProgressParser, OverallProgress, ProgressEvent,
+    YtDlpProgressParser, event_from_ytdlp_hook, iter_lines, stage_weights,
+)
 
-def run_command(command, log_func):
+# Extra seconds fetched on both sides of a section download, so the requested
+# range never starts before the first keyframe that made it into the file.
+SECTION_MARGIN = 2.0
+
+_source_cache = None
+_source_cache_lock = threading.Lock()
+_ytdlp_engine = None
+_ytdlp_engine_lock = threading.Lock()
+_probe_cache = None
+_probe_cache_lock = threading.Lock()
+_bandwidth_controller = None
+_bandwidth_controller_lock = threading.Lock()
+
+def run_command(command, log_func, progress_func=None, parser=None):
     """
-    Runs a shell command and sends each line of its output to log_func in real time.
-    Returns the completed process.
+    Runs a command and sends each line of its output to log_func in real time.
+    The command may be a shell string or an argument list (run without a shell).
+    Output is read as it arrives, so "\r"-terminated progress lines are not held back.
+    With a parser (see progress.py), progress lines are turned into ProgressEvents for
+    progress_func instead of being logged.
+    Returns the completed process. In a trace (see tracing.py) the command is recorded
+    as a process span with its CPU time, exit code and file sizes.
+    Inside a queued job, cancelling the job kills the command with its children and
+    raises JobCancelled here.
     """
-    log_func(f"Executing: {command}")
-    proc = subprocess.Popen(command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
-    while True:
-        line = proc.stdout.readline()
-        if line:
-            log_func(line.strip())
-        if not line and proc.poll() is not None:
-            break
+    if isinstance(command, str):
+        log_func(f"Executing: {command}")
+        name = "shell"
+    else:
+        log_func("Executing: " + subprocess.list2cmdline(command))
+        name = os.path.splitext(os.path.basename(command[0]))[0]
+    with tracing.span(name, "process") as span:
+        proc = subprocess.Popen(command, shell=isinstance(command, str), stdout=subprocess.PIPE,
+                                stderr=subprocess.STDOUT, **process_group_args())
+        with running_process(proc):
+            for line in iter_lines(proc.stdout):
+                is_progress, event = parser.feed(line) if parser else (False, None)
+                if not is_progress:
+                    log_func(line.strip())
+                elif event is not None and progress_func:
+                    progress_func(event)
+            cpu = tracing.wait(proc)
+        bytes_in, bytes_out = tracing.command_io(command)
+        span.set(exit_code=proc.returncode, cpu=cpu, bytes_in=bytes_in, bytes_out=bytes_out)
     return proc
 
-def process_full_video_gui(url, output_name, out_dir, log_func, status_func, progress_bar):
-    # Step 1: Download Video (Overall: 0% -> 60%)
-    status_func("Downloading video... 0%")
-    log_func("Starting yt-dlp download for full video...")
-    cmd = f'yt-dlp "{url}" --no-playlist --merge-output-format mp4 -o input.mp4'
-    run_command(cmd, log_func)
-    if not os.path.exists("input.mp4"):
-        log_func("Video download failed.")
-        status_func("Download failed")
-        return
-    progress_bar['value'] = 60
-    status_func("Video download complete. (60%)")
-    log_func("Video downloaded successfully.")
-    
-    # Step 2: Process Video (60% -> 95%)
-    status_func("Processing video... 60%")
-    log_func("Moving downloaded video to output location...")
-    destination = os.path.join(out_dir, convertname(output_name) + ".mp4")
+def get_ytdlp_engine():
+    """
+    Returns the shared in-process YtDlpEngine if config.json selects the "library"
+    backend and the yt_dlp package is installed; otherwise None (use yt-dlp.exe).
+    """
+    global _ytdlp_engine
+    if load_config()["ytdlp_backend"] != "library":
+        return None
+    with _ytdlp_engine_lock:
+        if _ytdlp_engine is None:
+            if not ytdlp_engine.available():
+                return None
+            _ytdlp_engine = ytdlp_engine.YtDlpEngine()
+        return _ytdlp_engine
+
+def run_ytdlp(args, log_func, progress_func=None):
+    """
+    Runs yt-dlp with args (without the program name) on the configured backend:
+    in-process through the yt_dlp package, or as a yt-dlp.exe subprocess.
+    Download progress is delivered to progress_func as ProgressEvents.
+    Logs how long the call took so both backends can be compared.
+    Returns an object with a returncode attribute.
+    """
+    engine = get_ytdlp_engine()
+    started = time.perf_counter()
+    progress_func = jobqueue.download_progress(progress_func)
+    if engine is not None:
+        log_func("Executing (in-process): yt-dlp " + subprocess.list2cmdline(args))
+        hook = (lambda d: progress_func(event_from_ytdlp_hook(d))) if progress_func else None
+        with tracing.span("yt-dlp (in-process)", "process") as span:
+            result = engine.run(args, log_func, hook)
+            span.set(exit_code=result.returncode)
+        # The in-process download can't be interrupted; a cancel takes effect once it returns.
+        jobqueue.check_cancelled()
+        backend = "library"
+    else:
+        result = run_command([find_tool("yt-dlp"), *YTDLP_PROGRESS_ARGS, *args], log_func,
+                             progress_func, YtDlpProgressParser())
+        backend = "subprocess"
+    log_func(f"yt-dlp ({backend}) finished in {time.perf_counter() - started:.2f}s")
+    return result
+
+def probe_cache():
+    """
+    Returns the shared ProbeCache, or None if probe_cache_ttl is 0 in config.json.
+    """
+    global _probe_cache
+    with _probe_cache_lock:
+        if _probe_cache is None:
+            ttl = load_config()["probe_cache_ttl"]
+            if not ttl:
+                return None
+            _probe_cache = ProbeCache(os.path.join(current_dir, "cache", "probes"), ttl)
+        return _probe_cache
+
+@tracing.traced("probe")
+def probe_media(url, log_func, format_args=()):
+    """
+    Runs yt-dlp metadata extraction (no download) for a single URL, or returns the
+    cached result of an earlier extraction (see ProbeCache).
+    Returns the info dict, or None if extraction failed.
+    """
+    format_args = list(format_args)
+    cache = probe_cache()
+    info = cache.get(url, format_args) if cache else None
+    if info is not None:
+        log_func("Using cached metadata.")
+        return info
+    info = _extract_info([url, "--no-playlist", *format_args], log_func)
+    if info and cache:
+        try:
+            cache.put(url, format_args, info)
+        except OSError:
+            pass
+    return info
+
+def _extract_info(args, log_func):
+    """
+    Runs yt-dlp's extraction (-J) with args on the configured backend.
+    Returns the info dict, or None if extraction failed.
+    """
+    engine = get_ytdlp_engine()
+    if engine is not None:
+        return engine.extract_info(args, log_func)
+    cmd = [find_tool("yt-dlp"), *args, "-J"]
     try:
-        shutil.move("input.mp4", destination)
-        progress_bar['value'] = 95
-        status_func("Video processing complete. (95%)")
-        log_func("Video saved successfully at: " + destination)
-    except Exception as e:
-        log_func("Error during processing: " + str(e))
-        status_func("Error during processing")
-        return
-    
-    # Step 3: Clean Up (95% -> 100%)
-    progress_bar['value'] = 100
-    status_func("Process complete. (100%)")
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+                                **process_group_args())
+        with running_process(proc):
+            out, err = proc.communicate()
+        if proc.returncode != 0:
+            log_func("Metadata probe failed: " + err.strip())
+            return None
+        return json.loads(out)
+    except (OSError, ValueError) as e:
+        log_func("Metadata probe failed: " + str(e))
+        return None
 
-def process_cut_video_gui(url, output_name, out_dir, start, end, log_func, status_func, progress_bar):
-    # Step 1: Download Video (Overall: 0% -> 60%)
-    status_func("Downloading video... 0%")
-    log_func("Starting yt-dlp download for video cutting...")
-    cmd = f'yt-dlp "{url}" --no-playlist --merge-output-format mp4 -o input.mp4'
-    run_command(cmd, log_func)
-    if not os.path.exists("input.mp4"):
-        log_func("Video download failed.")
-        status_func("Download failed")
-        return
-    progress_bar['value'] = 60
-    status_func("Video download complete. (60%)")
-    log_func("Video downloaded successfully.")
-    
-    # Step 2: Process (Cut) Video (Overall: 60% -> 95%)
-    # If start is empty, assume 0; if end is empty, process until the end (omit duration).
-    actual_start = converttime(start) if start.strip() else 0
-    if end.strip():
-        actual_end = converttime(end)
-        duration = actual_end - actual_start
-        duration_option = f"-t {duration}"
-        log_func(f"Cutting video from {start if start.strip() else '0:00'} to {end}...")
+def probe_playlist(url, log_func):
+    """
+    Lists the items of a playlist or channel URL as (url, title) tuples, using flat
+    extraction (one request per playlist page instead of one per video). A channel's
+    tabs (videos, shorts, live) are expanded too. A single video URL gives one item;
+    [] means extraction failed.
+    """
+    def flat_info(playlist_url):
+        return _extract_info([playlist_url, "--yes-playlist", "--flat-playlist"], log_func)
+
+    info = flat_info(url)
+    if not info:
+        return []
+    if not info.get("webpage_url") and not info.get("original_url"):
+        info = dict(info, webpage_url=url)
+    return playlist_entries(info, flat_info)
+
+def _cached_info(url, download_args):
+    """
+    Returns (path, probe args) of a fresh cached info JSON for url, or (None, None).
+    Any of the app's probes will do, not only one with the same format selection:
+    yt-dlp redoes the selection from the full format list in the file.
+    """
+    cache = probe_cache()
+    if cache is None:
+        return None, None
+    for args in (_probe_args(download_args), [], _probe_args(NATIVE_AUDIO_ARGS)):
+        path = cache.path(url, args)
+        if path:
+            return path, args
+    return None, None
+
+def _source_args(url, download_args):
+    """
+    yt-dlp arguments naming the media to download: the cached info JSON of url when
+    there is a fresh one (skipping extraction), otherwise url itself.
+    """
+    path, _ = _cached_info(url, download_args)
+    return ["--load-info-json", path] if path else [url]
+
+def bandwidth_controller():
+    """
+    Returns the shared BandwidthController, or None if bandwidth_budget_mbit is 0 in config.json.
+    """
+    global _bandwidth_controller
+    with _bandwidth_controller_lock:
+        if _bandwidth_controller is None:
+            config = load_config()
+            if not config["bandwidth_budget_mbit"]:
+                return None
+            _bandwidth_controller = BandwidthController(
+                config["bandwidth_budget_mbit"] * 1000 * 1000 / 8, config["interactive_weight"],
+                config["concurrent_fragments"], config["max_fragments"])
+        return _bandwidth_controller
+
+def is_fragmented(info):
+    """
+    True if info's selected formats are fetched in fragments (DASH, HLS, ...), where
+    concurrent fragment downloads help. False for single files or when unknown.
+    """
+    formats = (info or {}).get("requested_formats") or [info or {}]
+    return any(f.get("protocol") not in (None, "http", "https", "ftp") for f in formats)
+
+def _run_download(source, args, log_func, progress_func, fragmented, restartable):
+    """
+    One yt-dlp download of source with args. Inside a queued job with a bandwidth budget
+    it runs under a lease of the BandwidthController (rate limit and fragment count) and
+    is restarted with new settings when the controller rebalances. Otherwise it uses
+    config.json's concurrent_fragments.
+    """
+    controller = bandwidth_controller()
+    job = current_job()
+    if controller is None or job is None:
+        fragments = load_config()["concurrent_fragments"]
+        tuning = ["--concurrent-fragments", str(fragments)] if fragments > 1 else []
+        return run_ytdlp([*source, "--no-playlist", *tuning, *args], log_func, progress_func)
+    with controller.lease(job, fragmented, restartable) as lease:
+        log_func(f"Bandwidth share: {format_rate(lease.limit)}, {lease.fragments if fragmented else 1} fragment(s)")
+        while True:
+            result = run_ytdlp([*source, "--no-playlist", *lease.args(), *args], log_func, progress_func)
+            if result.returncode == 0 or not lease.take_restart():
+                return result
+            log_func(f"Bandwidth share changed to {format_rate(lease.limit)}, "
+                     f"{lease.fragments if fragmented else 1} fragment(s); continuing the download...")
+
+def run_ytdlp_source(url, download_args, args, log_func, progress_func=None, retries=None, info=None):
+    """
+    Runs yt-dlp on url (from its cached info JSON if possible) with args. If the cached
+    info no longer works (e.g. its stream URLs expired), it is dropped and the download
+    is retried with a fresh extraction.
+    A download that still fails is retried up to retries times (default: config.json's
+    download_retries) with exponential backoff. The output path stays the same, so
+    yt-dlp continues from the .part file the failed attempt left behind.
+    Rate limit and concurrent fragments are set by _run_download; info (the probe
+    result, if known) tells whether the media is fragmented.
+    """
+    fragmented = is_fragmented(info)
+    # Section downloads go through ffmpeg and can't continue from a partial file.
+    restartable = "--download-sections" not in args
+
+    def download(source):
+        return _run_download(source, args, log_func, progress_func, fragmented, restartable)
+
+    path, probe_args = _cached_info(url, download_args)
+    result = download(["--load-info-json", path] if path else [url])
+    if result.returncode != 0 and path:
+        log_func("Cached metadata is stale, extracting again...")
+        probe_cache().invalidate(url, probe_args)
+        result = download([url])
+    config = load_config()
+    retries = config["download_retries"] if retries is None else retries
+    for attempt in range(1, retries + 1):
+        if result.returncode == 0:
+            break
+        delay = jobqueue.retry_delay(attempt, config["retry_backoff"])
+        log_func(f"Download failed, retry {attempt}/{retries} in {delay:.0f}s...")
+        with tracing.span("retry backoff", "queue"):
+            jobqueue.sleep(delay)
+        result = download([url])
+    return result
+
+def plan_download(info, media, download_args, log_func, max_height=None, audio_format=None):
+    """
+    Narrows download_args to the smallest formats that meet the target resolution, frame
+    rate and codec (see formats.py and config.json) and logs the choice with its expected
+    size. Returns (download_args, info), info describing the planned formats; both are
+    returned unchanged if planning is off or not possible.
+    """
+    config = load_config()
+    if not info or not config["format_planner"]:
+        return download_args, info
+    plan = plan_formats(info, media == "Audio", max_height or config["max_height"] or None,
+                        config["max_fps"] or None, config["preferred_vcodec"] or None,
+                        acodec=AUDIO_FORMAT_CODECS.get(audio_format))
+    if plan is None:
+        log_func("Format plan: no usable format list, using yt-dlp's default selection.")
+        return download_args, info
+    log_func(f"Format plan: {plan.description} (~{format_size(plan.size) if plan.size else '? MB'})")
+    args = list(download_args)
+    if "-f" in args:
+        args[args.index("-f") + 1] = plan.format_spec
     else:
-        duration_option = ""
-        log_func(f"Cutting video from {start if start.strip() else '0:00'} until end...")
-    status_func("Cutting video... 60%")
+        args = ["-f", plan.format_spec, *args]
+    return args, apply_plan(info, plan)
+
+def describe_media(info):
+    """
+    One-line summary of a probed media for display: title, duration, expected size and
+    the available video heights and audio codecs.
+    """
+    parts = [info.get("title") or info.get("id") or "?"]
+    if info.get("duration"):
+        seconds = int(info["duration"])
+        parts.append(f"{seconds // 3600}:{seconds // 60 % 60:02d}:{seconds % 60:02d}" if seconds >= 3600
+                     else f"{seconds // 60}:{seconds % 60:02d}")
+    size = expected_filesize(info)
+    if size:
+        parts.append("~" + format_size(size))
+    formats = info.get("formats") or []
+    heights = sorted({f["height"] for f in formats if f.get("height") and f.get("vcodec") != "none"})
+    audio = sorted({f["acodec"].split(".")[0] for f in formats
+                    if f.get("acodec") not in (None, "none") and f.get("vcodec") in (None, "none")})
+    if heights:
+        parts.append("video " + ", ".join(f"{h}p" for h in heights))
+    if audio:
+        parts.append("audio " + ", ".join(audio))
+    if info.get("chapters"):
+        parts.append(f"{len(info['chapters'])} chapters")
+    return " | ".join(parts)
+
+def expected_filesize(info):
+    """
+    Returns the expected size in bytes of the format(s) yt-dlp selected in info,
+    or None if the extractor did not report one.
+    """
+    formats = info.get("requested_formats") or [info]
+    total = 0
+    for fmt in formats:
+        size = fmt.get("filesize") or fmt.get("filesize_approx")
+        if not size:
+            return None
+        total += size
+    return total
+
+def resolve_output(output):
+    """
+    Returns the file yt-dlp wrote for output, or None if there is none. output may be a
+    template ending in "%(ext)s" (native audio downloads keep the source's extension).
+    """
+    if "%(ext)s" not in output:
+        return output if os.path.exists(output) else None
+    pattern = glob.escape(output.replace("%(ext)s", "")) + "*"
+    for path in sorted(glob.glob(pattern)):
+        if not path.endswith((".part", ".ytdl", ".json")) and ".part-Frag" not in path:
+            return path
+    return None
+
+def _probe_args(download_args):
+    # Only the format selection influences what the probe reports.
+    return download_args[download_args.index("-f"):][:2] if "-f" in download_args else []
+
+def source_cache():
+    """
+    Returns the shared SourceCache configured in config.json, or None if caching is disabled.
+    """
+    global _source_cache
+    with _source_cache_lock:
+        if _source_cache is None:
+            config = load_config()
+            if not config["cache_enabled"]:
+                return None
+            cache_dir = config["cache_dir"] or os.path.join(current_dir, "cache", "sources")
+            _source_cache = SourceCache(cache_dir, int(config["cache_max_gb"] * 1024 ** 3))
+        return _source_cache
+
+def _cache_lookup(url, download_args, log_func, info=None):
+    """
+    Looks the source of url up in the source cache.
+    Returns (key, cached_path); key is None when caching is off or the probe failed.
+    """
+    cache = source_cache()
+    if cache is None:
+        return None, None
+    if info is None:
+        info = probe_media(url, log_func, _probe_args(download_args))
+        if not info:
+            return None, None
+    key = SourceCache.make_key(info, download_args)
+    path = cache.lookup(key)
+    log_func(("Cache hit. " if path else "Cache miss. ") + cache.stats())
+    return key, path
+
+@tracing.traced("download")
+def download_full(url, output, download_args, log_func, info=None, progress_func=None):
+    """
+    Makes the whole source media available, either from the source cache or by
+    downloading it into output (which is then added to the cache).
+    Returns (path, from_cache); path is None if the download failed.
+    """
+    key, cached = _cache_lookup(url, download_args, log_func, info)
+    if cached:
+        return cached, True
+    run_ytdlp_source(url, download_args, [*download_args, "-o", output], log_func, progress_func, info=info)
+    path = resolve_output(output)
+    if path is None:
+        return None, False
+    if key and source_cache().store(key, path) is None:
+        log_func("Not cached: the file is larger than the cache or on another drive than cache_dir.")
+    return path, False
+
+def fetch_cut_source(url, output, start, end, download_args, log_func, section_only=True, workspace=None,
+                     info=None, progress_func=None):
+    """
+    Makes the media needed to cut start..end (in seconds, end may be None) available.
+    A cached full source is used as is. Otherwise, with section_only, only the requested
+    range plus SECTION_MARGIN on each side is fetched into output using yt-dlp's
+    --download-sections; if that fails (e.g. the extractor can't serve ranges) the whole
+    media is downloaded instead.
+    Returns (path, offset): the file to cut from and the position of start inside it,
+    or (None, None) if the download failed. Only delete path if it is next to output
+    (a cached source lives elsewhere). output may end in "%(ext)s", see resolve_output.
+    If a JobWorkspace is given, a full download is refused when it would not fit on disk.
+    info is the probe result for url, if the caller already has it.
+    """
+    with download_slot():
+        if info is None:
+            info = probe_media(url, log_func, _probe_args(download_args))
+        return _fetch_cut_source(url, output, start, end, download_args, log_func, section_only, workspace,
+                                 info, progress_func)
+
+@tracing.traced("download")
+def _fetch_cut_source(url, output, start, end, download_args, log_func, section_only, workspace, info,
+                      progress_func):
+    key, cached = _cache_lookup(url, download_args, log_func, info) if info else (None, None)
+    if cached:
+        return cached, start
+
+    if section_only and (start > 0 or end is not None):
+        section_start = max(0.0, start - SECTION_MARGIN)
+        section_end = f"{end + SECTION_MARGIN}" if end is not None else "inf"
+        log_func(f"Downloading section {section_start}-{section_end} only...")
+        # No retries here: a failed section download falls back to the full download, which retries.
+        proc = run_ytdlp_source(url, download_args, ["--download-sections", f"*{section_start}-{section_end}",
+                                                     *download_args, "-o", output], log_func, progress_func,
+                                retries=0, info=info)
+        path = resolve_output(output)
+        if proc.returncode == 0 and path:
+            full_size = expected_filesize(info) if info else None
+            fetched = os.path.getsize(path)
+            if full_size:
+                log_func(f"Section download: {format_size(fetched)} fetched instead of "
+                         f"~{format_size(full_size)} ({format_size(max(full_size - fetched, 0))} saved).")
+            else:
+                log_func(f"Section download: {format_size(fetched)} fetched.")
+            return path, start - section_start
+        log_func("Section download not available for this source, falling back to full download...")
+        if path:
+            os.remove(path)
+
+    if workspace and info and not workspace.has_space_for(expected_filesize(info)):
+        log_func(f"Not enough free space for ~{format_size(expected_filesize(info))}.")
+        return None, None
+    path, _ = download_full(url, output, download_args, log_func, info, progress_func)
+    return (path, start) if path else (None, None)
+
+def _ffmpeg_cut(src, start, end, destination, codec_args, log_func, threads, progress_func, duration):
+    cmd = [find_tool("ffmpeg"), "-v", "error", *FFMPEG_PROGRESS_ARGS, "-ss", f"{start}"]
+    if end is not None:
+        cmd += ["-t", f"{end - start}"]
+    cmd += ["-i", src, "-y", *codec_args]
+    if threads:
+        cmd += ["-threads", str(threads)]
+    cmd.append(destination)
+    if end is not None:
+        duration = end - start
+    proc = run_command(cmd, log_func, progress_func, FfmpegProgressParser(duration))
+    return proc.returncode == 0 and os.path.exists(destination)
+
+@tracing.traced("cut")
+def cut_video(src, start, end, destination, log_func, smart=False, threads=None, progress_func=None, duration=None,
+              profile=None):
+    """
+    Cuts start..end (positions in src, in seconds; end may be None) of src into destination,
+    re-encoding with libx264 (or only the edges, with smart). Returns True if the output exists.
+    Encode progress goes to progress_func; duration is the expected clip length when end is None.
+    profile is an encoding profile name (see profiles.py; None uses config.json's choice).
+    threads, when given, overrides the profile's thread count. Without it, long cuts are
+    encoded as parallel keyframe-aligned chunks (see chunked.py) if config.json allows.
+    """
+    clip_seconds = end - start if end is not None else duration
+    name, settings = resolve_profile(profile, clip_seconds, threads)
+    log_func(f"Encoding profile: {name}")
+    if smart and smart_cut(src, start, end, destination, log_func, run_command, progress_func, settings):
+        return True
+    config = load_config()
+    if threads is None and clip_seconds and config["chunked_encode"]:
+        chunks = chunk_count(clip_seconds, os.cpu_count() or 1, config["chunk_min_seconds"])
+        if chunks > 1 and chunked_encode(src, start, end, destination, video_codec_args(settings, audio=False),
+                                         list(settings.get("audio") or []), log_func, run_command, chunks,
+                                         progress_func):
+            return True
+    return _ffmpeg_cut(src, start, end, destination, video_codec_args(settings), log_func,
+                       threads or settings.get("threads") or None, progress_func, duration)
+
+@tracing.traced("cut")
+def cut_audio(src, start, end, destination, log_func, threads=None, progress_func=None, duration=None,
+              codec_args=None):
+    """
+    Cuts start..end (positions in src, in seconds; end may be None) of src into destination.
+    codec_args come from audio.plan_audio_output ("-c:a copy" cuts without re-encoding);
+    the default encodes to MP3. Returns True if the output exists.
+    """
+    return _ffmpeg_cut(src, start, end, destination, ["-vn", *(codec_args or AUDIO_FORMATS["mp3"][2])],
+                       log_func, threads, progress_func, duration)
+
+def _audio_plan(path, info, audio_format):
+    """
+    Plans the audio output for a downloaded native audio file.
+    Returns (extension, codec args, copies, source codec).
+    """
+    codec = probe_audio_codec(path) or codec_from_info(info)
+    ext, codec_args, copies = plan_audio_output(codec, audio_format)
+    return ext, codec_args, copies, codec
+
+def streamable_format(info):
+    """
+    Returns the format_id yt-dlp selected in info if it is a single progressive HTTP file
+    with both video and audio, which yt-dlp can write to a pipe as it downloads.
+    Returns None for anything else (e.g. separate DASH video and audio that need merging).
+    """
+    if not info or info.get("requested_formats") or info.get("protocol") not in ("http", "https"):
+        return None
+    if (info.get("vcodec") or "none") == "none" or (info.get("acodec") or "none") == "none":
+        return None
+    return info.get("format_id")
+
+@tracing.traced("stream cut")
+def stream_cut(url, format_id, start, end, destination, codec_args, log_func, threads=None, progress_func=None,
+               duration=None):
+    """
+    Cuts start..end (seconds; end may be None) of url's format_id without an intermediate file:
+    yt-dlp writes the media to stdout and ffmpeg encodes it from the pipe as it arrives.
+    ffmpeg stops reading after end, which also ends the download. Returns True if the output exists.
+    Under a bandwidth budget the download gets a fixed rate limit (a pipe can't be resumed,
+    so it is never restarted to change it).
+    """
+    controller = bandwidth_controller()
+    job = current_job()
+    with controller.lease(job, restartable=False) if controller and job else nullcontext() as lease:
+        return _stream_cut(url, format_id, start, end, destination, codec_args, log_func, threads, progress_func,
+                           duration, lease.args() if lease else [])
+
+def _stream_cut(url, format_id, start, end, destination, codec_args, log_func, threads, progress_func, duration,
+                tuning):
+    ytdlp_cmd = [find_tool("yt-dlp"), *YTDLP_PROGRESS_ARGS, *_source_args(url, ()), "--no-playlist", *tuning,
+                 "-f", format_id, "-o", "-"]
+    ffmpeg_cmd = [find_tool("ffmpeg"), "-v", "error", *FFMPEG_PROGRESS_ARGS, "-i", "pipe:0", "-ss", f"{start}"]
+    if end is not None:
+        ffmpeg_cmd += ["-t", f"{end - start}"]
+        duration = end - start
+    ffmpeg_cmd += ["-y", *codec_args]
+    if threads:
+        ffmpeg_cmd += ["-threads", str(threads)]
+    ffmpeg_cmd.append(destination)
+    log_func("Executing: " + subprocess.list2cmdline(ytdlp_cmd) + " | " + subprocess.list2cmdline(ffmpeg_cmd))
+
+    with tracing.span("yt-dlp | ffmpeg", "process") as span:
+        return _run_stream_pipeline(ytdlp_cmd, ffmpeg_cmd, destination, log_func, progress_func, duration, span)
+
+def _run_stream_pipeline(ytdlp_cmd, ffmpeg_cmd, destination, log_func, progress_func, duration, span):
+    ytdlp = subprocess.Popen(ytdlp_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, **process_group_args())
+    try:
+        ffmpeg = subprocess.Popen(ffmpeg_cmd, stdin=ytdlp.stdout, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                  **process_group_args())
+    except OSError:
+        ytdlp.kill()
+        raise
+    # Only ffmpeg holds the read end now, so yt-dlp gets a broken pipe once ffmpeg is done.
+    ytdlp.stdout.close()
+    with running_process(ytdlp), running_process(ffmpeg):
+        return _pump_stream_pipeline(ytdlp, ffmpeg, ffmpeg_cmd, destination, log_func, progress_func, duration,
+                                     span)
+
+def _pump_stream_pipeline(ytdlp, ffmpeg, ffmpeg_cmd, destination, log_func, progress_func, duration, span):
+
+    note_download = jobqueue.download_progress(None)
+
+    def forward_ytdlp_messages():
+        parser = YtDlpProgressParser()
+        for line in iter_lines(ytdlp.stderr):
+            is_progress, event = parser.feed(line)
+            if not is_progress:
+                log_func(line.strip())
+            elif event is not None and note_download:
+                note_download(event)
+
+    reader = threading.Thread(target=forward_ytdlp_messages, daemon=True)
+    reader.start()
+    parser = FfmpegProgressParser(duration)
+    for line in iter_lines(ffmpeg.stdout):
+        is_progress, event = parser.feed(line)
+        if not is_progress:
+            log_func(line.strip())
+        elif event is not None and progress_func:
+            progress_func(event)
+    ffmpeg_cpu = tracing.wait(ffmpeg)
+    if ytdlp.poll() is None:
+        ytdlp.terminate()
+    ytdlp_cpu = tracing.wait(ytdlp)
+    reader.join(5)
+    span.set(exit_code=ffmpeg.returncode, bytes_out=tracing.command_io(ffmpeg_cmd)[1],
+             cpu=ffmpeg_cpu + ytdlp_cpu if ffmpeg_cpu is not None and ytdlp_cpu is not None else None)
+    return ffmpeg.returncode == 0 and os.path.exists(destination)
+
+def _should_stream(url, download_args, info, start, smart):
+    """
+    Decides whether a video cut starting at start seconds can use stream_cut.
+    Returns the format_id to stream, or None to use the download-then-cut path.
+    """
+    config = load_config()
+    if smart or not config["stream_cuts"] or start > config["stream_max_start"]:
+        return None
+    format_id = streamable_format(info)
+    if format_id is None:
+        return None
+    cache = source_cache()
+    if cache is not None and cache.contains(SourceCache.make_key(info, download_args)):
+        return None
+    return format_id
+
+def _clip_weights(info, start, end, section_only, encode_seconds=None):
+    """
+    Stage weights for cutting from start..end, from the probed size and duration when available.
+    encode_seconds defaults to the length of the range.
+    """
+    media_seconds = (info or {}).get("duration")
+    clip_seconds = (end if end is not None else (media_seconds or start)) - start
+    size = expected_filesize(info) if info else None
+    if size and media_seconds and section_only:
+        # A section download fetches roughly the clip's share of the file.
+        size = size * min((clip_seconds + 2 * SECTION_MARGIN) / media_seconds, 1.0)
+    return stage_weights(size, clip_seconds if encode_seconds is None else encode_seconds, media_seconds)
+
+def _process_full(url, output_name, out_dir, media, log_func, status_func, progress_func, audio_format="mp3",
+                  max_height=None):
+    what = media.lower()
+    ext = ".mp4"
+    if media == "Video":
+        download_args = ["--merge-output-format", "mp4"]
+    else:
+        # The native audio stream is downloaded as is and converted (if at all) in one ffmpeg pass.
+        download_args = NATIVE_AUDIO_ARGS
+
+    with JobWorkspace(out_dir) as workspace:
+        # Step 1: Download
+        status_func(f"Downloading {what}... 0%")
+        log_func(f"Starting yt-dlp download for full {what}...")
+        src = workspace.path("input.mp4" if media == "Video" else "input_audio.%(ext)s")
+        info = probe_media(url, log_func, _probe_args(download_args))
+        download_args, info = plan_download(info, media, download_args, log_func, max_height, audio_format)
+        size = expected_filesize(info) if info else None
+        encode_seconds = 0
+        if media == "Audio" and not plan_audio_output(codec_from_info(info), audio_format)[2]:
+            encode_seconds = (info or {}).get("duration")
+        tracker = OverallProgress(progress_func, status_func,
+                                  stage_weights(size, encode_seconds, (info or {}).get("duration")), what)
+        if not workspace.has_space_for(size):
+            log_func(f"Not enough free space in {out_dir} for ~{format_size(size)}.")
+            status_func("Not enough disk space")
+            return
+        with download_slot():
+            path, from_cache = download_full(url, src, download_args, log_func, info, tracker.callback("download"))
+        if path is None:
+            log_func(f"{media} download failed.")
+            status_func("Download failed")
+            return
+        tracker.finish("download", None if from_cache else os.path.getsize(path))
+        log_func(f"{media} downloaded successfully.")
+
+        if media == "Audio":
+            ext, codec_args, copies, codec = _audio_plan(path, info, audio_format)
+            if not (copies and os.path.splitext(path)[1] == ext):
+                # One ffmpeg pass: a remux into the target container, or a single encode.
+                log_func(f"{'Remuxing' if copies else 'Converting'} {codec or 'unknown'} audio to {ext[1:]}...")
+                output = workspace.path("output" + ext)
+                duration = (info or {}).get("duration")
+                with encode_slot() if not copies else nullcontext():
+                    ok = cut_audio(path, 0, None, output, log_func, progress_func=tracker.callback("encode"),
+                                   duration=duration, codec_args=codec_args)
+                if not ok:
+                    log_func("Audio conversion failed.")
+                    status_func("Audio conversion failed")
+                    return
+                tracker.finish("encode", None if copies else duration)
+                path, from_cache = output, False
+
+        # Step 2: Move to the output location
+        log_func(f"Moving downloaded {what} to output location...")
+        tracker.start("finalize")
+        destination = os.path.join(out_dir, convertname(output_name) + ext)
+        try:
+            if from_cache:
+                with tracing.span("move"):
+                    link_or_copy(path, destination)
+            else:
+                workspace.finalize(path, destination)
+            log_func(f"{media} saved successfully at: " + destination)
+        except Exception as e:
+            log_func("Error during processing: " + str(e))
+            status_func("Error during processing")
+            return
     
+        # Step 3: Clean Up (the workspace is removed on exit)
+        tracker.finish("finalize")
+        progress_func(1.0)
+        status_func("Process complete. (100%)")
+        return destination
+
+def process_full_video_gui(url, output_name, out_dir, log_func, status_func, progress_func, max_height=None):
+    return _process_full(url, output_name, out_dir, "Video", log_func, status_func, progress_func,
+                         max_height=max_height)
+
+def process_full_audio_gui(url, output_name, out_dir, log_func, status_func, progress_func, audio_format="mp3"):
+    return _process_full(url, output_name, out_dir, "Audio", log_func, status_func, progress_func, audio_format)
+
+def _stream_cut_job(url, format_id, output_name, out_dir, start, end, info, workspace, log_func, status_func,
+                    progress_func, profile):
     destination = os.path.join(out_dir, convertname(output_name) + ".mp4")
-    cmd = f'ffmpeg.exe -v quiet -stats -ss {actual_start} {duration_option} -i input.mp4 -y -c:v libx264 "{destination}"'
-    run_command(cmd, log_func)
-    progress_bar['value'] = 95
-    status_func("Video cutting complete. (95%)")
+    output = workspace.path(os.path.basename(destination))
+    duration = (info.get("duration") - start) if info.get("duration") else None
+    clip_seconds = end - start if end is not None else duration
+    name, settings = resolve_profile(profile, clip_seconds)
+    log_func(f"Streaming format {format_id} into ffmpeg (no intermediate file), encoding profile: {name}")
+    # Download and encode overlap, so the encode progress covers both.
+    tracker = OverallProgress(progress_func, status_func, {"download": 0.0, "encode": 0.98, "finalize": 0.02},
+                              "video")
+    with download_slot(), encode_slot():
+        ok = stream_cut(url, format_id, start, end, output, video_codec_args(settings), log_func,
+                        settings.get("threads") or None, tracker.callback("encode"), duration)
+    if not ok:
+        if os.path.exists(output):
+            os.remove(output)
+        return None
+    tracker.finish("encode", clip_seconds)
+    workspace.finalize(output, destination)
     log_func("Video cut and saved successfully at: " + destination)
-    
-    # Step 3: Clean Up
-    subprocess.run('del input.mp4 /s /q /f', shell=True, check=True)
-    progress_bar['value'] = 100
+    tracker.finish("finalize")
+    progress_func(1.0)
     status_func("Process complete. (100%)")
+    return destination
 
-def process_full_audio_gui(url, output_name, out_dir, log_func, status_func, progress_bar):
-    # Step 1: Download Audio (Overall: 0% -> 60%)
-    status_func("Downloading audio... 0%")
-    log_func("Starting yt-dlp download for full audio...")
-    cmd = f'yt-dlp "{url}" --no-playlist --extract-audio --audio-format mp3 -o input_audio.mp3'
-    run_command(cmd, log_func)
-    if not os.path.exists("input_audio.mp3"):
-        log_func("Audio download failed.")
-        status_func("Download failed")
-        return
-    progress_bar['value'] = 60
-    status_func("Audio download complete. (60%)")
-    log_func("Audio downloaded successfully.")
-    
-    # Step 2: Process Audio (Overall: 60% -> 95%)
-    status_func("Processing audio... 60%")
-    log_func("Moving downloaded audio to output location...")
-    destination = os.path.join(out_dir, convertname(output_name) + ".mp3")
-    try:
-        shutil.move("input_audio.mp3", destination)
-        progress_bar['value'] = 95
-        status_func("Audio conversion complete. (95%)")
-        log_func("Audio saved successfully at: " + destination)
-    except Exception as e:
-        log_func("Error during processing: " + str(e))
-        status_func("Error during processing")
-        return
-    
-    # Step 3: Clean Up
-    progress_bar['value'] = 100
-    status_func("Process complete. (100%)")
+def _process_cut(url, output_name, out_dir, start, end, media, log_func, status_func, progress_func, section_only, smart,
+                 audio_format="mp3", profile=None, max_height=None):
+    what = media.lower()
+    ext = ".mp4"
+    codec_args = None
+    if media == "Video":
+        download_args = ["--merge-output-format", "mp4"]
+    else:
+        download_args = NATIVE_AUDIO_ARGS
+
+    # If start is empty, assume 0; if end is empty, process until the end (omit duration).
+    actual_start = converttime(start) if start.strip() else 0
+    actual_end = converttime(end) if end.strip() else None
 
-def process_cut_audio_gui(url, output_name, out_dir, start, end, log_func, status_func, progress_bar):
-    # Step 1: Download Audio (Overall: 0% -> 60%)
-    status_func("Downloading audio... 0%")
-    log_func("Starting yt-dlp download for audio cutting...")
-    cmd = f'yt-dlp "{url}" --no-playlist --extract-audio --audio-format mp3 -o input_audio.mp3'
-    run_command(cmd, log_func)
-    if not os.path.exists("input_audio.mp3"):
-        log_func("Audio download failed.")
-        status_func("Download failed")
-        return
-    progress_bar['value'] = 60
-    status_func("Audio download complete. (60%)")
-    log_func("Audio downloaded successfully.")
+    with JobWorkspace(out_dir) as workspace:
+        # Step 1: Download
+        status_func(f"Downloading {what}... 0%")
+        log_func(f"Starting yt-dlp download for {what} cutting...")
+        src = workspace.path("input.mp4" if media == "Video" else "input_audio.%(ext)s")
+        info = probe_media(url, log_func, _probe_args(download_args))
+        download_args, info = plan_download(info, media, download_args, log_func, max_height, audio_format)
+        try:
+            validate_range(actual_start, actual_end, (info or {}).get("duration"))
+        except ValueError as e:
+            log_func("Invalid range: " + str(e))
+            status_func("Invalid range")
+            return
+        stream_format = _should_stream(url, download_args, info, actual_start, smart) \
+            if media == "Video" else None
+        if stream_format:
+            destination = _stream_cut_job(url, stream_format, output_name, out_dir, actual_start, actual_end, info,
+                                          workspace, log_func, status_func, progress_func, profile)
+            if destination:
+                return destination
+            log_func("Streaming cut failed, falling back to download and cut...")
+        copies = media == "Audio" and plan_audio_output(codec_from_info(info), audio_format)[2]
+        tracker = OverallProgress(progress_func, status_func,
+                                  _clip_weights(info, actual_start, actual_end, section_only, 0 if copies else None),
+                                  what)
+        path, offset = fetch_cut_source(url, src, actual_start, actual_end, download_args, log_func,
+                                        section_only, workspace, info, tracker.callback("download"))
+        if path is None:
+            log_func(f"{media} download failed.")
+            status_func("Download failed")
+            return
+        tracker.finish("download", os.path.getsize(path) if os.path.dirname(path) == workspace.dir else None)
+        log_func(f"{media} downloaded successfully.")
+        if media == "Audio":
+            ext, codec_args, copies, codec = _audio_plan(path, info, audio_format)
+            log_func(f"Source audio is {codec or 'unknown'}: "
+                     + ("cutting with stream copy." if copies else f"encoding the cut to {ext[1:]}."))
     
-    # Step 2: Process (Cut) Audio (Overall: 60% -> 95%)
-    if start.strip():
-        actual_start = converttime(start)
-    else:
-        actual_start = 0
-    if end.strip():
-        actual_end = converttime(end)
-        duration = actual_end - actual_start
-        duration_option = f"-t {duration}"
-        log_func(f"Cutting audio from {start if start.strip() else '0:00'} to {end}...")
-    else:
-        duration_option = ""
-        log_func(f"Cutting audio from {start if start.strip() else '0:00'} until end...")
-    status_func("Cutting audio... 60%")
+        # Step 2: Cut
+        if actual_end is not None:
+            log_func(f"Cutting {what} from {start if start.strip() else '0:00'} to {end}...")
+        else:
+            log_func(f"Cutting {what} from {start if start.strip() else '0:00'} until end...")
     
-    destination = os.path.join(out_dir, convertname(output_name) + ".mp3")
-    cmd = f'ffmpeg.exe -v quiet -stats -ss {actual_start} {duration_option} -i input_audio.mp3 -y -vn -acodec libmp3lame "{destination}"'
-    run_command(cmd, log_func)
-    progress_bar['value'] = 95
-    status_func("Audio cutting complete. (95%)")
-    log_func("Audio cut and saved successfully at: " + destination)
+        destination = os.path.join(out_dir, convertname(output_name) + ext)
+        output = workspace.path(os.path.basename(destination))
+        clip_end = offset + (actual_end - actual_start) if actual_end is not None else None
+        duration = (info.get("duration") - actual_start) if info and info.get("duration") else None
+        with encode_slot() if not copies else nullcontext():
+            encode_progress = tracker.callback("encode")
+            if media == "Video":
+                ok = cut_video(path, offset, clip_end, output, log_func, smart,
+                               progress_func=encode_progress, duration=duration, profile=profile)
+            else:
+                ok = cut_audio(path, offset, clip_end, output, log_func,
+                               progress_func=encode_progress, duration=duration, codec_args=codec_args)
+        if not ok:
+            status_func(f"{media} cutting failed")
+            log_func(f"{media} cutting failed.")
+            return
+        tracker.finish("encode", (clip_end if clip_end is not None else duration or 0) - offset)
+        workspace.finalize(output, destination)
+        log_func(f"{media} cut and saved successfully at: " + destination)
     
-    # Step 3: Clean Up
-    subprocess.run('del input_audio.mp3 /s /q /f', shell=True, check=True)
-    progress_bar['value'] = 100
-    status_func("Process complete. (100%)")
+        # Step 3: Clean Up (the workspace is removed on exit)
+        tracker.finish("finalize")
+        progress_func(1.0)
+        status_func("Process complete. (100%)")
+        return destination
+
+def process_cut_video_gui(url, output_name, out_dir, start, end, log_func, status_func, progress_func, section_only=True, smart=False,
+                          profile=None, max_height=None):
+    return _process_cut(url, output_name, out_dir, start, end, "Video", log_func, status_func, progress_func,
+                        section_only, smart, profile=profile, max_height=max_height)
+
+def process_cut_audio_gui(url, output_name, out_dir, start, end, log_func, status_func, progress_func, section_only=True,
+                          audio_format="mp3"):
+    return _process_cut(url, output_name, out_dir, start, end, "Audio", log_func, status_func, progress_func,
+                        section_only, False, audio_format)
+
+def process_multi_cut_gui(url, output_name, out_dir, ranges, media, log_func, status_func, progress_func, section_only=True,
+                          smart=False, audio_format="mp3", profile=None, max_height=None):
+    """
+    Cuts every (start, end) range (seconds, end may be None) out of a single download of url.
+    The cuts run in parallel, one ffmpeg process per range, with as many workers as CPU cores.
+    Outputs are named <output_name>_01, <output_name>_02, ... in the order of ranges.
+    Returns the list of created files.
+    """
+    what = media.lower()
+    is_video = media == "Video"
+    ext = ".mp4"
+    codec_args = None
+    download_args = ["--merge-output-format", "mp4"] if is_video else NATIVE_AUDIO_ARGS
+
+    with JobWorkspace(out_dir) as workspace:
+        # Step 1: Download once, covering every range
+        status_func(f"Downloading {what}... 0%")
+        log_func(f"Starting yt-dlp download for {len(ranges)} cuts...")
+        src = workspace.path("input.mp4" if is_video else "input_audio.%(ext)s")
+        info = probe_media(url, log_func, _probe_args(download_args))
+        download_args, info = plan_download(info, media, download_args, log_func, max_height, audio_format)
+        media_seconds = (info or {}).get("duration")
+        for number, (start, end) in enumerate(ranges, 1):
+            try:
+                validate_range(start, end, media_seconds)
+            except ValueError as e:
+                log_func(f"Invalid range {number}: {e}")
+                status_func("Invalid range")
+                return []
+        cover_start = min(r[0] for r in ranges)
+        cover_end = None if any(r[1] is None for r in ranges) else max(r[1] for r in ranges)
+        lengths = [(end if end is not None else (media_seconds or start)) - start for start, end in ranges]
+        copies = not is_video and plan_audio_output(codec_from_info(info), audio_format)[2]
+        tracker = OverallProgress(progress_func, status_func,
+                                  _clip_weights(info, cover_start, cover_end, section_only,
+                                                0 if copies else sum(lengths)), what)
+        path, offset = fetch_cut_source(url, src, cover_start, cover_end, download_args, log_func,
+                                        section_only, workspace, info, tracker.callback("download"))
+        if path is None:
+            log_func(f"{media} download failed.")
+            status_func("Download failed")
+            return []
+        shift = offset - cover_start
+        tracker.finish("download", os.path.getsize(path) if os.path.dirname(path) == workspace.dir else None)
+        log_func(f"{media} downloaded successfully.")
+        if not is_video:
+            ext, codec_args, copies, codec = _audio_plan(path, info, audio_format)
+            log_func(f"Source audio is {codec or 'unknown'}: "
+                     + ("cutting with stream copy." if copies else f"encoding the cuts to {ext[1:]}."))
+
+        # Step 2: Cut all ranges in parallel. Each encode holds an encode slot of its own,
+        # so no more workers than max_encodes are started; stream copies need none.
+        cores = os.cpu_count() or 1
+        workers = max(1, min(len(ranges), cores, cores if copies else load_config()["max_encodes"]))
+        threads = max(1, cores // workers)
+        width = max(2, len(str(len(ranges))))
+        base = convertname(output_name)
+        log_func(f"Cutting {len(ranges)} ranges with {workers} parallel workers...")
+
+        # Overall encode progress is the clip-length weighted share of every cut's progress.
+        encode_progress = tracker.callback("encode")
+        fractions = [0.0] * len(ranges)
+        total_length = sum(lengths) or 1.0
+        progress_lock = threading.Lock()
+
+        def cut_one(index, start, end):
+            name = f"{base}_{index:0{width}d}{ext}"
+            output = workspace.path(name)
+            clip_end = end + shift if end is not None else None
+
+            def progress_func(event):
+                with progress_lock:
+                    fractions[index - 1] = event.fraction or 0.0
+                    overall = sum(f * l for f, l in zip(fractions, lengths)) / total_length
+                encode_progress(ProgressEvent("encode", fraction=overall))
+
+            with encode_slot() if not copies else nullcontext():
+                if is_video:
+                    ok = cut_video(path, start + shift, clip_end, output, log_func, smart, threads,
+                                   progress_func, lengths[index - 1], profile)
+                else:
+                    ok = cut_audio(path, start + shift, clip_end, output, log_func, threads,
+                                   progress_func, lengths[index - 1], codec_args)
+            return workspace.finalize(output, os.path.join(out_dir, name)) if ok else None
+
+        created = []
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(jobqueue.bind(cut_one), i, start, end) for i, (start, end) in enumerate(ranges, 1)]
+            for done, future in enumerate(futures, 1):
+                destination = future.result()
+                if destination:
+                    created.append(destination)
+                    log_func("Saved: " + destination)
+                else:
+                    log_func(f"Cut {done} failed.")
+        tracker.finish("encode", sum(lengths))
+        log_func(f"{len(created)}/{len(ranges)} cuts complete.")
+
+        # Step 3: Clean Up (the workspace is removed on exit)
+        tracker.finish("finalize")
+        progress_func(1.0)
+        status_func("Process complete. (100%)")
+        return created
+
+def process_chapters_gui(url, output_name, out_dir, media, log_func, status_func, progress_func, audio_format="mp3",
+                         max_height=None):
+    """
+    Splits url into its chapters (from the source's metadata) with one download and a
+    single ffmpeg pass that writes every chapter (see chapters.split_chapters). Video is
+    stream-copied, so each chapter starts on the first keyframe at or after its start;
+    audio is copied or encoded once (see audio.plan_audio_output). Files are named
+    "<output_name>_NN - <chapter title>". Returns the list of created files, or None.
+    """
+    what = media.lower()
+    download_args = ["--merge-output-format", "mp4"] if media == "Video" else NATIVE_AUDIO_ARGS
+
+    with JobWorkspace(out_dir) as workspace:
+        # Step 1: Chapters and download
+        status_func(f"Downloading {what}... 0%")
+        info = probe_media(url, log_func, _probe_args(download_args))
+        download_args, info = plan_download(info, media, download_args, log_func, max_height, audio_format)
+        chapters = chapter_list(info or {})
+        if not chapters:
+            log_func("No chapters found in the media's metadata.")
+            status_func("No chapters found")
+            return
+        log_func(f"{len(chapters)} chapters: " + ", ".join(title for _, _, title in chapters))
+        duration = info.get("duration")
+        size = expected_filesize(info)
+        # A stream copy runs many times faster than real time.
+        encode_seconds = (duration or 0) / 20
+        if media == "Audio" and not plan_audio_output(codec_from_info(info), audio_format)[2]:
+            encode_seconds = duration
+        tracker = OverallProgress(progress_func, status_func, stage_weights(size, encode_seconds, duration), what)
+        if not workspace.has_space_for(size):
+            log_func(f"Not enough free space in {out_dir} for ~{format_size(size)}.")
+            status_func("Not enough disk space")
+            return
+        src = workspace.path("input.mp4" if media == "Video" else "input_audio.%(ext)s")
+        with download_slot():
+            path, from_cache = download_full(url, src, download_args, log_func, info, tracker.callback("download"))
+        if path is None:
+            log_func(f"{media} download failed.")
+            status_func("Download failed")
+            return
+        tracker.finish("download", None if from_cache else os.path.getsize(path))
+
+        # Step 2: Split in one pass
+        if media == "Video":
+            ext, codec_args, copies = ".mp4", ["-map", "0:v:0", "-map", "0:a:0?", "-c", "copy"], True
+        else:
+            ext, audio_args, copies, _ = _audio_plan(path, info, audio_format)
+            codec_args = ["-map", "0:a:0", *audio_args]
+        log_func(f"Splitting into {len(chapters)} chapters in one pass "
+                 f"({'stream copy' if copies else 'encoding to ' + ext[1:]})...")
+        with encode_slot() if not copies else nullcontext():
+            written = split_chapters(path, chapters, workspace.dir, ext, codec_args, log_func, run_command,
+                                     tracker.callback("encode"), duration)
+        if not written:
+            log_func("Chapter split failed.")
+            status_func("Chapter split failed")
+            return
+        tracker.finish("encode", None if copies else duration)
+
+        # Step 3: Move the chapters to the output location
+        tracker.start("finalize")
+        base = convertname(output_name)
+        width = max(2, len(str(len(chapters))))
+        created = []
+        for index, chapter_path in written:
+            destination = os.path.join(out_dir, chapter_filename(base, index + 1, chapters[index][2], ext, width))
+            created.append(workspace.finalize(chapter_path, destination))
+            log_func("Saved: " + destination)
+        log_func(f"{len(created)}/{len(chapters)} chapters saved.")
+        tracker.finish("finalize")
+        progress_func(1.0)
+        status_func("Process complete. (100%)")
+        return created
+
+def job_key(params):
+    """
+    Short stable hash of a job's parameters, naming its resumable workspace.
+    """
+    return hashlib.sha1(json.dumps(params, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:16]
+
+def run_job(params, log_func, status_func, progress_func):
+    """
+    Runs one job (see _run_job) inside a trace, then logs its stage timings and saves the
+    trace (see tracing.record_job). The summary also becomes the queue Job's timing.
+    The job's workspace is resumable (see workspace.resumable_workspaces): if the job fails,
+    its partial downloads stay in the output folder and running the same job again
+    continues from them. Success or cancellation removes them.
+    """
+    meta = {key: params.get(key) for key in ("media", "mode", "audio_format", "profile", "max_height")}
+    meta["ranges"] = len(params.get("ranges") or [])
+    key = job_key(params)
+    with tracing.job_trace(params.get("output_name") or "output", **meta) as trace:
+        result = None
+        try:
+            with resumable_workspaces(key) as attempt:
+                if not attempt.resumable:
+                    log_func("An identical job is already running; this one works in a separate folder.")
+                elif os.path.isdir(os.path.join(params["out_dir"], WORKSPACE_PREFIX + key)):
+                    log_func("Resuming from the partial files of an earlier attempt.")
+                try:
+                    result = _run_job(params, log_func, status_func, progress_func)
+                except JobCancelled:
+                    attempt.keep = False
+                    raise
+                attempt.keep = not result
+            return result
+        finally:
+            job = current_job()
+            timing = tracing.record_job(trace, bool(result), log_func, job.id if job is not None else None)
+            if job is not None:
+                job.timing = timing
+
+def _run_job(params, log_func, status_func, progress_func):
+    """
+    Runs one job described by params, a dict with the keys url, media ("Video"/"Audio"),
+    mode ("Full"/"Cut"/"Chapters"), output_name, out_dir and, for Cut mode, start, end, ranges
+    (list of (start, end) seconds, overrides start/end when not empty), section_only and smart.
+    For audio, audio_format is "mp3" (default), "m4a", "opus" or "original" (no re-encode).
+    For video cuts, profile names the encoding profile (default: config.json's encoding_profile).
+    For video, max_height caps the downloaded resolution (default: config.json's max_height).
+    Returns the created file, a list of files for multi-range cuts, or None on failure.
+    """
+    url = params["url"]
+    output_name = params.get("output_name") or "output"
+    out_dir = params["out_dir"]
+    media = params.get("media", "Video")
+    audio_format = params.get("audio_format") or "mp3"
+    max_height = params.get("max_height")
+    if params.get("mode", "Full") == "Full":
+        if media == "Video":
+            return process_full_video_gui(url, output_name, out_dir, log_func, status_func, progress_func,
+                                          max_height)
+        return process_full_audio_gui(url, output_name, out_dir, log_func, status_func, progress_func, audio_format)
+    if params.get("mode") == "Chapters":
+        return process_chapters_gui(url, output_name, out_dir, media, log_func, status_func, progress_func,
+                                    audio_format, max_height)
+
+    section_only = params.get("section_only", True)
+    if params.get("ranges"):
+        return process_multi_cut_gui(url, output_name, out_dir, params["ranges"], media, log_func,
+                                     status_func, progress_func, section_only, params.get("smart", False),
+                                     audio_format, params.get("profile"), max_height)
+    start = params.get("start", "")
+    end = params.get("end", "")
+    if media == "Video":
+        return process_cut_video_gui(url, output_name, out_dir, start, end, log_func, status_func,
+                                     progress_func, section_only, params.get("smart", False),
+                                     params.get("profile"), max_height)
+    return process_cut_audio_gui(url, output_name, out_dir, start, end, log_func, status_func,
+                                 progress_func, section_only, audio_format)
@@ -0,0 +1,86 @@
+import os
+from config import load_config
+
+# Built-in encoding profiles for re-encoded video cuts. config.json can override any of
+# their fields or add new profiles under "encoding_profiles".
+#   preset / crf / tune   libx264 settings (tune may be None)
+#   threads               ffmpeg -threads (0 = let ffmpeg decide)
+#   audio                 ffmpeg audio codec arguments
+#   cost                  rough CPU seconds per second of 1080p video, used by "auto"
+ENCODING_PROFILES = {
+    "fast-preview": {
+        "preset": "veryfast", "crf": 28, "tune": "fastdecode", "threads": 0,
+        "audio": ["-c:a", "aac", "-b:a", "128k"], "cost": 0.4,
+    },
+    "balanced": {
+        "preset": "medium", "crf": 23, "tune": None, "threads": 0,
+        "audio": ["-c:a", "aac", "-b:a", "160k"], "cost": 1.5,
+    },
+    "archive": {
+        "preset": "slow", "crf": 18, "tune": "film", "threads": 0,
+        "audio": ["-c:a", "copy"], "cost": 3.0,
+    },
+}
+
+# "auto" picks the highest-quality profile whose estimated encode time stays under this
+# many seconds; ordered from best quality to fastest.
+AUTO_TIME_BUDGET = 60
+AUTO_ORDER = ["archive", "balanced", "fast-preview"]
+
+
+def encoding_profiles():
+    """
+    Returns the built-in profiles merged with the "encoding_profiles" of config.json.
+    """
+    profiles = {name: dict(settings) for name, settings in ENCODING_PROFILES.items()}
+    for name, settings in load_config()["encoding_profiles"].items():
+        profiles.setdefault(name, dict(ENCODING_PROFILES["balanced"])).update(settings)
+    return profiles
+
+
+def profile_names():
+    """
+    Names offered in the GUI/CLI: "auto" followed by every known profile.
+    """
+    return ["auto", *encoding_profiles()]
+
+
+def pick_profile(clip_seconds, cores=None):
+    """
+    Chooses a profile name for encoding clip_seconds of video on cores CPU cores:
+    the best quality that fits AUTO_TIME_BUDGET, else the fastest. An unknown length
+    (None) gives the configured default profile, or "balanced" if that is "auto".
+    """
+    profiles = encoding_profiles()
+    if not clip_seconds:
+        default = load_config()["encoding_profile"]
+        return default if default in profiles else "balanced"
+    cores = cores or os.cpu_count() or 1
+    for name in AUTO_ORDER:
+        if clip_seconds * profiles[name]["cost"] / cores <= AUTO_TIME_BUDGET:
+            return name
+    return AUTO_ORDER[-1]
+
+
+def resolve_profile(name, clip_seconds=None, cores=None):
+    """
+    Returns (name, settings) for a profile name, resolving "auto", None or an unknown
+    name (the configured default, then "balanced").
+    """
+    profiles = encoding_profiles()
+    name = name or load_config()["encoding_profile"]
+    if name == "auto":
+        name = pick_profile(clip_seconds, cores)
+    if name not in profiles:
+        name = "balanced"
+    return name, profiles[name]
+
+
+def video_codec_args(settings, audio=True):
+    """
+    ffmpeg codec arguments for a profile's settings: video, plus audio unless audio=False.
+    """
+    args = ["-c:v", "libx264", "-preset", settings["preset"], "-crf", str(settings["crf"])]
+    if settings.get("tune"):
+        args += ["-tune", settings["tune"]]
+    return args + list(settings.get("audio") or []) if audio else args
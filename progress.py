@@ -0,0 +1,258 @@
+import re
+import time
+
+# yt-dlp progress template: one machine-readable line per progress update.
+# Fields that yt-dlp can't fill in are printed as "NA".
+YTDLP_PROGRESS_PREFIX = "[progress]"
+YTDLP_PROGRESS_ARGS = [
+    "--newline",
+    "--progress-template",
+    "download:" + YTDLP_PROGRESS_PREFIX
+    + " %(progress.downloaded_bytes)s %(progress.total_bytes,progress.total_bytes_estimate)s"
+    + " %(progress.speed)s %(progress.eta)s",
+]
+
+# ffmpeg arguments that replace -stats with key=value progress blocks on stdout.
+FFMPEG_PROGRESS_ARGS = ["-nostats", "-progress", "pipe:1"]
+
+_LINE_SPLIT = re.compile(rb"[\r\n]+")
+
+
+class ProgressEvent:
+    """
+    One progress update from a download or an encode. Unknown values are None.
+      kind             "download" or "encode"
+      downloaded_bytes / total_bytes / speed (bytes per second) / eta (seconds)   - downloads
+      out_time (seconds of output written) / fps / speed (x realtime)              - encodes
+      fraction         0..1 progress of the stage, if it can be computed
+    """
+
+    __slots__ = ("kind", "downloaded_bytes", "total_bytes", "speed", "eta", "out_time", "fps", "fraction")
+
+    def __init__(self, kind, downloaded_bytes=None, total_bytes=None, speed=None, eta=None,
+                 out_time=None, fps=None, fraction=None):
+        self.kind = kind
+        self.downloaded_bytes = downloaded_bytes
+        self.total_bytes = total_bytes
+        self.speed = speed
+        self.eta = eta
+        self.out_time = out_time
+        self.fps = fps
+        self.fraction = fraction
+
+    def __repr__(self):
+        fields = ", ".join(f"{k}={getattr(self, k)!r}" for k in self.__slots__ if getattr(self, k) is not None)
+        return f"ProgressEvent({fields})"
+
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def download_event(downloaded_bytes, total_bytes, speed, eta):
+    """
+    Builds a download ProgressEvent, computing the fraction when the total is known.
+    """
+    fraction = None
+    if downloaded_bytes is not None and total_bytes:
+        fraction = min(downloaded_bytes / total_bytes, 1.0)
+    return ProgressEvent("download", downloaded_bytes, total_bytes, speed, eta, fraction=fraction)
+
+
+def event_from_ytdlp_hook(d):
+    """
+    Converts a yt-dlp progress hook dict (in-process backend) into a ProgressEvent.
+    """
+    event = download_event(d.get("downloaded_bytes"), d.get("total_bytes") or d.get("total_bytes_estimate"),
+                           d.get("speed"), d.get("eta"))
+    if d.get("status") == "finished":
+        event.fraction = 1.0
+    return event
+
+
+class YtDlpProgressParser:
+    """
+    Parses lines printed with YTDLP_PROGRESS_ARGS. feed() returns (is_progress, event):
+    is_progress tells whether the line was progress output (and need not be logged).
+    """
+
+    def feed(self, line):
+        if not line.startswith(YTDLP_PROGRESS_PREFIX):
+            return False, None
+        parts = line[len(YTDLP_PROGRESS_PREFIX):].split()
+        if len(parts) != 4:
+            return True, None
+        done, total, speed, eta = (_number(p) for p in parts)
+        return True, download_event(done, total, speed, eta)
+
+
+class FfmpegProgressParser:
+    """
+    Parses "ffmpeg -progress pipe:1" output. ffmpeg prints a block of key=value lines
+    closed by "progress=continue" or "progress=end". feed() returns (is_progress, event),
+    with event set once a block is complete.
+    duration is the expected output length in seconds, used for fraction and ETA.
+    """
+
+    _KEYS = {"frame", "fps", "bitrate", "total_size", "out_time_us", "out_time_ms", "out_time",
+             "dup_frames", "drop_frames", "speed", "progress", "stream_0_0_q"}
+
+    def __init__(self, duration=None):
+        self.duration = duration
+        self._block = {}
+
+    def feed(self, line):
+        key, sep, value = line.partition("=")
+        key = key.strip()
+        if not sep or (key not in self._KEYS and not key.startswith("stream_")):
+            return False, None
+        self._block[key] = value.strip()
+        if key != "progress":
+            return True, None
+
+        block, self._block = self._block, {}
+        out_us = _number(block.get("out_time_us") or block.get("out_time_ms"))
+        out_time = out_us / 1_000_000 if out_us is not None and out_us >= 0 else None
+        speed = _number((block.get("speed") or "").rstrip("x"))
+        fraction = eta = None
+        if self.duration and out_time is not None:
+            fraction = min(out_time / self.duration, 1.0)
+            if speed:
+                eta = max(self.duration - out_time, 0) / speed
+        if block.get("progress") == "end":
+            fraction = 1.0
+        return True, ProgressEvent("encode", downloaded_bytes=_number(block.get("total_size")), speed=speed,
+                                   eta=eta, out_time=out_time, fps=_number(block.get("fps")), fraction=fraction)
+
+
+def iter_lines(stream):
+    """
+    Yields decoded lines from a binary stream as soon as they end in either "\\n" or "\\r".
+    Uses read1() so partial output (e.g. "\\r"-terminated progress) is never held back
+    waiting for a newline.
+    """
+    pending = b""
+    while True:
+        chunk = stream.read1(65536) if hasattr(stream, "read1") else stream.read(65536)
+        if not chunk:
+            break
+        pending += chunk
+        *lines, pending = _LINE_SPLIT.split(pending)
+        for line in lines:
+            if line:
+                yield line.decode("utf-8", "replace")
+    if pending:
+        yield pending.decode("utf-8", "replace")
+
+
+# Observed throughput of previous jobs (exponential moving averages), used to
+# weight the stages of new jobs by how long they will actually take.
+_observed = {"download_bps": 4 * 1024 * 1024, "encode_speed": 2.0}
+
+
+def observe(key, value, alpha=0.3):
+    """
+    Folds a measured throughput (download bytes/s or encode speed in x realtime) into the averages.
+    """
+    if value and value > 0:
+        _observed[key] = (1 - alpha) * _observed[key] + alpha * value
+
+
+def stage_weights(download_bytes=None, encode_seconds=None, media_seconds=None):
+    """
+    Returns {"download": w, "encode": w, "finalize": w} weights summing to 1, proportional
+    to the expected wall time of each stage. download_bytes is the expected download size,
+    encode_seconds the length of media to encode (None/0 for no encode stage) and
+    media_seconds the source duration (used to guess the size when it is unknown).
+    """
+    if not download_bytes:
+        # Unknown size: assume roughly 1 MB per second of media, or a minute's worth.
+        download_bytes = (media_seconds or 60) * 1024 * 1024
+    download_time = download_bytes / _observed["download_bps"]
+    encode_time = (encode_seconds or 0) / _observed["encode_speed"]
+    finalize_time = 0.02 * (download_time + encode_time) + 0.1
+    total = download_time + encode_time + finalize_time
+    return {"download": download_time / total, "encode": encode_time / total, "finalize": finalize_time / total}
+
+
+def format_eta(seconds):
+    if seconds is None:
+        return "?"
+    seconds = int(seconds)
+    return f"{seconds // 3600}:{seconds // 60 % 60:02d}:{seconds % 60:02d}" if seconds >= 3600 \
+        else f"{seconds // 60}:{seconds % 60:02d}"
+
+
+class OverallProgress:
+    """
+    Maps per-stage ProgressEvents onto one overall percentage using stage weights, and
+    reports it through progress_func(0..1) and a status line with speed and ETA.
+
+        tracker = OverallProgress(progress_func, status_func, stage_weights(...), "video")
+        run_ytdlp(args, log_func, tracker.callback("download"))
+        tracker.finish("download")
+    """
+
+    _VERBS = {"download": "Downloading", "encode": "Cutting", "finalize": "Finishing"}
+
+    def __init__(self, progress_func, status_func, weights, what="media"):
+        self.progress_func = progress_func
+        self.status_func = status_func
+        self.weights = weights
+        self.what = what
+        self.done = set()
+        self.started = time.monotonic()
+        self._stage_started = {}
+
+    def _base(self, stage):
+        return sum(w for s, w in self.weights.items() if s in self.done and s != stage)
+
+    def _report(self, overall, text):
+        self.progress_func(overall)
+        self.status_func(text)
+
+    def start(self, stage):
+        """
+        Marks the beginning of stage (for throughput measurement).
+        """
+        self._stage_started.setdefault(stage, time.monotonic())
+
+    def callback(self, stage):
+        """
+        Starts stage and returns a progress_func that feeds its events into this tracker.
+        """
+        self.start(stage)
+
+        def progress_func(event):
+            fraction = event.fraction or 0.0
+            overall = min(self._base(stage) + self.weights.get(stage, 0) * fraction, 1.0)
+            details = []
+            if event.kind == "download" and event.speed:
+                details.append(f"{event.speed / 1024 / 1024:.2f} MB/s")
+            if event.kind == "encode" and event.fps:
+                details.append(f"{event.fps:.0f} fps")
+            if event.eta is not None:
+                details.append(f"stage ETA {format_eta(event.eta)}")
+            elapsed = time.monotonic() - self.started
+            if overall > 0.01:
+                details.append(f"total ETA {format_eta(elapsed / overall * (1 - overall))}")
+            verb = self._VERBS.get(stage, stage.capitalize())
+            self._report(overall, f"{verb} {self.what}... {overall * 100:.0f}%"
+                         + (f" ({', '.join(details)})" if details else ""))
+
+        return progress_func
+
+    def finish(self, stage, amount=None):
+        """
+        Marks stage as complete. amount (bytes downloaded or media seconds encoded) is used
+        to update the observed throughput for future weightings.
+        """
+        self.done.add(stage)
+        elapsed = time.monotonic() - self._stage_started.get(stage, time.monotonic())
+        if amount and elapsed > 0.5:
+            observe("download_bps" if stage == "download" else "encode_speed", amount / elapsed)
+        overall = min(self._base(None), 1.0)
+        self.progress_func(overall)
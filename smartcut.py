@@ -0,0 +1,193 @@
+import os
+import json
+import bisect
+import shutil
+import subprocess
+import tempfile
+import threading
+from collections import OrderedDict
+from profiles import resolve_profile, video_codec_args
+from progress import FFMPEG_PROGRESS_ARGS, FfmpegProgressParser
+from utils import find_tool
+
+# Keyframe indexes are saved next to their source as "<source>.keyframes.json", so they
+# live as long as it does: removed with a job's workspace, or evicted together with a
+# cached source (see SourceCache).
+KEYFRAME_SUFFIX = ".keyframes.json"
+
+# Keyframe indexes kept in memory (least recently used dropped first).
+KEYFRAME_MEMO_SIZE = 32
+
+# Source codecs we can re-encode boundary GOPs for and still concatenate losslessly.
+SMART_CUT_CODECS = {"h264": "libx264"}
+
+_keyframe_memo = OrderedDict()
+_keyframe_memo_lock = threading.Lock()
+
+
+def _ffprobe_json(args):
+    proc = subprocess.run([find_tool("ffprobe"), "-v", "error", *args, "-of", "json"],
+                          capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip() or "ffprobe failed")
+    return json.loads(proc.stdout)
+
+
+def keyframe_index(path, log_func):
+    """
+    Returns the sorted list of video keyframe timestamps (seconds) of path.
+    The index is built once from ffprobe packet flags and cached in memory and next
+    to path (see KEYFRAME_SUFFIX), checked against the file's size and modification time.
+    """
+    st = os.stat(path)
+    stamp = [st.st_size, st.st_mtime_ns]
+    memo_key = (os.path.abspath(path), *stamp)
+    with _keyframe_memo_lock:
+        if memo_key in _keyframe_memo:
+            _keyframe_memo.move_to_end(memo_key)
+            return _keyframe_memo[memo_key]
+
+    cache_file = path + KEYFRAME_SUFFIX
+    keyframes = None
+    try:
+        with open(cache_file, "r", encoding="utf-8") as f:
+            saved = json.load(f)
+        if saved.get("stamp") == stamp:
+            keyframes = saved["keyframes"]
+    except (OSError, ValueError, KeyError, AttributeError):
+        pass
+
+    if keyframes is None:
+        log_func("Building keyframe index...")
+        data = _ffprobe_json(["-select_streams", "v:0", "-show_entries", "packet=pts_time,flags", path])
+        keyframes = sorted(
+            float(p["pts_time"]) for p in data.get("packets", [])
+            if "K" in p.get("flags", "") and p.get("pts_time") not in (None, "N/A")
+        )
+        log_func(f"Keyframe index: {len(keyframes)} keyframes.")
+        try:
+            with open(cache_file, "w", encoding="utf-8") as f:
+                json.dump({"stamp": stamp, "keyframes": keyframes}, f)
+        except OSError:
+            pass
+
+    with _keyframe_memo_lock:
+        _keyframe_memo[memo_key] = keyframes
+        while len(_keyframe_memo) > KEYFRAME_MEMO_SIZE:
+            _keyframe_memo.popitem(last=False)
+    return keyframes
+
+
+def media_duration(path):
+    """
+    Returns the container duration of path in seconds.
+    """
+    data = _ffprobe_json(["-show_entries", "format=duration", path])
+    return float(data["format"]["duration"])
+
+
+def _video_stream_info(path):
+    data = _ffprobe_json(["-select_streams", "v:0",
+                          "-show_entries", "stream=codec_name,profile,pix_fmt,time_base", path])
+    streams = data.get("streams", [])
+    return streams[0] if streams else None
+
+
+def _encode_args(stream, settings):
+    """
+    ffmpeg arguments that re-encode a boundary piece at the quality of the encoding profile
+    settings, with parameters matching the source stream.
+    """
+    args = video_codec_args(settings, audio=False)
+    if stream.get("pix_fmt"):
+        args += ["-pix_fmt", stream["pix_fmt"]]
+    profile = (stream.get("profile") or "").lower().replace("constrained ", "")
+    if profile in ("baseline", "main", "high", "high10", "high422", "high444"):
+        args += ["-profile:v", profile]
+    return args
+
+
+def plan_smart_cut(keyframes, start, end):
+    """
+    Splits start..end into (head, middle, tail) ranges. The middle runs between the
+    first keyframe at/after start and the last keyframe at/before end and can be
+    stream-copied; head and tail are the partial GOPs that must be re-encoded.
+    Returns None if no whole GOP lies inside the range.
+    """
+    i = bisect.bisect_left(keyframes, start)
+    j = bisect.bisect_right(keyframes, end) - 1
+    if i >= len(keyframes) or j < i or keyframes[j] <= keyframes[i]:
+        return None
+    k_first, k_last = keyframes[i], keyframes[j]
+    return (start, k_first), (k_first, k_last), (k_last, end)
+
+
+def smart_cut(src, start, end, destination, log_func, run_command, progress_func=None, settings=None):
+    """
+    Cuts start..end (seconds, end may be None for "until the end") of src into destination,
+    re-encoding only the partial GOPs at both edges and stream-copying everything in between.
+    Video pieces are joined with the concat demuxer; audio is encoded (or copied) once
+    over the range.
+    Progress of the join, which takes most of the time, goes to progress_func. The edges
+    and the audio are encoded with the encoding profile settings (see profiles.py; None
+    uses config.json's choice).
+    Returns True on success, False if the caller should fall back to a full re-encode.
+    """
+    try:
+        stream = _video_stream_info(src)
+        if not stream or stream.get("codec_name") not in SMART_CUT_CODECS:
+            log_func("Smart cut: source codec not supported, using full re-encode.")
+            return False
+        if end is None:
+            end = media_duration(src)
+        plan = plan_smart_cut(keyframe_index(src, log_func), start, end)
+    except (OSError, RuntimeError, ValueError, KeyError) as e:
+        log_func("Smart cut unavailable: " + str(e))
+        return False
+    if plan is None:
+        log_func("Smart cut: range is shorter than one GOP, using full re-encode.")
+        return False
+
+    (h_start, h_end), (m_start, m_end), (t_start, t_end) = plan
+    log_func(f"Smart cut: re-encoding {h_end - h_start:.2f}s + {t_end - t_start:.2f}s, "
+             f"copying {m_end - m_start:.2f}s.")
+
+    ffmpeg = find_tool("ffmpeg")
+    settings = settings or resolve_profile(None, end - start)[1]
+    encode = _encode_args(stream, settings)
+    timescale = stream.get("time_base", "1/90000").split("/")[-1]
+    work_dir = tempfile.mkdtemp(prefix="smartcut-", dir=os.path.dirname(os.path.abspath(destination)))
+    try:
+        pieces = []
+        for name, (a, b), codec in (("head", (h_start, h_end), encode),
+                                    ("middle", (m_start, m_end), ["-c:v", "copy"]),
+                                    ("tail", (t_start, t_end), encode)):
+            if b - a <= 0.001:
+                continue
+            piece = os.path.join(work_dir, name + ".ts")
+            # Pieces are written as MPEG-TS (Annex B) so the re-encoded edges carry
+            # their own parameter sets in-band when joined with the copied middle.
+            cmd = [ffmpeg, "-v", "error", "-y", "-ss", f"{a}", "-i", src, "-t", f"{b - a}",
+                   "-map", "0:v:0", "-an", *codec, "-bsf:v", "h264_mp4toannexb", "-f", "mpegts", piece]
+            if run_command(cmd, log_func).returncode != 0 or not os.path.exists(piece):
+                log_func(f"Smart cut: failed to produce {name} piece.")
+                return False
+            pieces.append(piece)
+
+        concat_list = os.path.join(work_dir, "pieces.txt")
+        with open(concat_list, "w", encoding="utf-8") as f:
+            for piece in pieces:
+                f.write("file '" + piece.replace("'", "'\\''") + "'\n")
+
+        cmd = [ffmpeg, "-v", "error", *FFMPEG_PROGRESS_ARGS, "-y",
+               "-f", "concat", "-safe", "0", "-i", concat_list,
+               "-ss", f"{start}", "-t", f"{end - start}", "-i", src,
+               "-map", "0:v:0", "-map", "1:a:0?", "-c:v", "copy", *(settings.get("audio") or ["-c:a", "aac"]),
+               "-video_track_timescale", timescale, "-movflags", "+faststart", destination]
+        if (run_command(cmd, log_func, progress_func, FfmpegProgressParser(end - start)).returncode != 0
+                or not os.path.exists(destination)):
+            log_func("Smart cut: failed to join pieces.")
+            return False
+        return True
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
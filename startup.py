@@ -0,0 +1,55 @@
+import os
+import sys
+import time
+
+# Opt-in start-up profiler. Set YTCUTTER_PROFILE_STARTUP=1 to print how long each start-up
+# phase took (measured from the start of main.py), or to a file name ending in ".prof" to
+# also save a cProfile of everything up to the first frame (view with snakeviz/pstats).
+ENV_VAR = "YTCUTTER_PROFILE_STARTUP"
+
+_started = time.perf_counter()
+_marks = []
+_profiler = None
+
+
+def enabled():
+    return bool(os.environ.get(ENV_VAR))
+
+
+def begin():
+    """
+    Starts the cProfile recording if requested. Call as early as possible in main.py.
+    """
+    global _profiler
+    if os.environ.get(ENV_VAR, "").endswith(".prof"):
+        import cProfile
+        _profiler = cProfile.Profile()
+        _profiler.enable()
+
+
+def mark(label):
+    """
+    Records that the start-up phase label has been reached.
+    """
+    if enabled():
+        _marks.append((label, time.perf_counter()))
+
+
+def report(log_func=None):
+    """
+    Stops the profile (if any) and prints the phases recorded since the last report
+    to stderr (and log_func).
+    """
+    global _profiler
+    if not enabled():
+        return
+    if _profiler is not None:
+        _profiler.disable()
+        _profiler.dump_stats(os.environ[ENV_VAR])
+        _profiler = None
+    while _marks:
+        label, at = _marks.pop(0)
+        line = f"Startup: {label} after {(at - _started) * 1000:.0f} ms"
+        print(line, file=sys.stderr)
+        if log_func:
+            log_func(line)
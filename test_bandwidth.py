@@ -0,0 +1,145 @@
+"""
+Tests for the bandwidth budget (bandwidth.py): the fair split and the controller's
+rebalancing and restarts. Time is simulated by moving each lease's start back.
+Run with: python -m unittest test_bandwidth (or pytest).
+"""
+import unittest
+
+import bandwidth
+from bandwidth import RESTART_INTERVAL, SETTLE_TIME, BandwidthController, share_budget
+
+KB = 1000
+
+
+class _Job:
+    def __init__(self, job_id, interactive=False):
+        self.id = job_id
+        self.interactive = interactive
+        self.current_speed = 0.0
+        self.queue = None
+        self.interrupted = 0
+
+    def interrupt(self):
+        self.interrupted += 1
+
+
+def _age(lease, seconds):
+    lease.started -= seconds
+
+
+class ShareBudgetTest(unittest.TestCase):
+    def test_equal_weights(self):
+        self.assertEqual(share_budget(900, [(1, None)] * 3), [300, 300, 300])
+
+    def test_weighted(self):
+        self.assertEqual(share_budget(1000, [(4, None), (1, None)]), [800, 200])
+
+    def test_capped_claim_leaves_the_rest(self):
+        self.assertEqual(share_budget(1000, [(1, 100), (1, None), (1, None)]), [100, 450, 450])
+
+    def test_caps_cascade(self):
+        # After the 100 claim is met, 300 is still below the new equal share of 450.
+        self.assertEqual(share_budget(1000, [(1, 100), (1, 300), (1, None)]), [100, 300, 600])
+
+    def test_all_capped_below_budget(self):
+        self.assertEqual(share_budget(1000, [(1, 100), (4, 200)]), [100, 200])
+
+    def test_zero_budget(self):
+        self.assertEqual(share_budget(0, [(1, None), (4, 50)]), [0, 0])
+
+    def test_no_claims(self):
+        self.assertEqual(share_budget(1000, []), [])
+
+
+class BandwidthControllerTest(unittest.TestCase):
+    def setUp(self):
+        # A long interval keeps the background thread out of the way; the tests rebalance.
+        self.controller = BandwidthController(1000 * KB, interactive_weight=4, start_fragments=4,
+                                              max_fragments=16, interval=3600)
+
+    def rebalance(self):
+        with self.controller._lock:
+            self.controller._rebalance()
+
+    def test_first_lease_gets_the_budget(self):
+        with self.controller.lease(_Job(1)) as lease:
+            self.assertEqual(lease.limit, 1000 * KB)
+
+    def test_new_lease_gets_weighted_share(self):
+        with self.controller.lease(_Job(1)), self.controller.lease(_Job(2, interactive=True)) as lease:
+            self.assertEqual(lease.limit, 800 * KB)
+
+    def test_overconsuming_lease_is_restarted_after_settling(self):
+        first = _Job(1)
+        with self.controller.lease(first) as lease, self.controller.lease(_Job(2)):
+            first.current_speed = 950 * KB
+            self.rebalance()
+            self.assertEqual(first.interrupted, 0)
+
+            _age(lease, SETTLE_TIME)
+            self.rebalance()
+            self.assertEqual(first.interrupted, 1)
+            self.assertEqual(lease.limit, 500 * KB)
+            self.assertTrue(lease.take_restart())
+            self.assertFalse(lease.take_restart())
+            self.assertEqual(lease.restarts, 1)
+
+    def test_source_limited_lease_leaves_the_rest(self):
+        slow, fast = _Job(1), _Job(2)
+        with self.controller.lease(slow) as slow_lease, self.controller.lease(fast) as fast_lease:
+            self.assertEqual(fast_lease.limit, 500 * KB)
+            slow.current_speed = 85 * KB
+            fast.current_speed = 480 * KB
+            _age(slow_lease, SETTLE_TIME)
+            _age(fast_lease, SETTLE_TIME)
+            self.rebalance()
+            # Raising a limit waits for RESTART_INTERVAL.
+            self.assertEqual(fast.interrupted, 0)
+
+            _age(fast_lease, RESTART_INTERVAL)
+            self.rebalance()
+            self.assertEqual(fast.interrupted, 1)
+            self.assertAlmostEqual(fast_lease.limit, 900 * KB)
+
+    def test_unrestartable_lease_keeps_its_limit(self):
+        job = _Job(1)
+        with self.controller.lease(job, restartable=False) as lease, self.controller.lease(_Job(2)):
+            job.current_speed = 950 * KB
+            _age(lease, RESTART_INTERVAL)
+            self.rebalance()
+            self.assertEqual(job.interrupted, 0)
+            self.assertEqual(lease.limit, 1000 * KB)
+
+    def test_slow_fragmented_download_gets_more_fragments(self):
+        job = _Job(1)
+        with self.controller.lease(job, fragmented=True) as lease:
+            self.assertEqual(lease.args(), ["--limit-rate", str(250 * KB), "--concurrent-fragments", "4"])
+            job.current_speed = 200 * KB
+            _age(lease, SETTLE_TIME)
+            self.rebalance()
+            self.assertEqual((job.interrupted, lease.fragments), (0, 4))
+
+            _age(lease, RESTART_INTERVAL)
+            self.rebalance()
+            self.assertEqual((job.interrupted, lease.fragments), (1, 8))
+            self.assertEqual(lease.args(), ["--limit-rate", str(125 * KB), "--concurrent-fragments", "8"])
+
+    def test_fragment_count_is_kept_for_the_next_download(self):
+        job = _Job(1)
+        with self.controller.lease(job, fragmented=True) as lease:
+            lease.fragments = 8
+        with self.controller.lease(job, fragmented=True) as lease:
+            self.assertEqual(lease.fragments, 8)
+
+    def test_unfragmented_download_uses_one_connection(self):
+        with self.controller.lease(_Job(1)) as lease:
+            self.assertEqual(lease.args(), ["--limit-rate", str(1000 * KB), "--concurrent-fragments", "1"])
+
+    def test_limit_never_below_min_rate(self):
+        controller = BandwidthController(10 * KB, interval=3600)
+        with controller.lease(_Job(1)), controller.lease(_Job(2)) as lease:
+            self.assertEqual(lease.limit, bandwidth.MIN_RATE)
+
+
+if __name__ == "__main__":
+    unittest.main()
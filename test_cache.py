@@ -0,0 +1,113 @@
+"""
+Tests for the source media cache (cache.py).
+Run with: python -m unittest test_cache (or pytest).
+"""
+import itertools
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import cache
+
+
+class LinkOrCopyTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.src = os.path.join(self.dir, "source.mp4")
+        self.dst = os.path.join(self.dir, "output.mp4")
+        with open(self.src, "wb") as f:
+            f.write(b"media")
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def test_links_new_file(self):
+        cache.link_or_copy(self.src, self.dst)
+        self.assertTrue(os.path.samefile(self.src, self.dst))
+
+    def test_same_destination_twice(self):
+        # A second Full download with the same name and a cache hit.
+        cache.link_or_copy(self.src, self.dst)
+        cache.link_or_copy(self.src, self.dst)
+        self.assertTrue(os.path.samefile(self.src, self.dst))
+        self.assertEqual(sorted(os.listdir(self.dir)), ["output.mp4", "source.mp4"])
+
+    def test_replaces_other_file(self):
+        with open(self.dst, "wb") as f:
+            f.write(b"older output")
+        cache.link_or_copy(self.src, self.dst)
+        with open(self.dst, "rb") as f:
+            self.assertEqual(f.read(), b"media")
+        self.assertEqual(sorted(os.listdir(self.dir)), ["output.mp4", "source.mp4"])
+
+
+class SourceCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.cache_dir = os.path.join(self.dir, "cache")
+        # A strictly increasing clock, so every store and lookup has its own last_used.
+        patcher = mock.patch.object(cache.time, "time", side_effect=itertools.count(1000))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def download(self, name, size):
+        path = os.path.join(self.dir, name)
+        with open(path, "wb") as f:
+            f.write(b"x" * size)
+        return path
+
+    def test_key(self):
+        info = {"extractor_key": "Youtube", "id": "abc"}
+        self.assertEqual(cache.SourceCache.make_key(info, ["-f", "18"]), "Youtube|abc|-f 18")
+
+    def test_store_and_lookup(self):
+        source_cache = cache.SourceCache(self.cache_dir, 100)
+        cached = source_cache.store("a", self.download("a.mp4", 10))
+        self.assertTrue(cached.endswith(".mp4"))
+        self.assertTrue(source_cache.contains("a"))
+        self.assertEqual(source_cache.lookup("a"), cached)
+        self.assertIsNone(source_cache.lookup("b"))
+        self.assertEqual(source_cache.stats(), "Cache: 1 hits, 1 misses, 10 B saved")
+
+    def test_least_recently_used_is_evicted(self):
+        source_cache = cache.SourceCache(self.cache_dir, 25)
+        cached_a = source_cache.store("a", self.download("a.mp4", 10))
+        source_cache.store("b", self.download("b.mp4", 10))
+        with open(cached_a + ".keyframes.json", "w") as f:
+            f.write("{}")
+        source_cache.lookup("b")
+        source_cache.store("c", self.download("c.mp4", 10))
+        self.assertFalse(source_cache.contains("a"))
+        self.assertTrue(source_cache.contains("b"))
+        self.assertTrue(source_cache.contains("c"))
+        # The evicted entry's sidecar files go with it.
+        self.assertFalse(os.path.exists(cached_a + ".keyframes.json"))
+
+    def test_lookup_refreshes_an_entry(self):
+        source_cache = cache.SourceCache(self.cache_dir, 25)
+        source_cache.store("a", self.download("a.mp4", 10))
+        source_cache.store("b", self.download("b.mp4", 10))
+        source_cache.lookup("a")
+        source_cache.store("c", self.download("c.mp4", 10))
+        self.assertEqual([source_cache.contains(key) for key in "abc"], [True, False, True])
+
+    def test_larger_than_the_cache(self):
+        source_cache = cache.SourceCache(self.cache_dir, 5)
+        self.assertIsNone(source_cache.store("a", self.download("a.mp4", 10)))
+        self.assertEqual(os.listdir(self.cache_dir), ["index.json"])
+
+    def test_index_survives_a_restart(self):
+        cache.SourceCache(self.cache_dir, 100).store("a", self.download("a.mp4", 10))
+        reopened = cache.SourceCache(self.cache_dir, 100)
+        self.assertTrue(reopened.contains("a"))
+        os.remove(reopened.lookup("a"))
+        self.assertFalse(cache.SourceCache(self.cache_dir, 100).contains("a"))
+
+
+if __name__ == "__main__":
+    unittest.main()
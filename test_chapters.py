@@ -0,0 +1,46 @@
+"""
+Tests for reading chapters and planning the segment split (chapters.py).
+Run with: python -m unittest test_chapters (or pytest).
+"""
+import unittest
+
+from chapters import chapter_filename, chapter_list, segment_plan
+
+
+class ChapterListTest(unittest.TestCase):
+    def test_sorted_titled_and_trimmed(self):
+        info = {"duration": 100, "chapters": [
+            {"start_time": 40, "end_time": 100, "title": "Outro"},
+            {"start_time": 0, "end_time": 50, "title": " Intro "},
+            {"start_time": 50, "end_time": 50.01, "title": "Blip"},
+            {"start_time": 50.01, "end_time": None, "title": ""},
+        ]}
+        self.assertEqual(chapter_list(info), [(0.0, 40.0, "Intro"), (40.0, 50.0, "Outro"),
+                                              (50.01, 100, "Chapter 4")])
+
+    def test_open_last_chapter(self):
+        self.assertEqual(chapter_list({"chapters": [{"start_time": 10}]}), [(10.0, None, "Chapter 1")])
+
+    def test_no_chapters(self):
+        self.assertEqual(chapter_list({"duration": 10}), [])
+
+
+class SegmentPlanTest(unittest.TestCase):
+    def test_back_to_back_until_the_end(self):
+        chapters = [(0.0, 30.0, "a"), (30.0, 60.0, "b")]
+        self.assertEqual(segment_plan(chapters, 60.0), ([30.0], [0, 1]))
+
+    def test_gaps_are_dropped(self):
+        chapters = [(10.0, 30.0, "a"), (40.0, 60.0, "b")]
+        self.assertEqual(segment_plan(chapters, 90.0), ([10.0, 30.0, 40.0, 60.0], [None, 0, None, 1, None]))
+
+    def test_open_end(self):
+        chapters = [(0.0, 30.0, "a"), (30.0, None, "b")]
+        self.assertEqual(segment_plan(chapters), ([30.0], [0, 1]))
+
+    def test_filename(self):
+        self.assertEqual(chapter_filename("mix", 3, "Track: one?", ".mp3"), "mix_03 - Track_ one_.mp3")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,131 @@
+"""
+Tests for downloader.Download against a local HTTP server with range support.
+Run with: python -m unittest test_downloader (or pytest).
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+import downloader
+
+DATA = os.urandom(1024 * 1024)
+ETAG = '"v1"'
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == "/SHA2-256SUMS":
+            body = f"{'0' * 64}  other.exe\n{hashlib.sha256(DATA).hexdigest()}  file.exe\n".encode()
+            self._send(200, body)
+            return
+        first, last = 0, len(DATA) - 1
+        status = 200
+        header = self.headers.get("Range")
+        if_range = self.headers.get("If-Range")
+        if header and (if_range is None or if_range == ETAG):
+            start, _, end = header.partition("=")[2].partition("-")
+            first, last = int(start), int(end) if end else len(DATA) - 1
+            status = 206
+        self.server.ranges.append((first, last))
+        self._send(status, DATA[first:last + 1],
+                   {"Content-Range": f"bytes {first}-{last}/{len(DATA)}"} if status == 206 else {})
+
+    def _send(self, status, body, headers=None):
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", ETAG)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class DownloadTest(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self.server.ranges = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        self.dir = tempfile.mkdtemp()
+        self.destination = os.path.join(self.dir, "file.exe")
+        # Small parts, so the 1 MB test file is split between several connections.
+        patcher = mock.patch.object(downloader, "MIN_PART_SIZE", 64 * 1024)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def fetched(self):
+        # Bytes served for the file, without the one-byte probe.
+        return sum(last - first + 1 for first, last in self.server.ranges[1:])
+
+    def test_parallel_download(self):
+        download = downloader.Download(self.url + "/file.exe", self.destination,
+                                       hashlib.sha256(DATA).hexdigest(), connections=4)
+        self.assertEqual(download.run(), self.destination)
+        with open(self.destination, "rb") as f:
+            self.assertEqual(f.read(), DATA)
+        self.assertEqual(len(self.server.ranges), 1 + 4)
+        self.assertEqual(self.fetched(), len(DATA))
+        self.assertEqual(download.done, len(DATA))
+        self.assertFalse(os.path.exists(self.destination + ".part"))
+        self.assertFalse(os.path.exists(self.destination + ".part.json"))
+
+    def test_resume_from_part(self):
+        # An interrupted download: the first half of each of two parts is on disk.
+        half, quarter = len(DATA) // 2, len(DATA) // 4
+        parts = [[0, half - 1, quarter], [half, len(DATA) - 1, quarter]]
+        with open(self.destination + ".part", "wb") as f:
+            f.write(DATA[:quarter] + bytes(quarter) + DATA[half:half + quarter] + bytes(quarter))
+        with open(self.destination + ".part.json", "w", encoding="utf-8") as f:
+            json.dump({"url": self.url + "/file.exe", "size": len(DATA), "validator": ETAG, "parts": parts}, f)
+
+        download = downloader.Download(self.url + "/file.exe", self.destination, hashlib.sha256(DATA).hexdigest())
+        download.run()
+        with open(self.destination, "rb") as f:
+            self.assertEqual(f.read(), DATA)
+        self.assertEqual(download.resumed, half)
+        self.assertEqual(self.fetched(), len(DATA) - half)
+        self.assertFalse(os.path.exists(self.destination + ".part.json"))
+
+    def test_changed_file_restarts(self):
+        with open(self.destination + ".part", "wb") as f:
+            f.write(bytes(len(DATA)))
+        with open(self.destination + ".part.json", "w", encoding="utf-8") as f:
+            json.dump({"url": self.url + "/file.exe", "size": len(DATA), "validator": '"old"',
+                       "parts": [[0, len(DATA) - 1, len(DATA) // 2]]}, f)
+
+        download = downloader.Download(self.url + "/file.exe", self.destination)
+        download.run()
+        with open(self.destination, "rb") as f:
+            self.assertEqual(f.read(), DATA)
+        self.assertEqual(download.resumed, 0)
+
+    def test_checksum_mismatch(self):
+        download = downloader.Download(self.url + "/file.exe", self.destination, "0" * 64)
+        with self.assertRaises(downloader.ChecksumError):
+            download.run()
+        self.assertFalse(os.path.exists(self.destination))
+        self.assertFalse(os.path.exists(self.destination + ".part"))
+        self.assertFalse(os.path.exists(self.destination + ".part.json"))
+
+    def test_fetch_checksum(self):
+        sums = self.url + "/SHA2-256SUMS"
+        self.assertEqual(downloader.fetch_checksum(sums, "file.exe"), hashlib.sha256(DATA).hexdigest())
+        self.assertIsNone(downloader.fetch_checksum(sums, "missing.exe"))
+
+
+if __name__ == "__main__":
+    unittest.main()
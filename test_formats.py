@@ -0,0 +1,97 @@
+"""
+Tests for the format planner (formats.py) and the audio output plan (audio.py).
+Run with: python -m unittest test_formats (or pytest).
+"""
+import unittest
+
+from audio import normalize_codec, plan_audio_output
+from formats import apply_plan, plan_formats
+
+
+def _video(format_id, height, size, vcodec="avc1.64001F", fps=30, acodec="none"):
+    return {"format_id": format_id, "height": height, "fps": fps, "vcodec": vcodec, "acodec": acodec,
+            "filesize": size, "protocol": "https"}
+
+
+def _audio(format_id, abr, size, acodec="mp4a.40.2"):
+    return {"format_id": format_id, "abr": abr, "vcodec": "none", "acodec": acodec, "filesize": size,
+            "protocol": "https"}
+
+
+INFO = {"duration": 100, "formats": [
+    _video("160", 144, 1_000_000),
+    _video("136", 720, 20_000_000),
+    _video("247", 720, 15_000_000, vcodec="vp9"),
+    _video("298", 720, 25_000_000, fps=60),
+    _video("137", 1080, 40_000_000),
+    _video("18", 360, 8_000_000, acodec="mp4a.40.2"),
+    _audio("139", 48, 600_000),
+    _audio("140", 128, 1_600_000),
+    _audio("251", 130, 1_500_000, acodec="opus"),
+    {"format_id": "sb0", "protocol": "mhtml", "vcodec": "none", "acodec": "none"},
+]}
+
+
+class PlanFormatsTest(unittest.TestCase):
+    def test_highest_height_within_limit_prefers_container_codec(self):
+        plan = plan_formats(INFO, max_height=720, max_fps=30)
+        # vp9 would be smaller but needs a re-encode/remux into mp4.
+        self.assertEqual(plan.format_spec, "136+140")
+        self.assertEqual(plan.size, 21_600_000)
+
+    def test_webm_container(self):
+        self.assertEqual(plan_formats(INFO, max_height=720, max_fps=30, container="webm").format_spec, "247+251")
+
+    def test_frame_rate_limit(self):
+        self.assertEqual(plan_formats(INFO, max_height=720).format_spec, "298+140")
+
+    def test_no_limit_takes_the_best(self):
+        self.assertEqual(plan_formats(INFO).format_spec, "137+140")
+
+    def test_limit_below_every_height(self):
+        self.assertEqual(plan_formats(INFO, max_height=100).format_spec, "160+140")
+
+    def test_progressive_format(self):
+        self.assertEqual(plan_formats(INFO, max_height=360).format_spec, "18")
+
+    def test_audio_only(self):
+        self.assertEqual(plan_formats(INFO, audio_only=True).format_spec, "140")
+        self.assertEqual(plan_formats(INFO, audio_only=True, acodec="opus").format_spec, "251")
+
+    def test_size_estimated_from_bitrate(self):
+        info = {"duration": 10, "formats": [{"format_id": "a", "tbr": 800, "vcodec": "none", "acodec": "opus",
+                                             "abr": 128}]}
+        self.assertEqual(plan_formats(info, audio_only=True).size, 1_000_000)
+
+    def test_no_formats(self):
+        self.assertIsNone(plan_formats({"formats": []}))
+        self.assertIsNone(plan_formats({"formats": []}, audio_only=True))
+
+    def test_apply_plan(self):
+        planned = apply_plan(INFO, plan_formats(INFO, max_height=720, max_fps=30))
+        self.assertEqual(planned["format_id"], "136+140")
+        self.assertEqual([f["format_id"] for f in planned["requested_formats"]], ["136", "140"])
+        planned = apply_plan(INFO, plan_formats(INFO, max_height=360))
+        self.assertEqual((planned["height"], planned["acodec"]), (360, "mp4a.40.2"))
+
+
+class AudioPlanTest(unittest.TestCase):
+    def test_normalize_codec(self):
+        self.assertEqual(normalize_codec("mp4a.40.2"), "aac")
+        self.assertEqual(normalize_codec("mp4a.40.34"), "mp3")
+        self.assertEqual(normalize_codec("OPUS"), "opus")
+        self.assertIsNone(normalize_codec(None))
+
+    def test_copy_when_the_codec_fits(self):
+        self.assertEqual(plan_audio_output("opus", "opus"), (".opus", ["-c:a", "copy"], True))
+        self.assertEqual(plan_audio_output("aac", "original"), (".m4a", ["-c:a", "copy"], True))
+        self.assertEqual(plan_audio_output("alac", "original"), (".mka", ["-c:a", "copy"], True))
+
+    def test_encode_otherwise(self):
+        ext, args, copies = plan_audio_output("opus", "mp3")
+        self.assertEqual((ext, copies), (".mp3", False))
+        self.assertIn("libmp3lame", args)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+"""
+Tests for flattening playlists into queue jobs (playlist.py).
+Run with: python -m unittest test_playlist (or pytest).
+"""
+import unittest
+
+from playlist import entry_url, item_params, playlist_entries
+
+
+def _video(video_id, title=None):
+    return {"_type": "url", "ie_key": "Youtube", "url": f"https://www.youtube.com/watch?v={video_id}",
+            "id": video_id, "title": title}
+
+
+class EntryUrlTest(unittest.TestCase):
+    def test_urls(self):
+        self.assertEqual(entry_url({"webpage_url": "https://a/b", "url": "https://c/d"}), "https://a/b")
+        self.assertEqual(entry_url({"url": "abc", "ie_key": "Youtube"}), "https://www.youtube.com/watch?v=abc")
+        self.assertIsNone(entry_url({"url": "abc", "ie_key": "Generic"}))
+        self.assertIsNone(entry_url({}))
+
+
+class PlaylistEntriesTest(unittest.TestCase):
+    def test_order_and_duplicates(self):
+        info = {"_type": "playlist", "entries": [_video("a", "First"), None, _video("b"), _video("a", "Again")]}
+        self.assertEqual(playlist_entries(info), [("https://www.youtube.com/watch?v=a", "First"),
+                                                  ("https://www.youtube.com/watch?v=b", "b")])
+
+    def test_single_video(self):
+        info = {"id": "a", "title": "Video", "webpage_url": "https://www.youtube.com/watch?v=a"}
+        self.assertEqual(playlist_entries(info), [("https://www.youtube.com/watch?v=a", "Video")])
+        self.assertEqual(playlist_entries({"id": "a"}), [])
+
+    def test_inline_nested_playlists(self):
+        info = {"_type": "playlist", "entries": [{"_type": "playlist", "entries": [_video("a")]}, _video("b")]}
+        self.assertEqual([title for _, title in playlist_entries(info)], ["a", "b"])
+
+    def test_channel_tabs_are_expanded_once(self):
+        tabs = {"https://www.youtube.com/@c/videos": {"entries": [_video("a"), _video("b")]},
+                "https://www.youtube.com/@c/shorts": {"entries": [
+                    _video("b"), _video("s"),
+                    {"_type": "url", "ie_key": "YoutubeTab", "url": "https://www.youtube.com/@c/videos"},
+                ]}}
+        expanded = []
+
+        def expand(url):
+            expanded.append(url)
+            return tabs.get(url)
+
+        info = {"_type": "playlist", "entries": [
+            {"_type": "url", "ie_key": "YoutubeTab", "url": url} for url in tabs]}
+        self.assertEqual([title for _, title in playlist_entries(info, expand)], ["a", "b", "s"])
+        self.assertEqual(expanded, list(tabs))
+
+    def test_tabs_without_expand_stay_items(self):
+        info = {"_type": "playlist", "entries": [
+            {"_type": "url", "ie_key": "YoutubeTab", "url": "https://www.youtube.com/@c/videos"}]}
+        self.assertEqual(playlist_entries(info), [("https://www.youtube.com/@c/videos", "")])
+
+
+class ItemParamsTest(unittest.TestCase):
+    def test_names_and_settings(self):
+        items = [(f"https://x/{n}", f"Title {n}") for n in range(1, 101)]
+        jobs = item_params({"output_name": "mix", "quality": "720p", "url": "playlist"}, items)
+        self.assertEqual(len(jobs), 100)
+        self.assertEqual((jobs[0]["url"], jobs[0]["output_name"], jobs[0]["quality"]),
+                         ("https://x/1", "mix_001 - Title 1", "720p"))
+
+    def test_default_name_and_missing_title(self):
+        jobs = item_params({}, [("https://x/1", ""), ("https://x/2", "a/b")])
+        self.assertEqual([job["output_name"] for job in jobs], ["output_01 - Item 1", "output_02 - a_b"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+"""
+Tests for the on-disk info JSON cache (probecache.py).
+Run with: python -m unittest test_probecache (or pytest).
+"""
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from probecache import ProbeCache
+
+URL = "https://www.youtube.com/watch?v=abc"
+INFO = {"id": "abc", "title": "Video"}
+
+
+class ProbeCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.cache = ProbeCache(os.path.join(self.dir, "probe"), ttl=60)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def age(self, path, seconds):
+        stamp = time.time() - seconds
+        os.utime(path, (stamp, stamp))
+
+    def test_fresh_entry(self):
+        path = self.cache.put(URL, ["-f", "18"], INFO)
+        self.assertEqual(self.cache.path(URL, ["-f", "18"]), path)
+        self.assertEqual(self.cache.get(URL, ["-f", "18"]), INFO)
+
+    def test_keyed_by_format_selection(self):
+        self.cache.put(URL, ["-f", "18"], INFO)
+        self.assertIsNone(self.cache.get(URL))
+        self.assertIsNone(self.cache.get(URL, ["-f", "22"]))
+
+    def test_expired_entry(self):
+        path = self.cache.put(URL, (), INFO)
+        self.age(path, 61)
+        self.assertIsNone(self.cache.path(URL))
+        self.assertIsNone(self.cache.get(URL))
+
+    def test_put_prunes_expired_entries(self):
+        old = self.cache.put(URL, (), INFO)
+        self.age(old, 120)
+        fresh = self.cache.put(URL + "2", (), INFO)
+        self.assertFalse(os.path.exists(old))
+        self.assertTrue(os.path.exists(fresh))
+
+    def test_invalidate(self):
+        self.cache.put(URL, (), INFO)
+        self.cache.invalidate(URL)
+        self.assertIsNone(self.cache.get(URL))
+        # Invalidating a missing entry is a no-op.
+        self.cache.invalidate(URL)
+
+    def test_corrupt_entry(self):
+        path = self.cache.put(URL, (), INFO)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("{truncated")
+        self.assertIsNone(self.cache.get(URL))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+"""
+Tests for the yt-dlp and ffmpeg progress parsers (progress.py).
+Run with: python -m unittest test_progress (or pytest).
+"""
+import io
+import unittest
+
+from progress import (YTDLP_PROGRESS_PREFIX, FfmpegProgressParser, YtDlpProgressParser, event_from_ytdlp_hook,
+                      iter_lines, stage_weights)
+
+
+class YtDlpProgressParserTest(unittest.TestCase):
+    def test_progress_line(self):
+        is_progress, event = YtDlpProgressParser().feed(f"{YTDLP_PROGRESS_PREFIX} 250 1000 50.5 15")
+        self.assertTrue(is_progress)
+        self.assertEqual((event.kind, event.downloaded_bytes, event.total_bytes, event.speed, event.eta),
+                         ("download", 250, 1000, 50.5, 15))
+        self.assertEqual(event.fraction, 0.25)
+
+    def test_unknown_fields(self):
+        _, event = YtDlpProgressParser().feed(f"{YTDLP_PROGRESS_PREFIX} 250 NA NA NA")
+        self.assertEqual((event.downloaded_bytes, event.total_bytes, event.fraction), (250, None, None))
+
+    def test_other_lines(self):
+        self.assertEqual(YtDlpProgressParser().feed("[download] Destination: x.mp4"), (False, None))
+        self.assertEqual(YtDlpProgressParser().feed(f"{YTDLP_PROGRESS_PREFIX} garbled"), (True, None))
+
+    def test_hook(self):
+        event = event_from_ytdlp_hook({"status": "downloading", "downloaded_bytes": 10,
+                                       "total_bytes_estimate": 40, "speed": 5})
+        self.assertEqual(event.fraction, 0.25)
+        self.assertEqual(event_from_ytdlp_hook({"status": "finished", "downloaded_bytes": 40}).fraction, 1.0)
+
+
+class FfmpegProgressParserTest(unittest.TestCase):
+    def feed(self, parser, text):
+        return [parser.feed(line) for line in text.strip().splitlines()]
+
+    def test_block(self):
+        results = self.feed(FfmpegProgressParser(duration=20), """
+frame=100
+fps=50.0
+total_size=1000
+out_time_us=5000000
+speed=2.0x
+progress=continue
+""")
+        self.assertTrue(all(is_progress for is_progress, _ in results))
+        self.assertTrue(all(event is None for _, event in results[:-1]))
+        event = results[-1][1]
+        self.assertEqual((event.kind, event.out_time, event.fps, event.speed), ("encode", 5.0, 50.0, 2.0))
+        self.assertEqual(event.fraction, 0.25)
+        self.assertEqual(event.eta, 7.5)
+
+    def test_end_and_unknown_duration(self):
+        parser = FfmpegProgressParser()
+        _, event = self.feed(parser, "out_time_us=N/A\nspeed=N/A\nprogress=end")[-1]
+        self.assertEqual((event.out_time, event.speed, event.fraction), (None, None, 1.0))
+
+    def test_other_lines(self):
+        parser = FfmpegProgressParser()
+        self.assertEqual(parser.feed("[mp4 @ 0x1] Some warning"), (False, None))
+        self.assertEqual(parser.feed("Error: a=b"), (False, None))
+
+
+class IterLinesTest(unittest.TestCase):
+    def test_splits_on_cr_and_lf(self):
+        stream = io.BufferedReader(io.BytesIO(b"a\r\nb\rc\n\nd"))
+        self.assertEqual(list(iter_lines(stream)), ["a", "b", "c", "d"])
+
+
+class StageWeightsTest(unittest.TestCase):
+    def test_sums_to_one(self):
+        weights = stage_weights(100 * 1024 * 1024, 60, 600)
+        self.assertAlmostEqual(sum(weights.values()), 1.0)
+        self.assertEqual(set(weights), {"download", "encode", "finalize"})
+
+    def test_no_encode(self):
+        self.assertEqual(stage_weights(1024 * 1024, None)["encode"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+"""
+Tests for the keyframe planning of smart cuts (smartcut.py) and chunked encodes (chunked.py).
+Run with: python -m unittest test_smartcut (or pytest).
+"""
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import smartcut
+from chunked import chunk_count, plan_chunks
+from smartcut import keyframe_index, plan_smart_cut
+
+KEYFRAMES = [0.0, 2.0, 4.0, 6.0, 8.0, 10.0]
+
+
+class PlanSmartCutTest(unittest.TestCase):
+    def test_edges_and_middle(self):
+        self.assertEqual(plan_smart_cut(KEYFRAMES, 1.5, 8.5), ((1.5, 2.0), (2.0, 8.0), (8.0, 8.5)))
+
+    def test_cut_on_keyframes(self):
+        self.assertEqual(plan_smart_cut(KEYFRAMES, 2.0, 6.0), ((2.0, 2.0), (2.0, 6.0), (6.0, 6.0)))
+
+    def test_shorter_than_a_gop(self):
+        self.assertIsNone(plan_smart_cut(KEYFRAMES, 2.5, 3.5))
+        self.assertIsNone(plan_smart_cut(KEYFRAMES, 2.5, 4.5))
+
+    def test_past_the_last_keyframe(self):
+        self.assertIsNone(plan_smart_cut(KEYFRAMES, 10.5, 12.0))
+
+
+class PlanChunksTest(unittest.TestCase):
+    def test_splits_on_nearest_keyframes(self):
+        keyframes = [float(k) for k in range(0, 120, 7)]
+        ranges = plan_chunks(keyframes, 0.0, 120.0, 4)
+        self.assertEqual(ranges, [(0.0, 28.0), (28.0, 63.0), (63.0, 91.0), (91.0, 120.0)])
+
+    def test_contiguous_cover(self):
+        ranges = plan_chunks(KEYFRAMES, 1.0, 9.0, 3)
+        self.assertEqual(ranges[0][0], 1.0)
+        self.assertEqual(ranges[-1][1], 9.0)
+        for (_, b), (a, _) in zip(ranges, ranges[1:]):
+            self.assertEqual(a, b)
+            self.assertIn(a, KEYFRAMES)
+
+    def test_no_keyframes_inside(self):
+        self.assertEqual(plan_chunks([0.0, 100.0], 10.0, 90.0, 4), [(10.0, 90.0)])
+
+    def test_chunk_count(self):
+        self.assertEqual(chunk_count(600, 8, 60), 8)
+        self.assertEqual(chunk_count(150, 8, 60), 2)
+        self.assertEqual(chunk_count(30, 8, 60), 1)
+
+
+class KeyframeIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, "input.mp4")
+        with open(self.path, "wb") as f:
+            f.write(b"video")
+        smartcut._keyframe_memo.clear()
+        packets = {"packets": [{"pts_time": "2.0", "flags": "K_"}, {"pts_time": "1.0", "flags": "__"},
+                               {"pts_time": "0.0", "flags": "K_"}, {"pts_time": "N/A", "flags": "K_"}]}
+        patcher = mock.patch.object(smartcut, "_ffprobe_json", return_value=packets)
+        self.ffprobe = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        smartcut._keyframe_memo.clear()
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def test_saved_next_to_the_source(self):
+        self.assertEqual(keyframe_index(self.path, lambda line: None), [0.0, 2.0])
+        self.assertTrue(os.path.exists(self.path + smartcut.KEYFRAME_SUFFIX))
+        smartcut._keyframe_memo.clear()
+        self.assertEqual(keyframe_index(self.path, lambda line: None), [0.0, 2.0])
+        self.assertEqual(self.ffprobe.call_count, 1)
+
+    def test_changed_source_is_indexed_again(self):
+        keyframe_index(self.path, lambda line: None)
+        with open(self.path, "ab") as f:
+            f.write(b" changed")
+        keyframe_index(self.path, lambda line: None)
+        self.assertEqual(self.ffprobe.call_count, 2)
+
+    def test_memo_is_bounded(self):
+        with mock.patch.object(smartcut, "KEYFRAME_MEMO_SIZE", 2):
+            for number in range(4):
+                path = os.path.join(self.dir, f"{number}.mp4")
+                with open(path, "wb") as f:
+                    f.write(b"video")
+                keyframe_index(path, lambda line: None)
+            self.assertEqual(len(smartcut._keyframe_memo), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+"""
+Tests for the time and range parsing helpers in utils.py.
+Run with: python -m unittest test_utils (or pytest).
+"""
+import unittest
+
+from utils import converttime, parse_ranges, safe_filename, validate_range
+
+
+class ConvertTimeTest(unittest.TestCase):
+    def test_formats(self):
+        self.assertEqual(converttime("45"), 45)
+        self.assertEqual(converttime("1:05"), 65)
+        self.assertEqual(converttime("1:00:05.5"), 3605.5)
+        self.assertEqual(converttime(" 2:03,25 "), 123.25)
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            converttime("1:xx")
+
+
+class ParseRangesTest(unittest.TestCase):
+    def test_separators_and_open_end(self):
+        text = "1:05-1:30\n2:00 2:10\n\n# comment\n3:00-\n-0:20"
+        self.assertEqual(parse_ranges(text), [(65, 90), (120, 130), (180, None), (0, 20)])
+
+    def test_empty(self):
+        self.assertEqual(parse_ranges(""), [])
+
+    def test_malformed_line(self):
+        with self.assertRaisesRegex(ValueError, "Line 2"):
+            parse_ranges("0:10-0:20\nabc-def")
+
+    def test_end_before_start(self):
+        with self.assertRaisesRegex(ValueError, "end must be after start"):
+            parse_ranges("0:30-0:20")
+
+
+class ValidateRangeTest(unittest.TestCase):
+    def test_valid(self):
+        validate_range(0, 10, 60)
+        validate_range(50, None, 60)
+        validate_range(10, 20)
+        # A second of slack for rounding in the reported duration.
+        validate_range(10, 60.8, 60)
+
+    def test_invalid(self):
+        for start, end, duration in ((-1, 10, None), (10, 10, None), (20, 10, 60), (60, None, 60),
+                                     (10, 62, 60)):
+            with self.subTest(start=start, end=end, duration=duration):
+                with self.assertRaises(ValueError):
+                    validate_range(start, end, duration)
+
+
+class SafeFilenameTest(unittest.TestCase):
+    def test_sanitizes(self):
+        self.assertEqual(safe_filename('A/B: "C"?', "x"), "A_B_ _C__")
+        self.assertEqual(safe_filename(" . ", "Item 3"), "Item 3")
+        self.assertEqual(len(safe_filename("a" * 200, "x")), 80)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,413 @@
+import os
+import json
+import time
+import re
+import glob
+import functools
+import itertools
+import threading
+import statistics
+from contextlib import contextmanager
+from config import load_config
+from utils import current_dir, format_size
+
+# Lightweight per-job tracing. run_job opens a Trace; code further down wraps its stages
+# in span() and every external process run by run_command becomes a child span with its
+# CPU time, exit code and bytes read/written. Outside a trace, span() does nothing.
+# Finished traces are saved in Chrome trace format (open in chrome://tracing or
+# https://ui.perfetto.dev) and summarized into a rolling history file.
+
+_local = threading.local()
+_span_ids = itertools.count(1)
+# Numbers trace files of jobs run outside the queue (which have no job id).
+_trace_numbers = itertools.count(1)
+
+
+class Span:
+    """
+    One timed stage or process within a trace. args holds the measurements
+    (cpu, bytes_in, bytes_out, exit_code, ...), added with set().
+    """
+
+    def __init__(self, trace, name, category, parent, args):
+        self.trace = trace
+        self.id = next(_span_ids)
+        self.name = name
+        self.category = category
+        self.parent = parent
+        self.args = {k: v for k, v in args.items() if v is not None}
+        self.thread = threading.current_thread()
+        self.start = time.perf_counter()
+        self.end = None
+
+    @property
+    def duration(self):
+        return (self.end or time.perf_counter()) - self.start
+
+    def set(self, **args):
+        self.args.update({k: v for k, v in args.items() if v is not None})
+
+
+class _NoSpan:
+    # Stand-in yielded by span() when no trace is active.
+    def set(self, **args):
+        pass
+
+
+class Trace:
+    """
+    The spans recorded for one job. meta describes the job (media, mode, ...).
+    """
+
+    def __init__(self, name, meta=None):
+        self.name = name
+        self.meta = dict(meta or {})
+        self.spans = []
+        self.started = time.perf_counter()
+        self.started_at = time.time()
+        self.ok = None
+        self._lock = threading.Lock()
+
+    def add(self, span):
+        with self._lock:
+            self.spans.append(span)
+
+    def descendants(self, span):
+        children = {}
+        for s in self.spans:
+            children.setdefault(s.parent, []).append(s)
+        found, todo = [], list(children.get(span.id, []))
+        while todo:
+            s = todo.pop()
+            found.append(s)
+            todo.extend(children.get(s.id, []))
+        return found
+
+    def summary(self):
+        """
+        Per stage (top-level "stage"/"queue" spans, merged by name): wall seconds (parallel
+        spans counted once), child process CPU seconds, bytes in/out and failed processes,
+        plus the job's totals.
+        """
+        stages, intervals = {}, {}
+        for span in sorted(self.spans, key=lambda s: s.start):
+            if span.category not in ("stage", "queue") or self._stage_parent(span):
+                continue
+            stage = stages.setdefault(span.name, {"wall": 0.0, "cpu": None, "bytes_in": 0, "bytes_out": 0,
+                                                  "failed": 0})
+            intervals.setdefault(span.name, []).append((span.start, span.start + span.duration))
+            stage["wall"] = _union(intervals[span.name])
+            descendants = self.descendants(span)
+            for key in ("bytes_in", "bytes_out"):
+                # Measured by the stage itself, else the sum over its processes.
+                stage[key] += span.args[key] if key in span.args else \
+                    sum(c.args.get(key, 0) for c in descendants if c.category == "process")
+            for child in [span, *descendants]:
+                if child.args.get("cpu") is not None:
+                    stage["cpu"] = (stage["cpu"] or 0) + child.args["cpu"]
+                if child.args.get("exit_code"):
+                    stage["failed"] += 1
+        processes = [s for s in self.spans if s.category == "process"]
+        cpus = [s.args["cpu"] for s in processes if "cpu" in s.args]
+        return {
+            "wall": (max((s.end for s in self.spans if s.end), default=self.started)) - self.started,
+            "cpu": sum(cpus) if cpus else None,
+            "processes": len(processes),
+            "stages": stages,
+        }
+
+    def _stage_parent(self, span):
+        # True if span is nested in another stage (only outermost stages are summarized).
+        by_id = {s.id: s for s in self.spans}
+        parent = by_id.get(span.parent)
+        while parent is not None:
+            if parent.category in ("stage", "queue"):
+                return True
+            parent = by_id.get(parent.parent)
+        return False
+
+    def to_chrome(self):
+        """
+        The trace as a Chrome trace event dict ("X" complete events, one row per thread).
+        """
+        events, threads = [], {}
+        for span in sorted(self.spans, key=lambda s: s.start):
+            tid = threads.setdefault(span.thread.ident, (len(threads) + 1, span.thread.name))[0]
+            events.append({
+                "name": span.name, "cat": span.category, "ph": "X", "pid": 1, "tid": tid,
+                "ts": round((span.start - self.started) * 1e6), "dur": round(span.duration * 1e6),
+                "args": span.args,
+            })
+        for tid, name in threads.values():
+            events.append({"name": "thread_name", "ph": "M", "pid": 1, "tid": tid, "args": {"name": name}})
+        events.append({"name": "process_name", "ph": "M", "pid": 1, "args": {"name": self.name}})
+        return {"traceEvents": events, "displayTimeUnit": "ms",
+                "otherData": {**self.meta, "started": time.strftime("%Y-%m-%d %H:%M:%S",
+                                                                     time.localtime(self.started_at))}}
+
+
+def _union(intervals):
+    # Total length covered by (start, end) intervals sorted by start.
+    total, reach = 0.0, None
+    for start, end in intervals:
+        if reach is None or start > reach:
+            total += end - start
+            reach = end
+        elif end > reach:
+            total += end - reach
+            reach = end
+    return total
+
+
+def current_trace():
+    return getattr(_local, "trace", None)
+
+
+def _current_span():
+    stack = getattr(_local, "stack", None)
+    return stack[-1] if stack else None
+
+
+@contextmanager
+def job_trace(name, **meta):
+    """
+    Makes a new Trace the calling thread's current trace for the duration of the block.
+    """
+    trace = Trace(name, meta)
+    previous = current_trace(), getattr(_local, "stack", None)
+    _local.trace, _local.stack = trace, []
+    try:
+        yield trace
+    finally:
+        _local.trace, _local.stack = previous
+
+
+@contextmanager
+def span(name, category="stage", **args):
+    """
+    Times the block as a span of the current trace (nested under the innermost open span).
+    Yields the Span so measurements can be added with set(); a no-op outside a trace.
+    """
+    trace = current_trace()
+    if trace is None:
+        yield _NoSpan()
+        return
+    parent = _current_span()
+    s = Span(trace, name, category, parent.id if parent else None, args)
+    _local.stack.append(s)
+    try:
+        yield s
+    finally:
+        s.end = time.perf_counter()
+        _local.stack.remove(s)
+        trace.add(s)
+
+
+def traced(name, category="stage"):
+    """
+    Decorator that runs every call of the function inside span(name, category).
+    """
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name, category):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def bind(func):
+    """
+    Wraps func so that, run on another thread (e.g. in a ThreadPoolExecutor), its spans
+    still land in the caller's trace, nested under the caller's current span.
+    """
+    trace, parent = current_trace(), _current_span()
+    if trace is None:
+        return func
+
+    def bound(*args, **kwargs):
+        previous = current_trace(), getattr(_local, "stack", None)
+        _local.trace, _local.stack = trace, [parent] if parent else []
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _local.trace, _local.stack = previous
+
+    return bound
+
+
+def wait(proc):
+    """
+    proc.wait() that also returns the process's CPU time (user + system seconds, including
+    its own waited-for children), or None where the platform can't tell (os.wait4 is
+    POSIX-only) or the process was already reaped.
+    """
+    if not hasattr(os, "wait4") or proc.returncode is not None:
+        proc.wait()
+        return None
+    try:
+        _, status, usage = os.wait4(proc.pid, 0)
+    except ChildProcessError:
+        proc.wait()
+        return None
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    return usage.ru_utime + usage.ru_stime
+
+
+def _size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def command_io(command):
+    """
+    (bytes_in, bytes_out) of a finished yt-dlp/ffmpeg argument list: the sizes of the local
+    files passed with -i and of the output file (ffmpeg's last argument, yt-dlp's -o),
+    or of all files matching an output pattern like "chapter_%03d.mp4".
+    Pipes, URLs and anything else count as 0.
+    """
+    if isinstance(command, str):
+        return 0, 0
+    bytes_in = sum(_size(command[i + 1]) for i, arg in enumerate(command[:-1]) if arg == "-i")
+    if "-o" in command[:-1]:
+        output = command[command.index("-o") + 1]
+        bytes_out = sum(_size(p) for p in glob.glob(glob.escape(output).replace("%(ext)s", "*")))
+    elif len(command) > 1 and re.search(r"%0?\d*d", command[-1]):
+        bytes_out = sum(_size(p) for p in glob.glob(re.sub(r"%0?\d*d", "*", glob.escape(command[-1]))))
+    else:
+        bytes_out = _size(command[-1]) if len(command) > 1 else 0
+    return bytes_in, bytes_out
+
+
+def format_summary(summary):
+    """
+    One-line summary of Trace.summary(), e.g.
+    "download 12.1s 45.2 MB | cut 30.2s cpu 110.3s | move 0.0s (total 42.5s)".
+    """
+    parts = []
+    for name, stage in summary["stages"].items():
+        text = f"{name} {stage['wall']:.1f}s"
+        if stage["bytes_out"]:
+            text += " " + format_size(stage["bytes_out"])
+        if stage["cpu"]:
+            text += f" cpu {stage['cpu']:.1f}s"
+        if stage["failed"]:
+            text += f" ({stage['failed']} failed)"
+        parts.append(text)
+    return " | ".join(parts) + f" (total {summary['wall']:.1f}s)"
+
+
+def _resolve(path):
+    return path if not path or os.path.isabs(path) else os.path.join(current_dir, path)
+
+
+def history_path():
+    """
+    The trace history file configured in config.json, or "" if disabled.
+    """
+    return _resolve(load_config()["trace_history"])
+
+
+def append_history(path, entry, max_entries):
+    """
+    Appends entry to the JSON-lines history at path, keeping only the last max_entries.
+    """
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(entry) + "\n")
+    lines = load_history(path, raw=True)
+    if len(lines) > max_entries * 1.1:
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.writelines(lines[-max_entries:])
+        os.replace(tmp, path)
+
+
+def load_history(path, raw=False):
+    """
+    Returns the entries of a history file (oldest first); unreadable lines are skipped.
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            lines = [line for line in f if line.strip()]
+    except OSError:
+        return []
+    if raw:
+        return lines
+    entries = []
+    for line in lines:
+        try:
+            entries.append(json.loads(line))
+        except ValueError:
+            pass
+    return entries
+
+
+def history_report(entries, last=50):
+    """
+    Median wall time per stage for each kind of job (media + mode) over the last
+    entries, with the slowest stage first, as printable lines.
+    """
+    kinds = {}
+    for entry in entries[-last:]:
+        kinds.setdefault(f"{entry.get('media', '?')} {entry.get('mode', '?')}", []).append(entry)
+    lines = []
+    for kind, runs in sorted(kinds.items()):
+        ok = [r for r in runs if r.get("ok")]
+        lines.append(f"{kind}: {len(runs)} jobs ({len(runs) - len(ok)} failed), "
+                     f"median {statistics.median(r['wall'] for r in runs):.1f}s")
+        names = {name for r in runs for name in r.get("stages", {})}
+        medians = {name: statistics.median(r["stages"][name]["wall"] for r in runs if name in r.get("stages", {}))
+                   for name in names}
+        for name, seconds in sorted(medians.items(), key=lambda item: -item[1]):
+            lines.append(f"  {name:<22} {seconds:8.1f}s")
+    return lines
+
+
+def prune_traces(trace_dir, max_files):
+    """
+    Removes all but the max_files most recently written traces from trace_dir.
+    """
+    paths = glob.glob(os.path.join(glob.escape(trace_dir), "*.json"))
+    if len(paths) <= max_files:
+        return
+    paths.sort(key=lambda path: os.path.getmtime(path))
+    for path in paths[:len(paths) - max_files]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def record_job(trace, ok, log_func, job_id=None):
+    """
+    Logs the summary of a finished job's trace, saves the trace to config.json's trace_dir
+    (named after its start time, job id and name; only the newest trace_max_files are
+    kept) and appends the summary to trace_history. Failures to write are only logged.
+    Returns the one-line summary.
+    """
+    config = load_config()
+    trace.ok = ok
+    summary = trace.summary()
+    text = format_summary(summary)
+    log_func("Timing: " + text)
+    trace_dir = _resolve(config["trace_dir"])
+    try:
+        if trace_dir:
+            os.makedirs(trace_dir, exist_ok=True)
+            name = time.strftime("%Y%m%d-%H%M%S", time.localtime(trace.started_at))
+            safe = "".join(c if c.isalnum() or c in "-_" else "_" for c in trace.name)[:40]
+            number = job_id if job_id is not None else f"x{next(_trace_numbers)}"
+            path = os.path.join(trace_dir, f"{name}-{number}-{safe}.json")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(trace.to_chrome(), f)
+            log_func("Trace saved to " + path)
+            prune_traces(trace_dir, config["trace_max_files"])
+        history = history_path()
+        if history:
+            append_history(history, {"time": round(trace.started_at), "ok": bool(ok), **trace.meta, **summary},
+                           config["trace_history_max"])
+    except OSError as e:
+        log_func("Could not save the trace: " + str(e))
+    return text
@@ -1,10 +1,15 @@
 import os
-import tkinter as tk
-from tkinter import filedialog
+import re
+import shutil
+import signal
+import subprocess
 
 # Global variable for the current working directory
 current_dir = os.path.abspath('.') + os.sep
 
+# Characters that are not allowed in Windows file names (plus control characters).
+_UNSAFE_CHARS = re.compile(r'[<>:"/\\|?*\x00-\x1f]')
+
 def converttime(time_str):
     """
     Converts a time string into total seconds as a float.
@@ -35,10 +40,58 @@ def converttime(time_str):
     return total
 
 
+def parse_ranges(text):
+    """
+    Parses a list of cut ranges, one per line, e.g. "1:05-1:30" or "1:05 1:30".
+    The end may be left out ("1:05-") to cut until the end of the media.
+    Blank lines and lines starting with "#" are ignored.
+    Returns a list of (start, end) tuples in seconds, end being None when open.
+    Raises ValueError on a malformed line or a range whose end is not after its start.
+    """
+    ranges = []
+    for number, line in enumerate(text.splitlines(), 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        if "-" in line:
+            start, _, end = line.partition("-")
+        else:
+            start, _, end = line.partition(" ")
+        try:
+            start_sec = converttime(start) if start.strip() else 0
+            end_sec = converttime(end) if end.strip() else None
+        except ValueError:
+            raise ValueError(f"Line {number}: cannot parse range '{line}'")
+        if end_sec is not None and end_sec <= start_sec:
+            raise ValueError(f"Line {number}: end must be after start in '{line}'")
+        ranges.append((start_sec, end_sec))
+    return ranges
+
+
+def validate_range(start, end, duration=None):
+    """
+    Checks a cut range (seconds, end may be None) against the media duration (None if unknown).
+    Raises ValueError describing the problem, so bad ranges are caught before downloading.
+    """
+    if start < 0:
+        raise ValueError(f"start {start:g}s is negative")
+    if end is not None and end <= start:
+        raise ValueError(f"end {end:g}s must be after start {start:g}s")
+    if duration:
+        if start >= duration:
+            raise ValueError(f"start {start:g}s is past the end of the media ({duration:g}s)")
+        # Allow a second of slack for rounding in the reported duration.
+        if end is not None and end > duration + 1:
+            raise ValueError(f"end {end:g}s is past the end of the media ({duration:g}s)")
+
+
 def select_path(title):
     """
     Opens a Tkinter dialog to allow the user to choose a directory.
     """
+    # Imported here so the headless CLI never loads Tk.
+    import tkinter as tk
+    from tkinter import filedialog
     root = tk.Tk()
     root.withdraw()
     path = filedialog.askdirectory(title=title)
@@ -53,6 +106,13 @@ def convertname(name):
     """
     return name if name.strip() else "output"
 
+def safe_filename(text, fallback):
+    """
+    Turns a title into something usable in a file name (at most 80 characters), or
+    returns fallback if nothing is left of it.
+    """
+    return _UNSAFE_CHARS.sub("_", text).strip(" .")[:80] or fallback
+
 def check_ext(ext):
     """
     Checks if any file in the current directory ends with the given extension.
@@ -61,3 +121,49 @@ def check_ext(ext):
         if filename.endswith(ext):
             return True
     return False
+
+
+def find_tool(name):
+    """
+    Returns the path of an external tool (e.g. "yt-dlp", "ffmpeg").
+    A bundled "<name>.exe" next to the application wins over one found on PATH;
+    if neither exists the bare name is returned and left to the shell to resolve.
+    """
+    local = os.path.join(current_dir, name + ".exe")
+    if os.path.isfile(local):
+        return local
+    return shutil.which(name) or name
+
+def process_group_args():
+    """
+    Popen keyword arguments that start a command in a process group of its own, so that
+    kill_process_tree can stop it together with everything it starts (a shell's children,
+    the ffmpeg that yt-dlp runs for merging, ...).
+    """
+    if os.name == "nt":
+        return {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+    return {"start_new_session": True}
+
+def kill_process_tree(proc):
+    """
+    Kills proc, started with process_group_args(), and all of its descendants.
+    Does nothing if they are already gone.
+    """
+    try:
+        if os.name == "nt":
+            subprocess.run(["taskkill", "/F", "/T", "/PID", str(proc.pid)], capture_output=True,
+                           creationflags=subprocess.CREATE_NO_WINDOW)
+        else:
+            os.killpg(proc.pid, signal.SIGKILL)
+    except OSError:
+        pass
+
+def format_size(num_bytes):
+    """
+    Formats a byte count as a short human readable string (e.g. "12.3 MB").
+    """
+    size = float(num_bytes)
+    for unit in ("B", "KB", "MB", "GB"):
+        if abs(size) < 1024 or unit == "GB":
+            return f"{size:.1f} {unit}" if unit != "B" else f"{int(size)} B"
+        size /= 1024
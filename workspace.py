@@ -0,0 +1,170 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from config import load_config
+import tracing
+
+# Extra free space required on top of the expected download size, for the
+# merge/cut output that is written next to it before finalizing.
+SPACE_HEADROOM = 1.2
+
+# Name prefix of workspace directories inside the output directory.
+WORKSPACE_PREFIX = ".ytcut-"
+
+_local = threading.local()
+
+# Keys of the resumable_workspaces blocks currently running, in any thread.
+_active_keys = set()
+_active_lock = threading.Lock()
+
+
+class ResumableAttempt:
+    """
+    One attempt at a job inside resumable_workspaces: the key its workspaces are named
+    after, the directories they used and whether they are kept for a later attempt.
+    resumable is False if another attempt with the same key was already running.
+    """
+
+    def __init__(self, key, resumable=True):
+        self.key = key
+        self.resumable = resumable
+        self.dirs = []
+        self.keep = True
+
+
+@contextmanager
+def resumable_workspaces(key):
+    """
+    Makes the JobWorkspaces the calling thread opens inside the block resumable: they use
+    the directory ".ytcut-<key>" instead of a random one and are not removed on exit, so
+    a later attempt with the same key finds the partial downloads of this one. When the
+    block ends, the directories are removed unless attempt.keep is still set (the caller
+    clears it on success or cancellation). Also removes resumable directories older than
+    config.json's partial_max_age_days from the output directories involved.
+
+    Only one attempt per key runs at a time: while it does, an identical job (e.g. Run
+    clicked twice) gets ordinary private workspaces, with attempt.resumable False.
+
+        with resumable_workspaces(key) as attempt:
+            result = work()
+            attempt.keep = not result
+    """
+    with _active_lock:
+        resumable = key not in _active_keys
+        if resumable:
+            _active_keys.add(key)
+    attempt = ResumableAttempt(key, resumable)
+    if not resumable:
+        outer, _local.attempt = getattr(_local, "attempt", None), None
+        try:
+            yield attempt
+        finally:
+            _local.attempt = outer
+        return
+    _local.attempt = attempt
+    try:
+        yield attempt
+    finally:
+        _local.attempt = None
+        with _active_lock:
+            _active_keys.discard(key)
+        for path in attempt.dirs:
+            if not attempt.keep or not os.listdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+
+
+def prune_workspaces(out_dir, max_age):
+    """
+    Removes workspace directories in out_dir that were last modified more than max_age
+    seconds ago (left behind by failed jobs or a crash).
+    """
+    now = time.time()
+    try:
+        names = os.listdir(out_dir)
+    except OSError:
+        return
+    for name in names:
+        path = os.path.join(out_dir, name)
+        try:
+            if name.startswith(WORKSPACE_PREFIX) and now - os.path.getmtime(path) > max_age:
+                shutil.rmtree(path, ignore_errors=True)
+        except OSError:
+            pass
+
+
+class JobWorkspace:
+    """
+    A private temporary directory for one job, created inside the output directory so it
+    lives on the same filesystem as the final files. Finished files are moved out with an
+    atomic rename (no copy), and the directory is removed on exit, even after a failure.
+    Inside resumable_workspaces the directory is named after the job instead and its
+    removal is left to resumable_workspaces, so partial downloads survive for a retry.
+
+        with JobWorkspace(out_dir) as ws:
+            src = ws.path("input.mp4")
+            ...
+            ws.finalize(src, destination)
+    """
+
+    def __init__(self, out_dir):
+        self.out_dir = out_dir
+        self.dir = None
+        self._attempt = None
+
+    def __enter__(self):
+        os.makedirs(self.out_dir, exist_ok=True)
+        self._attempt = getattr(_local, "attempt", None)
+        if self._attempt is None:
+            self.dir = tempfile.mkdtemp(prefix=WORKSPACE_PREFIX, dir=self.out_dir)
+            return self
+        prune_workspaces(self.out_dir, load_config()["partial_max_age_days"] * 86400)
+        self.dir = os.path.join(self.out_dir, WORKSPACE_PREFIX + self._attempt.key)
+        os.makedirs(self.dir, exist_ok=True)
+        # Touched so pruning measures the age from the last attempt.
+        os.utime(self.dir)
+        self._attempt.dirs.append(self.dir)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._attempt is None:
+            self.cleanup()
+        return False
+
+    def path(self, name):
+        """
+        Returns the path of a working file inside the workspace.
+        """
+        return os.path.join(self.dir, name)
+
+    def free_space(self):
+        return shutil.disk_usage(self.dir).free
+
+    def has_space_for(self, expected_size):
+        """
+        Returns True if the output filesystem can hold a download of expected_size bytes
+        (plus headroom). An unknown size (None) is always accepted.
+        """
+        if not expected_size:
+            return True
+        return self.free_space() >= expected_size * SPACE_HEADROOM
+
+    @tracing.traced("move")
+    def finalize(self, src, destination):
+        """
+        Moves a finished file from the workspace to its destination. Both are on the same
+        filesystem, so this is a rename; a different filesystem falls back to a move.
+        """
+        try:
+            os.replace(src, destination)
+        except OSError:
+            shutil.move(src, destination)
+        return destination
+
+    @tracing.traced("cleanup")
+    def cleanup(self):
+        if self.dir:
+            shutil.rmtree(self.dir, ignore_errors=True)
+            self.dir = None
@@ -0,0 +1,163 @@
+import importlib.util
+import threading
+
+# The yt_dlp package is optional and heavy to import, so it is only loaded
+# when the first YtDlpEngine is created.
+yt_dlp = None
+
+# Options that change from job to job (-o, the info file, bandwidth leases, cut sections):
+# left out of the pool key, their values are set on the instance for each run instead.
+PER_RUN_ARGS = {"-o", "--load-info-json", "-r", "--limit-rate", "-N", "--concurrent-fragments",
+                "--download-sections"}
+PER_RUN_PARAMS = ("ratelimit", "concurrent_fragment_downloads", "download_ranges")
+
+# Idle instances kept for reuse; the least recently used beyond this are closed.
+MAX_IDLE = 4
+
+
+def available():
+    """
+    Returns True if the yt_dlp package can be used in-process.
+    """
+    return yt_dlp is not None or importlib.util.find_spec("yt_dlp") is not None
+
+
+class _Logger:
+    """
+    yt-dlp logger that forwards to whichever log_func the current run installed.
+    """
+
+    def __init__(self):
+        self.log_func = None
+
+    def _emit(self, msg):
+        if self.log_func:
+            self.log_func(msg.strip())
+
+    def debug(self, msg):
+        # yt-dlp routes ordinary [info]/[download] lines through debug()
+        if not msg.startswith("[debug] "):
+            self._emit(msg)
+
+    info = warning = error = _emit
+
+
+class _Result:
+    """
+    Mimics the returncode attribute of a finished subprocess.
+    """
+
+    def __init__(self, returncode):
+        self.returncode = returncode
+
+
+class YtDlpEngine:
+    """
+    Runs yt-dlp as a library inside this process. The module, its extractors and the
+    YoutubeDL instances (with their cookie jar and HTTP handlers) stay loaded between
+    jobs, so each job skips the process start-up and import cost of yt-dlp.exe.
+
+    Instances are pooled per option set; the output template and PER_RUN_PARAMS change
+    between jobs. At most MAX_IDLE instances are kept. A YoutubeDL object is not
+    thread-safe, so each one is used by one job at a time.
+    """
+
+    def __init__(self):
+        global yt_dlp
+        import yt_dlp
+        # (key, ydl, logger), least recently released first.
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def _parse(self, args):
+        # Also returns the --load-info-json file, which only yt-dlp's CLI main() reads.
+        parsed = yt_dlp.parse_options(args)
+        return parsed.urls, parsed.ydl_opts, parsed.options.load_info_filename
+
+    @staticmethod
+    def _pool_key(args):
+        # Everything but the URL(s) and PER_RUN_ARGS identifies the option set.
+        key, skip = [], False
+        for arg in args:
+            if skip:
+                skip = False
+                continue
+            if arg in PER_RUN_ARGS:
+                skip = True
+                continue
+            if "://" in arg:
+                continue
+            key.append(arg)
+        return tuple(key)
+
+    def _acquire(self, args, opts):
+        key = self._pool_key(args)
+        with self._lock:
+            for index in range(len(self._idle) - 1, -1, -1):
+                if self._idle[index][0] != key:
+                    continue
+                _, ydl, logger = self._idle.pop(index)
+                for name in PER_RUN_PARAMS:
+                    ydl.params[name] = opts.get(name)
+                # parse_options yields {"default": "<-o value>"}; keep the other
+                # template types the instance filled in at construction.
+                outtmpl = dict(ydl.params["outtmpl"])
+                outtmpl.update(opts.get("outtmpl") or {})
+                ydl.params["outtmpl"] = outtmpl
+                # download() returns this; a failed earlier job must not fail the next one.
+                ydl._download_retcode = 0
+                return key, ydl, logger
+        logger = _Logger()
+        opts = dict(opts, logger=logger)
+        return key, yt_dlp.YoutubeDL(opts), logger
+
+    def _release(self, key, ydl, logger):
+        logger.log_func = None
+        with self._lock:
+            self._idle.append((key, ydl, logger))
+            evicted = self._idle[:-MAX_IDLE]
+            del self._idle[:-MAX_IDLE]
+        for _, stale, _ in evicted:
+            # close() saves the cookie jar and closes connections (newer yt-dlp only).
+            if hasattr(stale, "close"):
+                stale.close()
+
+    def run(self, args, log_func, progress_hook=None):
+        """
+        Runs yt-dlp with command-line style args (without the program name).
+        progress_hook receives yt-dlp's native progress dicts.
+        Returns an object with a returncode attribute, like a finished subprocess.
+        """
+        urls, opts, info_file = self._parse(args)
+        key, ydl, logger = self._acquire(args, opts)
+        logger.log_func = log_func
+        if progress_hook:
+            ydl.add_progress_hook(progress_hook)
+        try:
+            if info_file:
+                # Falls back to the info's webpage_url by itself if the saved info is stale.
+                return _Result(ydl.download_with_info_file(info_file))
+            return _Result(ydl.download(urls))
+        except yt_dlp.utils.DownloadError as e:
+            log_func(str(e))
+            return _Result(1)
+        finally:
+            if progress_hook:
+                ydl._progress_hooks.remove(progress_hook)
+            self._release(key, ydl, logger)
+
+    def extract_info(self, args, log_func):
+        """
+        Returns the sanitized info dict for the URL in args without downloading, or None.
+        """
+        urls, opts, _ = self._parse(args)
+        key, ydl, logger = self._acquire(args, opts)
+        logger.log_func = log_func
+        try:
+            return ydl.sanitize_info(ydl.extract_info(urls[0], download=False))
+        except yt_dlp.utils.DownloadError as e:
+            log_func(str(e))
+            return None
+        finally:
+            self._release(key, ydl, logger)
+